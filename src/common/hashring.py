@@ -0,0 +1,30 @@
+import bisect
+import hashlib
+
+REPLICAS = 64  # Virtual nodes per shard, evens out the key ranges
+
+
+def stable_hash(key):
+    # Same value in every process (the builtin hash() is salted per process)
+    return int.from_bytes(hashlib.md5(str(key).encode()).digest()[:8], "big")
+
+
+class HashRing:
+    # Consistent hashing: each shard owns the arcs before its virtual nodes,
+    # so adding or removing a shard only moves the keys of that shard
+
+    def __init__(self, nodes, replicas=REPLICAS):
+        self.nodes = sorted(nodes)
+        self.replicas = replicas
+        points = sorted((stable_hash(f"{node}#{i}"), node) for node in self.nodes for i in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def owner(self, key):
+        if not self._hashes:
+            return None
+        i = bisect.bisect_right(self._hashes, stable_hash(key))
+        return self._owners[i % len(self._owners)]
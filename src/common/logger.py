@@ -0,0 +1,137 @@
+import atexit
+import collections
+import os
+import sys
+import threading
+
+# Levels
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+
+# Configuration (environment: LOG_LEVEL=INFO, LOG_LEVELS="gRPC=DEBUG,MQTT=WARNING")
+LOG_LEVEL = LEVELS.get(os.environ.get("LOG_LEVEL", "INFO").upper(), INFO)
+FLUSH_INTERVAL = 0.05  # Seconds between batched writes
+MAX_QUEUE = 100000  # Records kept while the writer is behind, oldest dropped first
+
+
+def _disabled(template, *args, sample=1):
+    pass
+
+
+class LogWriter:
+    # Callers only append (prefix, template, args) to a bounded deque. The
+    # background thread formats the records and writes them in one batch
+
+    def __init__(self, stream=None, flush_interval=FLUSH_INTERVAL, max_queue=MAX_QUEUE):
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self._records = collections.deque(maxlen=max_queue)
+        self._lock = threading.Lock()  # Serializes draining, never taken by callers
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, record):
+        self._records.append(record)
+
+    def flush(self):
+        with self._lock:
+            lines = []
+            while True:
+                try:
+                    prefix, template, args = self._records.popleft()
+                except IndexError:
+                    break
+                try:
+                    lines.append(f"{prefix} {template.format(*args) if args else template}\n")
+                except (IndexError, KeyError, ValueError):
+                    lines.append(f"{prefix} {template} {args}\n")
+            if lines:
+                stream = self.stream or sys.stdout
+                stream.write("".join(lines))
+                stream.flush()
+
+    def close(self):
+        self._closed.set()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+
+class Logger:
+    # One subsystem ("gRPC", "HTTP", "MQTT", ...). Disabled levels are replaced
+    # by a no-op, so a dropped debug call costs one function call. Frequent
+    # events pass sample=N to keep only every Nth record of that message
+
+    def __init__(self, writer, subsystem, level):
+        self.writer = writer
+        self.prefix = f"[{subsystem}]"
+        self._samples = {}
+        self.set_level(level)
+
+    def set_level(self, level):
+        self.level = level
+        self.debug = self._emitter() if DEBUG >= level else _disabled
+        self.info = self._emitter() if INFO >= level else _disabled
+        self.warning = self._emitter() if WARNING >= level else _disabled
+        self.error = self._emitter() if ERROR >= level else _disabled
+
+    def _emitter(self):
+        put = self.writer.put
+        prefix = self.prefix
+        samples = self._samples
+
+        def emit(template, *args, sample=1):
+            if sample > 1:
+                count = samples.get(template, 0)
+                samples[template] = count + 1
+                if count % sample:
+                    return
+            put((prefix, template, args))
+        return emit
+
+
+_writer = None
+_loggers = {}
+_levels = {}
+
+
+def _subsystem_levels(spec):
+    levels = {}
+    for entry in filter(None, spec.split(",")):
+        subsystem, _, level = entry.partition("=")
+        levels[subsystem.strip()] = LEVELS.get(level.strip().upper(), LOG_LEVEL)
+    return levels
+
+
+def get_logger(subsystem):
+    global _writer
+    if _writer is None:
+        _writer = LogWriter()
+        atexit.register(_writer.close)
+        _levels.update(_subsystem_levels(os.environ.get("LOG_LEVELS", "")))
+    logger = _loggers.get(subsystem)
+    if logger is None:
+        logger = _loggers[subsystem] = Logger(_writer, subsystem, _levels.get(subsystem, LOG_LEVEL))
+    return logger
+
+
+def configure(level=None, levels=""):
+    # Global level and "subsystem=LEVEL,..." overrides, applied to existing loggers too
+    global LOG_LEVEL
+    if level is not None:
+        LOG_LEVEL = LEVELS[level.upper()] if isinstance(level, str) else level
+    _levels.update(_subsystem_levels(levels))
+    for subsystem, logger in _loggers.items():
+        logger.set_level(_levels.get(subsystem, LOG_LEVEL))
+
+
+def flush():
+    if _writer is not None:
+        _writer.flush()
@@ -0,0 +1,114 @@
+import threading
+import time
+
+SYNC_INTERVAL = 1.0  # Seconds between two state exchanges with every peer
+
+
+class ShardCluster:
+    # Static set of controller shards. A robot lives on the shard the hash
+    # ring assigns to its ID. The captain record is replicated to every shard
+    # with a (counter, node) version and the highest version wins; each sync
+    # also carries the shard's robot count for the aggregated /status
+
+    def __init__(self, node, members, robots, ring, exchange, claim, interval=SYNC_INTERVAL):
+        self.node = node
+        self.members = members  # node -> gRPC address
+        self.robots = robots
+        self.ring = ring
+        self.exchange = exchange  # exchange(node, state) -> peer state, None if unreachable
+        self.claim = claim  # claim(node, robot_id, name) -> True if the shard took the robot
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._version = (0, "")
+        self.shards = {member: None for member in members if member != node}  # node -> robots, None if unknown
+        self.down = set()  # Peers that failed the last exchange
+        self._changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        robots.stripe_ids(sorted(members).index(node), len(members))
+
+    def owner(self, robot_id):
+        return self.ring.owner(robot_id)
+
+    def register(self, name):
+        # Registers a new robot on the shard owning its ID. An ID owned by an
+        # unreachable shard is skipped, so the robot lands on the next live one.
+        # Returns the robot, None if no shard took it
+        for _ in range(2 * len(self.members)):
+            robot_id = self.robots.reserve_id()
+            owner = self.owner(robot_id)
+            if owner == self.node:
+                return self.robots.claim(robot_id, name)
+            if owner in self.down:
+                continue
+            if self.claim(owner, robot_id, name):
+                return {"id": robot_id, "name": name}
+            self.down.add(owner)
+        return None
+
+    def status(self):
+        shards = {self.node: len(self.robots), **self.shards}
+        shards.update(dict.fromkeys(self.down))
+        return {"robots": sum(count for count in shards.values() if count is not None),
+                "shards": dict(sorted(shards.items()))}
+
+    ## Captain replication ##
+
+    def captain_changed(self):
+        # Called after a local change. The counter follows the clock in
+        # milliseconds, so a restarted shard's next change still wins
+        with self._lock:
+            self._version = (max(self._version[0] + 1, time.time_ns() // 1000000), self.node)
+        self._changed.set()
+
+    def state(self):
+        with self._lock:
+            return {"node": self.node, "robots": len(self.robots), "captain": self.robots.captain,
+                    "epoch": self.robots.epoch, "version": self._version}
+
+    def merge(self, state):
+        # Applies a peer's state, True if its captain record replaced ours
+        self.shards[state["node"]] = state["robots"]
+        with self._lock:
+            if state["version"] <= self._version:
+                return False
+            self._version = state["version"]
+            captain = state["captain"]
+            if captain is None:
+                self.robots.set_captain(None, None, state["epoch"])
+            else:
+                self.robots.set_captain(captain["id"], captain["name"], state["epoch"])
+        return True
+
+    def receive(self, state):
+        # Peer side of an exchange: merge theirs, answer with ours
+        self.merge(state)
+        return self.state()
+
+    def sync(self):
+        state = self.state()
+        for node in self.shards:
+            reply = self.exchange(node, state)
+            if reply is None:
+                self.down.add(node)
+            else:
+                self.down.discard(node)
+                self.merge(reply)
+
+    ## Sync thread ##
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._changed.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._changed.clear()
+            self.sync()
+            self._changed.wait(self.interval)  # Captain changes are pushed at once
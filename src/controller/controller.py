@@ -1,183 +1,929 @@
 from concurrent import futures
+import argparse
+import asyncio
+import json
 import time
 import signal
-import socket
 import threading
+import urllib.parse
 
 import grpc
+from common import logger
+from common.hashring import HashRing
 from proto import robot_service_pb2
 from proto import robot_service_pb2_grpc
+from cluster import ShardCluster
+from elections import ElectionManager
+from http_server import etag_matches, json_response, not_modified, response, serve_requests
+from liveness import LivenessTracker
+from metrics import Metrics
+from raft import COMMIT_TIMEOUT, NotLeader, RaftNode, ReplicatedRegistry, apply_command
+from registry import RobotRegistry
+from sessions import SessionHub
+from wal import SNAPSHOT_EVERY, WriteAheadLog
 
 GRPC_PORT = 50051
+GRPC_WORKERS = 10  # Threads of the gRPC server without --aio
 HTTP_HOST = "0.0.0.0"  # local = localhost || docker = 0.0.0.0
 HTTP_PORT = 8080
 
-data = {"robots": [], "captain": None, "health": "OK"}
-electionNeeded = False
+# Logging
+HEARTBEAT_LOG_SAMPLE = 100  # Log every Nth HealthCheck/CheckRobot at debug level
+
+# GetRobots/ListRobots streaming
+GET_ROBOTS_DELAY = 1  # Simulated delay per robot in seconds (0 in production mode)
+PAGE_SIZE = 1000  # Default robots per ListRobots call
+MAX_PAGE_SIZE = 10000
+BATCH_SIZE = 250  # Robots per streamed RobotBatch
+
+# Batch calls
+MAX_BATCH = 10000  # Robots per RegisterRobots/HealthCheckBatch call
+
+# Session streams
+SESSION_INTERVAL = 10  # Heartbeat interval pushed to robots in seconds
+LIVENESS_TIMEOUT = 3 * SESSION_INTERVAL  # Seconds without heartbeat before a robot is evicted
+
+# Sharded cluster
+CLUSTER_TIMEOUT = 1.0  # Seconds for a call between shards
+
+# Raft group
+RAFT_TIMEOUT = 0.25  # Seconds for a vote or AppendEntries call, below the election timeout
+RAFT_WORKERS = 10
+RAFT_CHANNEL_OPTIONS = [("grpc.initial_reconnect_backoff_ms", 100), ("grpc.max_reconnect_backoff_ms", 1000)]
+
+grpc_log = logger.get_logger("gRPC")
+controller_log = logger.get_logger("Controller")
+
+registry = RobotRegistry()
+sessions = SessionHub()
+elections = ElectionManager(registry, sessions, robot_service_pb2.Commands(connected=True, elect=True),
+                            poll_interval=SESSION_INTERVAL)
+cluster = None  # ShardCluster when started with --cluster
+raft_node = None  # RaftNode when started with --raft
+replicated = None  # ReplicatedRegistry in front of the registry in Raft mode
+session_interval = SESSION_INTERVAL  # Pushed to new sessions, changed with POST /heartbeatInterval
+relayed = set()  # Robots seen on a Raft follower, sent to the leader with the next AppendEntries reply
+relay_lock = threading.Lock()
+offloaded = 0  # Calls on the default executor with --aio, counted on the event loop
+data = {"health": "OK"}
+
+metrics = Metrics()
+metrics.describe("grpc_request_duration_seconds", "histogram", "RobotService call duration (streams until they end)")
+metrics.describe("http_request_duration_seconds", "histogram", "REST request duration by route and status")
+metrics.describe("robots_expired_total", "counter", "Robots evicted after missing heartbeats")
+metrics.describe("election_duration_seconds", "histogram", "Time from election start to captain registration")
+metrics.gauge("registry_robots", "Registered robots", lambda: len(registry))
+metrics.gauge("grpc_sessions", "Open Session streams", lambda: len(sessions))
+metrics.gauge("elections_total", "Elections by result",
+              lambda: {(("result", key),): elections.stats[key] for key in ("started", "completed", "failed", "retries")},
+              kind="counter")
+
+
+def expire_robot(robot_id):
+    if raft_node is not None and not raft_node.is_leader:
+        if robot_id in registry:
+            liveness.heartbeat(robot_id)  # Only the leader evicts, it also gets this node's heartbeats
+        return
+    try:
+        robot, captain_removed = (registry if replicated is None else replicated).unregister(robot_id)
+    except NotLeader:
+        controller_log.warning("Robot {} expired without Raft leader, retrying later", robot_id)
+        liveness.heartbeat(robot_id)
+        return
+    if robot is None:
+        return
+    elections.forget(robot_id)
+    metrics.inc("robots_expired_total")
+    controller_log.warning("Robot {} expired without heartbeat", robot_id)
+    if captain_removed:
+        controller_log.warning("Captain ({}) expired, starting new election", robot_id)
+        if cluster is not None:
+            cluster.captain_changed()
+        elections.start()
+
+
+liveness = LivenessTracker(LIVENESS_TIMEOUT, expire_robot)
+
+def relay(robot_ids):
+    if raft_node is not None and not raft_node.is_leader:
+        with relay_lock:
+            relayed.update(robot_ids)
+
+def take_relayed():
+    with relay_lock:
+        robot_ids = list(relayed)
+        relayed.clear()
+    return robot_ids
+
+def parse_page(request):
+    try:
+        after_id = int(request.page_token) if request.page_token else -1
+    except ValueError:
+        raise ValueError("Invalid page token")
+    page_size = min(request.page_size or PAGE_SIZE, MAX_PAGE_SIZE)
+    if page_size < 0:
+        raise ValueError("Invalid page size")
+    return after_id, page_size
+
+
+def check_batch(request):
+    if len(request.robots) > MAX_BATCH:
+        raise ValueError(f"At most {MAX_BATCH} robots per batch")
+
+
+def robot_batch(robots, next_id):
+    return robot_service_pb2.RobotBatch(
+        robots=[robot_service_pb2.RobotData(id=robot["id"], name=robot["name"]) for robot in robots],
+        next_page_token="" if next_id is None else str(next_id)
+    )
+
 
 class RobotServicer(robot_service_pb2_grpc.RobotServiceServicer):
-    current_id = 0
+    def __init__(self, robots=registry, delay=GET_ROBOTS_DELAY, batch_size=BATCH_SIZE, hub=sessions,
+                 election_manager=elections, liveness_tracker=liveness, shard_cluster=None):
+        self.robots = robots
+        self.cluster = shard_cluster
+        self.sessions = hub
+        self.elections = election_manager
+        self.liveness = liveness_tracker
+        self.delay = delay
+        self.batch_size = batch_size
 
+    @metrics.timed("grpc_request_duration_seconds")
     def GetRobots(self, request, context):
-        if not data["robots"]:
-            print("[gRPC] No robots available")
+        robots = self.robots.snapshot()
+        if not robots:
+            grpc_log.info("No robots available")
             return
 
-        for robot in data["robots"]:
+        for robot in robots:
             yield robot_service_pb2.RobotData(
                 id=robot["id"],
                 name=robot["name"]
             )
-            time.sleep(1)  # Simulated delay
-        print(f"[gRPC] All {len(data["robots"])} robots transferred")
+            if self.delay:
+                time.sleep(self.delay)  # Simulated delay
+        grpc_log.info("All {} robots transferred", len(robots))
+
+    @metrics.timed("grpc_request_duration_seconds")
+    def ListRobots(self, request, context):
+        try:
+            after_id, page_size = parse_page(request)
+        except ValueError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+        sent = 0
+        for robots, next_id in self.robots.batches(after_id, page_size, request.name_prefix, self.batch_size):
+            sent += len(robots)
+            yield robot_batch(robots, next_id)
+        grpc_log.info("{} robots transferred in batches", sent)
 
+    @metrics.timed("grpc_request_duration_seconds")
     def RegisterRobot(self, request, context):
-        robot = {
-            "id": self.current_id,
-            "name": request.name
-        }
-        self.current_id += 1
+        if self.cluster is None:
+            robot = self.robots.register(request.name)
+        else:
+            robot = self.cluster.register(request.name)  # Possibly on another shard
+            if robot is None:
+                context.abort(grpc.StatusCode.UNAVAILABLE, "No shard available")
+        if robot["id"] in self.robots:
+            self.seen(robot["id"])
+        grpc_log.info("Registered robot ({}, {})", robot["id"], robot["name"])
+        return robot_service_pb2.RobotData(id=robot["id"], name=robot["name"], epoch=self.robots.epoch)
 
-        data["robots"].append(robot)
-        print(f"[gRPC] Registered robot ({robot["id"]}, {robot["name"]})")
-        return robot_service_pb2.RobotData(id=robot["id"], name=robot["name"])
+    @metrics.timed("grpc_request_duration_seconds")
+    def RegisterRobots(self, request, context):
+        # Whole batch under one registry lock hold and one WAL commit,
+        # in cluster mode each robot still goes to the shard owning its ID
+        try:
+            check_batch(request)
+        except ValueError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        names = [robot.name for robot in request.robots]
+        if self.cluster is None:
+            robots = self.robots.register_many(names)
+        else:
+            robots = [self.cluster.register(name) for name in names]
+        self.seen_many([robot["id"] for robot in robots if robot is not None and robot["id"] in self.robots])
 
-    def UnregisterRobot(self, request, context):
-        for robot in data["robots"]:
-            if robot["id"] == request.id:
-                data["robots"].remove(robot)
-                print(f"[gRPC] Unregistered robot ({request.id})")
+        results = robot_service_pb2.RegisterResults()
+        epoch = self.robots.epoch
+        for robot in robots:
+            if robot is None:
+                results.results.add(success=False)
+            else:
+                results.results.add(success=True, robot=robot_service_pb2.RobotData(id=robot["id"], name=robot["name"],
+                                                                                    epoch=epoch))
+        grpc_log.info("Registered {} robots in a batch", sum(robot is not None for robot in robots))
+        return results
 
-                if data["captain"] is not None and data["captain"]["id"] == request.id:
-                    data["captain"] = None
-                    print(f"[gRPC] Removed captain ({request.id})")
+    @metrics.timed("grpc_request_duration_seconds")
+    def UnregisterRobot(self, request, context):
+        robot, captain_removed = self.robots.unregister(request.id)
+        if robot is None:
+            grpc_log.warning("Robot {} not found", request.id)
+            return robot_service_pb2.Status(success=False)
 
-                return robot_service_pb2.Status(success=True)
-        print(f"[gRPC] Robot {request.id} not found")
-        return robot_service_pb2.Status(success=False)
+        self.elections.forget(request.id)
+        self.liveness.remove(request.id)
+        grpc_log.info("Unregistered robot ({})", request.id)
+        if captain_removed:
+            grpc_log.info("Removed captain ({})", request.id)
+            if self.cluster is not None:
+                self.cluster.captain_changed()
+        return robot_service_pb2.Status(success=True)
 
+    @metrics.timed("grpc_request_duration_seconds")
     def CheckRobot(self, request, context):
-        for robot in data["robots"]:
-            if robot["id"] == request.id:
-                print(f"[gRPC] Robot available ({request.id})")
-                return robot_service_pb2.Status(success=True)
-        print(f"[gRPC] Robot {request.id} not found")
+        if request.id in self.robots:
+            grpc_log.debug("Robot available ({})", request.id, sample=HEARTBEAT_LOG_SAMPLE)
+            return robot_service_pb2.Status(success=True)
+        grpc_log.debug("Robot {} not found", request.id)
         return robot_service_pb2.Status(success=False)
 
+    @metrics.timed("grpc_request_duration_seconds")
     def GetCaptain(self, request, context):
-        if data["captain"] is None:
-            print("[gRPC] No captain available")
-            return robot_service_pb2.RobotData()
+        captain = self.robots.captain
+        if captain is None:
+            grpc_log.debug("No captain available")
+            return robot_service_pb2.RobotData(epoch=self.robots.epoch)
         else:
-            print(f"[gRPC] Captain transferred ({data["captain"]["id"]})")
-            return robot_service_pb2.RobotData(id=data["captain"]["id"], name=data["captain"]["name"])
+            grpc_log.debug("Captain transferred ({})", captain["id"])
+            return robot_service_pb2.RobotData(id=captain["id"], name=captain["name"], epoch=self.robots.epoch)
 
+    @metrics.timed("grpc_request_duration_seconds")
     def HealthCheck(self, request, context):
-        global electionNeeded
-        for robot in data["robots"]:
-            if robot["id"] == request.id:
-                print(f"[gRPC] Robot {request.id} still connected")
-                if electionNeeded:
-                    electionNeeded = False
-                    return robot_service_pb2.Commands(connected=True, elect=True)
-                else:
-                    return robot_service_pb2.Commands(connected=True, elect=False)
-        print(f"[gRPC] Robot {request.id} not connected")
+        if request.id in self.robots:
+            grpc_log.debug("Robot {} still connected", request.id, sample=HEARTBEAT_LOG_SAMPLE)
+            self.seen(request.id)
+            return robot_service_pb2.Commands(connected=True, elect=self.elections.take(request.id))
+        grpc_log.debug("Robot {} not connected", request.id)
         return robot_service_pb2.Commands(connected=False, elect=False)
 
+    @metrics.timed("grpc_request_duration_seconds")
+    def HealthCheckBatch(self, request, context):
+        # One Commands per robot, liveness and election bookkeeping lock once per batch
+        try:
+            check_batch(request)
+        except ValueError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        connected = [robot.id for robot in request.robots if robot.id in self.robots]
+        self.seen_many(connected)
+        elect = self.elections.take_many(connected)
+        connected = set(connected)
+
+        batch = robot_service_pb2.CommandsBatch()
+        for robot in request.robots:
+            batch.commands.add(connected=robot.id in connected, elect=robot.id in elect)
+        grpc_log.debug("{} of {} robots still connected", len(connected), len(request.robots),
+                       sample=HEARTBEAT_LOG_SAMPLE)
+        return batch
+
+    @metrics.timed("grpc_request_duration_seconds")
     def RegisterCaptain(self, request, context):
-        captain = {
-            "id": request.id,
-            "name": request.name
-        }
-        data["captain"] = captain
-        print(f"[gRPC] New captain elected ({request.id})")
+        # Captains of an election older than the registered one are rejected
+        if not self.robots.elect_captain(request.id, request.name, request.epoch):
+            grpc_log.warning("Captain ({}) of outdated epoch {} rejected", request.id, request.epoch)
+            return robot_service_pb2.Status(success=False)
+        if self.cluster is not None:
+            self.cluster.captain_changed()
+        duration = self.elections.captain_registered(request.id)
+        if duration is not None:
+            metrics.observe("election_duration_seconds", (), duration)
+        if duration is None:
+            grpc_log.info("New captain elected ({})", request.id)
+        else:
+            grpc_log.info("New captain elected ({}) after {:.3f}s", request.id, duration)
+        return robot_service_pb2.Status(success=True)
+
+    @metrics.timed("grpc_request_duration_seconds")
+    def GetCluster(self, request, context):
+        # Shards and ring parameters for robots to find the shard owning their ID
+        if self.cluster is None:
+            return robot_service_pb2.ClusterMap()
+        return robot_service_pb2.ClusterMap(
+            shards=[robot_service_pb2.Shard(node=node, address=address)
+                    for node, address in sorted(self.cluster.members.items())],
+            replicas=self.cluster.ring.replicas
+        )
+
+    def seen(self, robot_id):
+        self.liveness.heartbeat(robot_id)
+        self.elections.heartbeat(robot_id)
+        relay((robot_id,))
+
+    def seen_many(self, robot_ids):
+        self.liveness.heartbeat_many(robot_ids)
+        self.elections.heartbeat_many(robot_ids)
+        relay(robot_ids)
+
+    def Session(self, request_iterator, context):
+        # A stream would hold one of the GRPC_WORKERS threads for the robot's
+        # lifetime, so a few robots would starve every other call: robots poll
+        # HealthCheck on the thread pool, Session streams need --aio
+        context.abort(grpc.StatusCode.UNIMPLEMENTED, "Session streams need the --aio server")
+
+    def session_heartbeat(self, request, opened):
+        # Answers a Session heartbeat, None if there is nothing to push
+        if request.id not in self.robots:
+            grpc_log.debug("Robot {} not connected", request.id)
+            return robot_service_pb2.Commands(connected=False)
+        if opened:
+            grpc_log.debug("Session opened ({})", request.id)
+
+        self.seen(request.id)
+        elect = self.elections.take(request.id)
+        if opened or elect:
+            return robot_service_pb2.Commands(connected=True, elect=elect,
+                                              heartbeat_interval=session_interval if opened else 0)
+        return None
+
+
+class ClusterServicer(robot_service_pb2_grpc.ClusterServiceServicer):
+    # Calls between the shards of a cluster
+    def __init__(self, servicer):
+        self.servicer = servicer
+
+    @metrics.timed("grpc_request_duration_seconds")
+    def Sync(self, request, context):
+        return shard_state(self.servicer.cluster.receive(shard_state_dict(request)))
+
+    @metrics.timed("grpc_request_duration_seconds")
+    def ClaimRobot(self, request, context):
+        robot = self.servicer.robots.claim(request.id, request.name)
+        if robot is None:
+            grpc_log.warning("Robot {} already registered", request.id)
+            return robot_service_pb2.Status(success=False)
+        self.servicer.seen(request.id)  # Expires if the robot never connects
+        grpc_log.info("Claimed robot ({}, {})", request.id, request.name)
         return robot_service_pb2.Status(success=True)
 
 
-def serve():
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    robot_service_pb2_grpc.add_RobotServiceServicer_to_server(RobotServicer(), server)
+def shard_state(state):
+    captain = state["captain"]
+    return robot_service_pb2.ShardState(
+        node=state["node"], robots=state["robots"], has_captain=captain is not None,
+        captain=robot_service_pb2.RobotData(**captain) if captain is not None else None,
+        captain_version=state["version"][0], captain_node=state["version"][1], captain_epoch=state["epoch"]
+    )
+
+
+def shard_state_dict(message):
+    return {"node": message.node, "robots": message.robots,
+            "captain": {"id": message.captain.id, "name": message.captain.name} if message.has_captain else None,
+            "epoch": message.captain_epoch, "version": (message.captain_version, message.captain_node)}
+
+
+def connect_cluster(node, members):
+    # ShardCluster with gRPC calls to the peers
+    stubs = {peer: robot_service_pb2_grpc.ClusterServiceStub(grpc.insecure_channel(address))
+             for peer, address in members.items() if peer != node}
+
+    def exchange(peer, state):
+        try:
+            return shard_state_dict(stubs[peer].Sync(shard_state(state), timeout=CLUSTER_TIMEOUT))
+        except grpc.RpcError:
+            return None
+
+    def claim(peer, robot_id, name):
+        try:
+            request = robot_service_pb2.RobotData(id=robot_id, name=name)
+            return stubs[peer].ClaimRobot(request, timeout=CLUSTER_TIMEOUT).success
+        except grpc.RpcError:
+            return False
+
+    return ShardCluster(node, members, registry, HashRing(members), exchange, claim)
+
+
+class RaftServicer(robot_service_pb2_grpc.RaftServiceServicer):
+    # Calls between the controllers of a Raft group, served on the node's Raft port
+    def __init__(self, node):
+        self.node = node
+
+    @metrics.timed("grpc_request_duration_seconds")
+    def RequestVote(self, request, context):
+        reply = self.node.handle_vote({"term": request.term, "candidate": request.candidate,
+                                       "last_log_index": request.last_log_index,
+                                       "last_log_term": request.last_log_term})
+        return robot_service_pb2.VoteReply(**reply)
+
+    @metrics.timed("grpc_request_duration_seconds")
+    def AppendEntries(self, request, context):
+        reply = self.node.handle_append({
+            "term": request.term, "leader": request.leader, "prev_log_index": request.prev_log_index,
+            "prev_log_term": request.prev_log_term, "leader_commit": request.leader_commit,
+            "entries": [(entry.term, json.loads(entry.command) if entry.command else None) for entry in request.entries],
+            "snapshot": json.loads(request.snapshot) if request.snapshot else None
+        })
+        return robot_service_pb2.AppendReply(**reply, seen=take_relayed())
+
+    @metrics.timed("grpc_request_duration_seconds")
+    def Propose(self, request, context):
+        # Write forwarded by a follower
+        try:
+            result, index = self.node.propose(json.loads(request.command))
+        except NotLeader as e:
+            context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+        except TimeoutError as e:
+            context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, str(e))
+        return robot_service_pb2.ProposalResult(index=index, result=json.dumps(result))
+
+
+def connect_raft(node, members, journal):
+    # RaftNode with gRPC calls to the other controllers and the registry front writing through it
+    stubs = {peer: robot_service_pb2_grpc.RaftServiceStub(grpc.insecure_channel(address, RAFT_CHANNEL_OPTIONS))
+             for peer, address in members.items() if peer != node}
+
+    def vote(peer, request):
+        try:
+            reply = stubs[peer].RequestVote(robot_service_pb2.VoteRequest(**request), timeout=RAFT_TIMEOUT)
+        except grpc.RpcError:
+            return None
+        return {"term": reply.term, "granted": reply.granted}
+
+    def append(peer, request):
+        entries = [robot_service_pb2.LogEntry(term=term, command="" if command is None else json.dumps(command))
+                   for term, command in request["entries"]]
+        message = robot_service_pb2.AppendRequest(
+            term=request["term"], leader=request["leader"], prev_log_index=request["prev_log_index"],
+            prev_log_term=request["prev_log_term"], entries=entries, leader_commit=request["leader_commit"],
+            snapshot="" if request["snapshot"] is None else json.dumps(request["snapshot"])
+        )
+        try:
+            reply = stubs[peer].AppendEntries(message, timeout=RAFT_TIMEOUT)
+        except grpc.RpcError:
+            return None
+        liveness.heartbeat_many(reply.seen)
+        return {"term": reply.term, "success": reply.success, "match_index": reply.match_index}
+
+    def forward(leader, command):
+        try:
+            reply = stubs[leader].Propose(robot_service_pb2.Proposal(command=json.dumps(command)),
+                                          timeout=COMMIT_TIMEOUT)
+        except grpc.RpcError as e:
+            if e.code() in (grpc.StatusCode.FAILED_PRECONDITION, grpc.StatusCode.UNAVAILABLE):
+                raise NotLeader(None)
+            raise
+        return json.loads(reply.result), reply.index
+
+    def apply(command):
+        # Every node tracks the robots it applies, so a new leader also evicts those of a lost node
+        result = apply_command(registry, command)
+        if command[0] == "register":
+            liveness.heartbeat(result["id"])
+        elif command[0] == "register_many":
+            liveness.heartbeat_many([robot["id"] for robot in result])
+        elif command[0] == "unregister":
+            liveness.remove(command[1])
+        return result
+
+    def restore(state):
+        registry.restore(state)
+        liveness.heartbeat_many([robot_id for robot_id, _ in state["robots"]])
+
+    def lead():
+        # Full timeout for every registered robot: heartbeats relayed so far went to the old leader
+        liveness.heartbeat_many([robot["id"] for robot in registry.snapshot()])
+
+    node = RaftNode(node, members, vote, append, apply, journal, on_leader=lead, save=registry.save, restore=restore)
+    return node, ReplicatedRegistry(registry, node, forward,
+                                    lambda seconds: metrics.observe("raft_commit_seconds", (), seconds))
+
+
+class Abort(Exception):
+    def __init__(self, code, details):
+        super().__init__(details)
+        self.code = code
+        self.details = details
+
+
+class ThreadContext:
+    # Context of a grpc.aio call for the sync RobotServicer methods: abort()
+    # raises Abort instead of returning a coroutine, the servicer awaits the
+    # real abort back on the event loop
+    def __init__(self, context):
+        self._context = context
+
+    def abort(self, code, details):
+        raise Abort(code, details)
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+
+async def offload(function, *args):
+    # Blocking call on the default executor, for the grpc_executor_in_flight gauge
+    global offloaded
+    offloaded += 1
+    try:
+        return await asyncio.to_thread(function, *args)
+    finally:
+        offloaded -= 1
+
+
+class AsyncRobotServicer(robot_service_pb2_grpc.RobotServiceServicer):
+    # grpc.aio variant sharing the RobotServicer state. The unary methods only
+    # touch the registry and never block, so they run inline on the event loop.
+    # Writes that wait for a WAL group commit or call another shard move to
+    # the default executor instead
+    def __init__(self, servicer):
+        self.servicer = servicer
+
+    async def write(self, method, request, context):
+        robots = self.servicer.robots
+        try:
+            if robots.journal is None and self.servicer.cluster is None and not isinstance(robots, ReplicatedRegistry):
+                return method(request, ThreadContext(context))
+            return await offload(method, request, ThreadContext(context))
+        except Abort as e:
+            await context.abort(e.code, e.details)
+
+    @metrics.timed("grpc_request_duration_seconds")
+    async def GetRobots(self, request, context):
+        robots = self.servicer.robots.snapshot()
+        if not robots:
+            grpc_log.info("No robots available")
+            return
+
+        for robot in robots:
+            yield robot_service_pb2.RobotData(id=robot["id"], name=robot["name"])
+            if self.servicer.delay:
+                await asyncio.sleep(self.servicer.delay)  # Simulated delay
+        grpc_log.info("All {} robots transferred", len(robots))
+
+    @metrics.timed("grpc_request_duration_seconds")
+    async def ListRobots(self, request, context):
+        try:
+            after_id, page_size = parse_page(request)
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+        sent = 0
+        for robots, next_id in self.servicer.robots.batches(after_id, page_size, request.name_prefix,
+                                                            self.servicer.batch_size):
+            sent += len(robots)
+            yield robot_batch(robots, next_id)
+        grpc_log.info("{} robots transferred in batches", sent)
+
+    async def RegisterRobot(self, request, context):
+        return await self.write(self.servicer.RegisterRobot, request, context)
+
+    async def RegisterRobots(self, request, context):
+        try:
+            check_batch(request)
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        return await self.write(self.servicer.RegisterRobots, request, context)
+
+    async def UnregisterRobot(self, request, context):
+        return await self.write(self.servicer.UnregisterRobot, request, context)
+
+    async def CheckRobot(self, request, context):
+        return self.servicer.CheckRobot(request, context)
+
+    async def GetCaptain(self, request, context):
+        return self.servicer.GetCaptain(request, context)
+
+    async def HealthCheck(self, request, context):
+        return self.servicer.HealthCheck(request, context)
+
+    async def HealthCheckBatch(self, request, context):
+        try:
+            check_batch(request)
+        except ValueError as e:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+        return self.servicer.HealthCheckBatch(request, context)
+
+    async def RegisterCaptain(self, request, context):
+        return await self.write(self.servicer.RegisterCaptain, request, context)
+
+    async def GetCluster(self, request, context):
+        return self.servicer.GetCluster(request, context)
+
+    @metrics.timed("grpc_request_duration_seconds")
+    async def Session(self, request_iterator, context):
+        outbox = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+
+        def send(command):
+            loop.call_soon_threadsafe(outbox.put_nowait, command)
+
+        async def receive():
+            robot_id = None
+            try:
+                async for request in request_iterator:
+                    command = self.servicer.session_heartbeat(request, robot_id is None)
+                    if robot_id is None:
+                        robot_id = request.id
+                        self.servicer.sessions.open(robot_id, send)
+                    if command is not None:
+                        outbox.put_nowait(command)
+            finally:
+                if robot_id is not None:
+                    self.servicer.sessions.close(robot_id, send)
+                outbox.put_nowait(None)
+
+        receiver = asyncio.create_task(receive())
+        try:
+            while (command := await outbox.get()) is not None:
+                yield command
+        finally:
+            receiver.cancel()
+
+
+class AsyncClusterServicer(robot_service_pb2_grpc.ClusterServiceServicer):
+    # Both calls may wait for the WAL, so they run on the default executor
+    def __init__(self, servicer):
+        self.cluster_servicer = ClusterServicer(servicer)
+
+    async def Sync(self, request, context):
+        return await offload(self.cluster_servicer.Sync, request, context)
+
+    async def ClaimRobot(self, request, context):
+        return await offload(self.cluster_servicer.ClaimRobot, request, context)
+
+
+def serve(servicer):
+    executor = futures.ThreadPoolExecutor(max_workers=GRPC_WORKERS)
+    metrics.gauge("grpc_executor_queue_depth", "gRPC calls waiting for a worker thread",
+                  lambda: executor._work_queue.qsize())
+    server = grpc.server(executor)
+    robot_service_pb2_grpc.add_RobotServiceServicer_to_server(servicer, server)
+    if servicer.cluster is not None:
+        robot_service_pb2_grpc.add_ClusterServiceServicer_to_server(ClusterServicer(servicer), server)
     server.add_insecure_port(f"[::]:{GRPC_PORT}")
     server.start()
-    print(f"[gRPC] Server running on port {GRPC_PORT}")
+    grpc_log.info("Server running on port {}", GRPC_PORT)
 
     shutdown_event.wait()
-    print("[gRPC] Server stopping...")
+    grpc_log.info("Server stopping...")
     server.stop(0)
     # server.wait_for_termination()
 
 
-def handle_http_request(request):
-    try:
-        lines = request.split("\r\n")
-        method, path, _ = lines[0].split()
-        if method == "GET":
-            # Amount of active robots
-            if path == "/status":
-                return "HTTP/1.1 200 OK\r\n\r\n" + str(len(data["robots"]))
-            # Current captain
-            elif path == "/captain":
-                return "HTTP/1.1 200 OK\r\n\r\n" + str(data["captain"])
-            # Controller status
-            elif path == "/health":
-                return "HTTP/1.1 200 OK\r\n\r\n" + str(data["health"])
-            else:
-                return "HTTP/1.1 404 Not Found\r\n\r\nInvalid Endpoint"
-        elif method == "POST":
-            # Captain election
-            if path == "/electCaptain":
-                if not data["robots"]:
-                    return "HTTP/1.1 400 Bad Request\r\n\r\nNo robot available"
-                else:
-                    global electionNeeded
-                    electionNeeded = True
-                    return "HTTP/1.1 200 OK\r\n\r\nNew captain election started"
-            else:
-                return "HTTP/1.1 404 Not Found\r\n\r\nInvalid Endpoint"
-        else:
-            return "HTTP/1.1 405 Method Not Allowed\r\n\r\nUnsupported Method"
-    except Exception as e:
-        return f"HTTP/1.1 500 Internal Server Error\r\n\r\nError: {e}"
+async def serve_async(servicer):
+    # No thread pool of its own: the calls moved to the default executor stand in for its queue
+    metrics.gauge("grpc_executor_in_flight", "gRPC calls running or waiting on the default executor",
+                  lambda: offloaded)
+    server = grpc.aio.server()
+    robot_service_pb2_grpc.add_RobotServiceServicer_to_server(AsyncRobotServicer(servicer), server)
+    if servicer.cluster is not None:
+        robot_service_pb2_grpc.add_ClusterServiceServicer_to_server(AsyncClusterServicer(servicer), server)
+    server.add_insecure_port(f"[::]:{GRPC_PORT}")
+    await server.start()
+    grpc_log.info("Async server running on port {}", GRPC_PORT)
+
+    await asyncio.get_running_loop().run_in_executor(None, shutdown_event.wait)
+    grpc_log.info("Server stopping...")
+    await server.stop(0)
+
+
+def serve_aio(servicer):
+    asyncio.run(serve_async(servicer))
+
+
+def serve_raft(node, port):
+    # Own server and workers, so robot calls never hold up votes and heartbeats
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=RAFT_WORKERS))
+    robot_service_pb2_grpc.add_RaftServiceServicer_to_server(RaftServicer(node), server)
+    server.add_insecure_port(f"[::]:{port}")
+    server.start()
+    grpc_log.info("Raft server running on port {}", port)
+
+    shutdown_event.wait()
+    server.stop(0)
+
+
+def versioned(render, cached=True):
+    # Route answering with the registry version as ETag: 304 without rendering
+    # when the client already has it, otherwise the cached rendering of this
+    # version. The HTTP server runs on one event loop thread, so no lock
+    cache = {"version": None, "response": None}
+
+    def route(query, fields, body):
+        version = registry.version
+        etag = f'"{version}"'
+        if etag_matches(fields, etag):
+            return not_modified(etag)
+        if not cached:
+            return json_response("200 OK", render(query), etag)
+        if cache["version"] != version:
+            cache["response"] = json_response("200 OK", render(query), etag)
+            cache["version"] = version
+        return cache["response"]
+    return route
+
+
+# Amount of active robots
+@versioned
+def get_status(query):
+    return {"robots": len(registry)}
+
+
+# Robots of all shards, peer counts are at most one sync interval old
+def get_cluster_status(query, fields, body):
+    return json_response("200 OK", cluster.status())
+
+
+# Raft role, term, leader, log indexes and the last failover time
+def get_raft(query, fields, body):
+    return json_response("200 OK", raft_node.status())
+
+
+# Current captain
+@versioned
+def get_captain(query):
+    return registry.captain
+
+
+# Page of robots: ?page_token=&page_size=&name_prefix=
+def get_robots(query):
+    params = urllib.parse.parse_qs(query.decode())
+    after_id = int(params["page_token"][0]) if "page_token" in params else -1
+    page_size = min(int(params.get("page_size", [0])[0]) or PAGE_SIZE, MAX_PAGE_SIZE)  # 0 as in parse_page
+    if page_size < 0:
+        raise ValueError("Invalid page size")
+    robots, next_id = registry.page(after_id, page_size, params.get("name_prefix", [""])[0])
+    return {"robots": robots, "next_page_token": None if next_id is None else str(next_id)}
+
+
+# Running or last captain election
+def get_election(query, fields, body):
+    return json_response("200 OK", elections.status())
+
+
+# Prometheus metrics
+def get_metrics(query, fields, body):
+    return response("200 OK", metrics.render(), "text/plain; version=0.0.4")
+
+
+# Captain election
+def post_elect_captain(query, fields, body):
+    election = elections.start()
+    if election is None:
+        return NO_ROBOT_AVAILABLE
+    return json_response("200 OK", {"message": "New captain election started", "election": election["id"]})
+
+
+# Stops every robot with a Session on this controller
+def post_shutdown(query, fields, body):
+    robots = sessions.broadcast(robot_service_pb2.Commands(connected=True, shutdown=True))
+    return json_response("200 OK", {"message": "Shutdown sent", "robots": robots})
+
+
+# Health-check interval of the robots with a Session on this controller: ?seconds=
+def post_heartbeat_interval(query, fields, body):
+    global session_interval
+    params = urllib.parse.parse_qs(query.decode())
+    seconds = int(params.get("seconds", ["0"])[0])
+    if not 0 < seconds <= SESSION_INTERVAL:
+        raise ValueError(f"Heartbeat interval must be 1 to {SESSION_INTERVAL} seconds")  # Liveness timeout
+    session_interval = seconds
+    robots = sessions.broadcast(robot_service_pb2.Commands(connected=True, heartbeat_interval=seconds))
+    return json_response("200 OK", {"message": f"Heartbeat interval set to {seconds}s", "robots": robots})
+
+
+HEALTH = json_response("200 OK", {"health": data["health"]})
+NO_ROBOT_AVAILABLE = json_response("400 Bad Request", {"error": "No robot available"})
+NOT_FOUND = json_response("404 Not Found", {"error": "Invalid Endpoint"})
+METHOD_NOT_ALLOWED = json_response("405 Method Not Allowed", {"error": "Unsupported Method"})
+
+routes = {
+    (b"GET", b"/status"): get_status,
+    (b"GET", b"/captain"): get_captain,
+    (b"GET", b"/robots"): versioned(get_robots, cached=False),
+    (b"GET", b"/health"): lambda query, fields, body: HEALTH,
+    (b"GET", b"/election"): get_election,
+    (b"GET", b"/metrics"): get_metrics,
+    (b"POST", b"/electCaptain"): post_elect_captain,
+    (b"POST", b"/shutdown"): post_shutdown,
+    (b"POST", b"/heartbeatInterval"): post_heartbeat_interval,
+}
+route_methods = {method for method, _ in routes}
+
+
+def handle_http_request(method, target, fields, body):
+    start = time.perf_counter()
+    path, _, query = target.partition(b"?")
+    route = routes.get((method, path))
+    if route is None:
+        result = NOT_FOUND if method in route_methods else METHOD_NOT_ALLOWED
+        path = b"unmatched"  # Keeps unknown paths from creating new series
+    else:
+        try:
+            result = route(query, fields, body)
+        except ValueError as e:
+            result = json_response("400 Bad Request", {"error": str(e)})
+        except Exception as e:
+            result = json_response("500 Internal Server Error", {"error": str(e)})
+    metrics.observe("http_request_duration_seconds", (("route", path.decode()), ("status", result[9:12].decode())),
+                    time.perf_counter() - start)
+    return result
 
 
 def serve_http():
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind((HTTP_HOST, HTTP_PORT))
-        s.listen()
-        s.settimeout(1)
-        print(f"[HTTP] Server running on {HTTP_HOST}:{HTTP_PORT}")
-        while not shutdown_event.is_set():
-            try:
-                conn, addr = s.accept()
-                with conn:
-                    print(f"[HTTP] Connected by {addr}")
-                    request = conn.recv(1024).decode()
-                    response = handle_http_request(request)
-                    conn.sendall(response.encode())
-            except socket.timeout:
-                continue
-        print("[HTTP] Server stopping...")
+    asyncio.run(serve_requests(HTTP_HOST, HTTP_PORT, handle_http_request, shutdown_event))
 
 
 shutdown_event = threading.Event()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Robot controller")
+    parser.add_argument("--production", action="store_true", help="disable the simulated GetRobots delay")
+    parser.add_argument("--aio", action="store_true", help="serve gRPC on a grpc.aio event loop instead of a thread pool")
+    parser.add_argument("--log-level", type=str.upper, choices=logger.LEVELS, help="log level of all subsystems (default INFO)")
+    parser.add_argument("--log-levels", default="", help="per-subsystem levels, e.g. gRPC=DEBUG,HTTP=WARNING")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="robots per streamed ListRobots batch")
+    parser.add_argument("--data-dir", help="persist robots and captain in a write-ahead log in this directory")
+    parser.add_argument("--snapshot-every", type=int, default=SNAPSHOT_EVERY, help="log records between compacted snapshots")
+    parser.add_argument("--grpc-port", type=int, default=GRPC_PORT, help="gRPC port (default 50051)")
+    parser.add_argument("--http-port", type=int, default=HTTP_PORT, help="REST port (default 8080)")
+    parser.add_argument("--cluster", help="gRPC addresses of all shards as name=host:port,...")
+    parser.add_argument("--raft", help="Raft addresses of all controllers of a replicated group as name=host:port,...")
+    parser.add_argument("--node", help="name of this controller in --cluster or --raft")
+    args = parser.parse_args()
+    logger.configure(args.log_level, args.log_levels)
+    GRPC_PORT, HTTP_PORT = args.grpc_port, args.http_port
+
+    def parse_members(spec, flag):
+        try:
+            members = dict(member.split("=", 1) for member in spec.split(","))
+        except ValueError:
+            parser.error(f"{flag} expects name=host:port,...")
+        if args.node not in members:
+            parser.error(f"--node must name one of the {flag} members")
+        return members
+
+    if args.cluster and args.raft:
+        parser.error("--cluster and --raft cannot be combined")
+
+    journal = None
+    if args.data_dir:
+        journal = WriteAheadLog(args.data_dir, args.snapshot_every)
+        metrics.gauge("wal_writes_total", "Write-ahead log records, group commits (one fsync each) and snapshots",
+                      lambda: {(("kind", key),): journal.stats[key] for key in ("records", "commits", "snapshots")},
+                      kind="counter")
+    if journal is not None and not args.raft:
+        start = time.perf_counter()
+        replayed = registry.recover(journal)
+        controller_log.info("Recovered {} robots from {} ({} log records) in {:.3f}s",
+                            len(registry), args.data_dir, replayed, time.perf_counter() - start)
+        for robot in registry.snapshot():
+            liveness.heartbeat(robot["id"])  # Robots that do not come back expire
+
+    raft_thread = None
+    if args.raft:
+        members = parse_members(args.raft, "--raft")
+        raft_node, replicated = connect_raft(args.node, members, journal)
+        controller_log.info("Raft node {} of {}, {} log entries recovered", args.node, ", ".join(sorted(members)),
+                            raft_node.recover())
+        routes[(b"GET", b"/raft")] = get_raft
+        metrics.describe("raft_commit_seconds", "histogram", "Registry write until committed and applied locally")
+        metrics.gauge("raft_term", "Current Raft term", lambda: raft_node.term)
+        metrics.gauge("raft_leader", "1 on the Raft leader", lambda: int(raft_node.is_leader))
+        metrics.gauge("raft_last_failover_seconds", "Last leader contact until a new leader was known",
+                      lambda: raft_node.stats["last_failover"] or 0)
+        raft_thread = threading.Thread(target=serve_raft, args=(raft_node, members[args.node].rpartition(":")[2]),
+                                       daemon=True)
+
+    if args.cluster:
+        members = parse_members(args.cluster, "--cluster")
+        cluster = connect_cluster(args.node, members)
+        routes[(b"GET", b"/status")] = get_cluster_status
+        controller_log.info("Shard {} of {}", args.node, ", ".join(sorted(members)))
+
     def handle_termination(signum, frame):
-        print("[Controller] All servers stopping...")
+        controller_log.info("All servers stopping...")
         shutdown_event.set()
 
 
     signal.signal(signal.SIGINT, handle_termination)
     signal.signal(signal.SIGTERM, handle_termination)
 
-    grpc_thread = threading.Thread(target=serve, daemon=True)
+    servicer = RobotServicer(registry if replicated is None else replicated,
+                             delay=0 if args.production else GET_ROBOTS_DELAY, batch_size=args.batch_size,
+                             shard_cluster=cluster)
+    grpc_thread = threading.Thread(target=serve_aio if args.aio else serve, args=(servicer,), daemon=True)
     http_thread = threading.Thread(target=serve_http, daemon=True)
+    liveness.start()
     grpc_thread.start()
     http_thread.start()
+    if cluster is not None:
+        cluster.start()
+    if raft_thread is not None:
+        raft_thread.start()
+        raft_node.start()
 
     while not shutdown_event.is_set():
         time.sleep(0.5)
     grpc_thread.join()
     http_thread.join()
-    print("[Controller] All servers stopped")
\ No newline at end of file
+    liveness.stop()
+    if cluster is not None:
+        cluster.stop()
+    if raft_thread is not None:
+        raft_thread.join()
+        raft_node.stop()
+    if journal is not None:
+        journal.close()
+    controller_log.info("All servers stopped")
\ No newline at end of file
@@ -0,0 +1,172 @@
+import threading
+import time
+
+ELECTION_TIMEOUT = 10  # Seconds for a captain to register per attempt
+MAX_ATTEMPTS = 3
+HEALTHY_WINDOW = 30  # Seconds since the last heartbeat to count as healthy
+
+
+class ElectionManager:
+    # One election at a time. The elect command goes to the most responsive
+    # healthy robot and is retried on another robot when no captain registers
+    # before the deadline
+
+    def __init__(self, robots, hub, command, poll_interval, timeout=ELECTION_TIMEOUT,
+                 attempts=MAX_ATTEMPTS, healthy_window=HEALTHY_WINDOW):
+        self._lock = threading.Lock()
+        self.robots = robots
+        self.sessions = hub
+        self.command = command  # Commands message carrying elect=True
+        self.poll_interval = poll_interval  # Delivery delay for robots without a session
+        self.timeout = timeout
+        self.attempts = attempts
+        self.healthy_window = healthy_window
+        self._seen = {}  # id -> [last heartbeat, last gap, jitter]
+        self._pending = {}  # id -> election id, delivered on the next HealthCheck
+        self._next_id = 0
+        self._timer = None
+        self.current = None
+        self.last = None
+        self.stats = {"started": 0, "completed": 0, "failed": 0, "retries": 0,
+                      "last_duration": None, "total_duration": 0.0}
+
+    ## Robot liveness ##
+
+    def heartbeat(self, robot_id):
+        self.heartbeat_many((robot_id,))
+
+    def heartbeat_many(self, robot_ids):
+        # Heartbeat jitter (EWMA of the change between gaps) serves as latency estimate
+        now = time.monotonic()
+        with self._lock:
+            for robot_id in robot_ids:
+                seen = self._seen.get(robot_id)
+                if seen is None:
+                    self._seen[robot_id] = [now, None, 0.0]
+                    continue
+                gap = now - seen[0]
+                if seen[1] is not None:
+                    seen[2] = 0.8 * seen[2] + 0.2 * abs(gap - seen[1])
+                seen[0], seen[1] = now, gap
+
+    def forget(self, robot_id):
+        with self._lock:
+            self._seen.pop(robot_id, None)
+            self._pending.pop(robot_id, None)
+
+    def take(self, robot_id):
+        # True if an elect command is waiting for this robot's next poll
+        with self._lock:
+            election_id = self._pending.pop(robot_id, None)
+            return election_id is not None and self.current is not None and self.current["id"] == election_id
+
+    def take_many(self, robot_ids):
+        # The robots among robot_ids with an elect command waiting
+        taken = set()
+        with self._lock:
+            if not self._pending:
+                return taken
+            for robot_id in robot_ids:
+                election_id = self._pending.pop(robot_id, None)
+                if election_id is not None and self.current is not None and self.current["id"] == election_id:
+                    taken.add(robot_id)
+        return taken
+
+    ## Elections ##
+
+    def start(self):
+        # Returns the running election (new or already in progress), None if no robot can take it
+        with self._lock:
+            if self.current is not None:
+                return self._record(self.current)
+            election = {"id": self._next_id, "initiator": None, "attempt": 0, "tried": set(),
+                        "started": time.monotonic(), "deadline": None, "state": "running"}
+            self._next_id += 1
+            self.current = election
+            self.stats["started"] += 1
+            if not self._dispatch(election):
+                return None
+            return self._record(election)
+
+    def captain_registered(self, robot_id):
+        # Completes the running election and returns its duration (None if none was running)
+        with self._lock:
+            election = self.current
+            if election is None:
+                return None
+            duration = time.monotonic() - election["started"]
+            election["captain"] = robot_id
+            self._finish(election, "completed", duration)
+            self.stats["completed"] += 1
+            self.stats["last_duration"] = duration
+            self.stats["total_duration"] += duration
+            return duration
+
+    def status(self):
+        with self._lock:
+            election = self.current or self.last
+            return self._record(election) if election is not None else None
+
+    def _dispatch(self, election):
+        # Lock held: send the command to the next initiator and arm the deadline
+        robot_id = self._choose(election["tried"])
+        if robot_id is None:
+            self._finish(election, "failed", time.monotonic() - election["started"])
+            self.stats["failed"] += 1
+            return False
+
+        election["initiator"] = robot_id
+        election["attempt"] += 1
+        election["tried"].add(robot_id)
+        timeout = self.timeout
+        if not self.sessions.send(robot_id, self.command):
+            self._pending[robot_id] = election["id"]
+            timeout += self.poll_interval
+        election["deadline"] = time.monotonic() + timeout
+        self._timer = threading.Timer(timeout, self._expire, (election["id"], election["attempt"]))
+        self._timer.daemon = True
+        self._timer.start()
+        return True
+
+    def _choose(self, tried):
+        # Robots with a session first (immediate delivery), then lowest heartbeat jitter
+        now = time.monotonic()
+        best, best_key = None, None
+        for robot_id, (last_seen, _, jitter) in self._seen.items():
+            if robot_id in tried or robot_id not in self.robots or now - last_seen > self.healthy_window:
+                continue
+            key = (robot_id not in self.sessions, jitter)
+            if best_key is None or key < best_key:
+                best, best_key = robot_id, key
+        return best
+
+    def _expire(self, election_id, attempt):
+        with self._lock:
+            election = self.current
+            if election is None or election["id"] != election_id or election["attempt"] != attempt:
+                return
+            self._pending.pop(election["initiator"], None)
+            if attempt >= self.attempts:
+                self._finish(election, "failed", time.monotonic() - election["started"])
+                self.stats["failed"] += 1
+                return
+            self.stats["retries"] += 1
+            self._dispatch(election)
+
+    def _finish(self, election, state, duration):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if election.get("initiator") is not None:
+            self._pending.pop(election["initiator"], None)
+        election["state"] = state
+        election["duration"] = duration
+        self.current = None
+        self.last = election
+
+    @staticmethod
+    def _record(election):
+        record = {key: election[key] for key in ("id", "initiator", "attempt", "state")}
+        if "duration" in election:
+            record["duration"] = round(election["duration"], 3)
+        return record
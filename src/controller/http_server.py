@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+from common import logger
+
+MAX_HEADER_SIZE = 64 * 1024  # Request line and headers
+MAX_BODY_SIZE = 1024 * 1024
+KEEP_ALIVE_TIMEOUT = 5  # Seconds an idle connection stays open
+
+http_log = logger.get_logger("HTTP")
+
+
+def response(status, body="", content_type="text/plain; charset=utf-8", etag=None):
+    # Complete HTTP/1.1 response with Content-Length, ready to be written
+    if isinstance(body, str):
+        body = body.encode()
+    head = f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+    if etag is not None:
+        head += f"ETag: {etag}\r\n"
+    return head.encode() + b"\r\n" + body
+
+
+def json_response(status, payload, etag=None):
+    return response(status, json.dumps(payload, separators=(",", ":")), "application/json", etag)
+
+
+def not_modified(etag):
+    return f"HTTP/1.1 304 Not Modified\r\nETag: {etag}\r\n\r\n".encode()
+
+
+def etag_matches(fields, etag):
+    # If-None-Match against one strong ETag; weak validators compare equal too
+    match = header(fields, b"if-none-match")
+    if match is None:
+        return False
+    tags = [tag.strip().removeprefix(b"w/") for tag in match.split(b",")]
+    return b"*" in tags or etag.encode() in tags
+
+
+HEADERS_TOO_LARGE = json_response("431 Request Header Fields Too Large", {"error": "Request headers too large"})
+BAD_REQUEST = json_response("400 Bad Request", {"error": "Malformed request"})
+BODY_TOO_LARGE = json_response("413 Content Too Large", {"error": "Request body too large"})
+
+
+def header(fields, name):
+    # Value of one header from the lowercased header block, None if missing.
+    # Only the headers a request actually needs are looked up, nothing is split
+    start = fields.find(b"\r\n" + name + b":")
+    if start < 0:
+        return None
+    start += len(name) + 3
+    end = fields.find(b"\r\n", start)
+    return fields[start:end].strip()
+
+
+def keep_alive(version, fields):
+    connection = header(fields, b"connection")
+    if version == b"HTTP/1.0":
+        return connection == b"keep-alive"
+    return connection != b"close"
+
+
+async def handle_connection(reader, writer, handler):
+    # Serves requests in order until the client closes, asks to close or idles.
+    # Pipelined requests are already buffered in the reader and answered in turn
+    http_log.debug("Connected by {}", writer.get_extra_info("peername"))
+    try:
+        while True:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                break
+            except asyncio.LimitOverrunError:
+                writer.write(HEADERS_TOO_LARGE)
+                break
+
+            try:
+                end = head.find(b"\r\n")
+                method, path, version = head[:end].split()
+                fields = head[end:].lower()
+                length = int(header(fields, b"content-length") or 0)
+            except ValueError:
+                writer.write(BAD_REQUEST)
+                break
+            if length < 0 or length > MAX_BODY_SIZE:
+                writer.write(BODY_TOO_LARGE)
+                break
+            try:
+                # A body that is withheld or trickled in must not hold the connection
+                body = await asyncio.wait_for(reader.readexactly(length), KEEP_ALIVE_TIMEOUT) if length else b""
+            except asyncio.TimeoutError:
+                break
+
+            writer.write(handler(method, path, fields, body))
+            if not keep_alive(version, fields):
+                break
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_requests(host, port, handler, stop_event):
+    server = await asyncio.start_server(lambda reader, writer: handle_connection(reader, writer, handler),
+                                        host, port, limit=MAX_HEADER_SIZE, reuse_address=True)
+    http_log.info("Server running on {}:{}", host, port)
+    await asyncio.get_running_loop().run_in_executor(None, stop_event.wait)
+    http_log.info("Server stopping...")
+    server.close()
+    server.close_clients()  # Idle keep-alive connections would hold up the shutdown
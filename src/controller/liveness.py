@@ -0,0 +1,80 @@
+import threading
+import time
+
+
+class LivenessTracker:
+    # Hashed timer wheel: a heartbeat moves the robot to the slot of its new
+    # deadline in O(1) and the ticker only visits the slots that came due
+
+    def __init__(self, timeout, on_expire, tick=1.0):
+        self.timeout = timeout
+        self.tick = tick
+        self.on_expire = on_expire
+        self._lock = threading.Lock()
+        self._slots = [set() for _ in range(int(timeout / tick) + 3)]
+        self._deadlines = {}  # id -> deadline tick
+        self._processed = None  # Last tick handled by expire()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def heartbeat(self, robot_id, now=None):
+        self.heartbeat_many((robot_id,), now)
+
+    def heartbeat_many(self, robot_ids, now=None):
+        now = time.monotonic() if now is None else now
+        deadline = int((now + self.timeout) / self.tick) + 1
+        with self._lock:
+            for robot_id in robot_ids:
+                previous = self._deadlines.get(robot_id)
+                if previous == deadline:
+                    continue
+                if previous is not None:
+                    self._slots[previous % len(self._slots)].discard(robot_id)
+                self._slots[deadline % len(self._slots)].add(robot_id)
+                self._deadlines[robot_id] = deadline
+
+    def remove(self, robot_id):
+        with self._lock:
+            deadline = self._deadlines.pop(robot_id, None)
+            if deadline is not None:
+                self._slots[deadline % len(self._slots)].discard(robot_id)
+
+    def expire(self, now=None):
+        # Pops and returns every robot whose deadline tick has passed
+        now = time.monotonic() if now is None else now
+        current = int(now / self.tick)
+        expired = []
+        with self._lock:
+            size = len(self._slots)
+            first = current - size + 1
+            if self._processed is not None:
+                first = max(first, self._processed + 1)
+            for tick in range(first, current + 1):
+                slot = self._slots[tick % size]
+                # After a long stall a slot can also hold deadlines one lap ahead
+                due = [robot_id for robot_id in slot if self._deadlines[robot_id] <= current]
+                for robot_id in due:
+                    slot.discard(robot_id)
+                    del self._deadlines[robot_id]
+                expired += due
+            self._processed = current if self._processed is None else max(self._processed, current)
+        return expired
+
+    ## Ticker thread ##
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            for robot_id in self.expire():
+                self.on_expire(robot_id)
@@ -0,0 +1,141 @@
+import bisect
+import functools
+import inspect
+import threading
+import time
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class Metrics:
+    # Counters and fixed-bucket histograms without locks: every thread writes
+    # only its own shard and a scrape sums the shards. Gauges are callbacks
+    # evaluated at scrape time
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []  # one {(name, labels): values} dict per thread
+        self._gauges = {}  # name -> (type, help, callback)
+        self._help = {}  # name -> (type, help)
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            self._shards.append(shard)
+        return shard
+
+    ## Recording ##
+
+    def inc(self, name, labels=(), value=1):
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name, labels, seconds):
+        # Histogram values: bucket counts, then sum and count
+        shard = self._shard()
+        values = shard.get((name, labels))
+        if values is None:
+            values = shard[(name, labels)] = [0] * (len(self.buckets) + 3)
+        values[bisect.bisect_left(self.buckets, seconds)] += 1
+        values[-2] += seconds
+        values[-1] += 1
+
+    def describe(self, name, kind, help):
+        self._help[name] = (kind, help)
+
+    def gauge(self, name, help, callback, kind="gauge"):
+        # Sampled at scrape time, callback returns a number or a {labels: number} dict
+        self._gauges[name] = (kind, help, callback)
+
+    def timed(self, name, label="method"):
+        # Decorator observing the call duration, for streaming calls until the stream ends
+        def decorate(function):
+            labels = ((label, function.__name__),)
+            if inspect.isasyncgenfunction(function):
+                @functools.wraps(function)
+                async def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        async for item in function(*args, **kwargs):
+                            yield item
+                    finally:
+                        self.observe(name, labels, time.perf_counter() - start)
+            elif inspect.isgeneratorfunction(function):
+                @functools.wraps(function)
+                def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        yield from function(*args, **kwargs)
+                    finally:
+                        self.observe(name, labels, time.perf_counter() - start)
+            elif inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return await function(*args, **kwargs)
+                    finally:
+                        self.observe(name, labels, time.perf_counter() - start)
+            else:
+                @functools.wraps(function)
+                def wrapper(*args, **kwargs):
+                    start = time.perf_counter()
+                    try:
+                        return function(*args, **kwargs)
+                    finally:
+                        self.observe(name, labels, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    ## Exposition ##
+
+    def collect(self):
+        # Sums all shards: {(name, labels): count or histogram values}
+        totals = {}
+        for shard in list(self._shards):
+            for key, value in shard.copy().items():
+                if isinstance(value, list):
+                    total = totals.get(key)
+                    totals[key] = value[:] if total is None else [a + b for a, b in zip(total, value)]
+                else:
+                    totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def render(self):
+        # Prometheus text exposition format (version 0.0.4)
+        families = {}
+        for (name, labels), value in sorted(self.collect().items()):
+            families.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, samples in families.items():
+            kind = "histogram" if isinstance(samples[0][1], list) else "counter"
+            lines.append(f"# HELP {name} {self._help.get(name, (kind, name))[1]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind == "counter":
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (("le", str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{format_labels(labels)} {value[-2]}")
+                lines.append(f"{name}_count{format_labels(labels)} {value[-1]}")
+
+        for name, (kind, help, callback) in self._gauges.items():
+            value = callback()
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, sample in (value.items() if isinstance(value, dict) else [((), value)]):
+                lines.append(f"{name}{format_labels(labels)} {sample}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
@@ -0,0 +1,529 @@
+import random
+import threading
+import time
+
+ELECTION_TIMEOUT = (0.3, 0.6)  # Seconds without leader contact before a follower runs, randomized
+HEARTBEAT_INTERVAL = 0.05  # Seconds between the leader's AppendEntries
+MAX_ENTRIES = 500  # Log entries per AppendEntries
+COMMIT_TIMEOUT = 5  # Seconds a write waits for its commit
+WRITE_ATTEMPTS = 3  # Leader changes a write survives
+
+FOLLOWER = "follower"
+CANDIDATE = "candidate"
+LEADER = "leader"
+
+
+class NotLeader(Exception):
+    def __init__(self, leader):
+        super().__init__(f"Not the Raft leader (leader: {leader})")
+        self.leader = leader
+
+
+class RaftNode:
+    # Raft consensus on a log of registry commands. The transport is passed
+    # in: vote(peer, request) and append(peer, request) return the peer's
+    # reply dict, None if it is unreachable. Every committed command is given
+    # to apply() in log order on every node. With a journal (WriteAheadLog)
+    # term, vote and entries are on disk before a node answers. on_leader()
+    # is called once a new leader has applied everything committed before it.
+    # A journal snapshot holds save() of the applied state instead of the log
+    # up to it; a follower behind that gets the state for restore() in an
+    # append request with a "snapshot"
+
+    def __init__(self, node, members, vote, append, apply, journal=None,
+                 election_timeout=ELECTION_TIMEOUT, heartbeat_interval=HEARTBEAT_INTERVAL, on_leader=None,
+                 save=None, restore=None):
+        self.node = node
+        self.peers = [member for member in members if member != node]
+        self.vote = vote
+        self.append = append
+        self.apply = apply
+        self.save = save
+        self.restore = restore
+        self.on_leader = on_leader
+        self.journal = journal
+        self.election_timeout = election_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self._cond = threading.Condition()
+        self._apply_lock = threading.Lock()  # Held while the state machine changes, before _cond
+        self.term = 0
+        self.voted_for = None
+        self.log = [(0, None)]  # (term, command) from index base on, log[0] is the snapshot's last entry
+        self.base = 0  # Last index in the snapshot, 0 without one
+        self._state = None  # save() at base, sent to followers behind it
+        self.commit_index = 0
+        self.last_applied = 0
+        self.role = FOLLOWER
+        self.leader = None
+        self._last_leader = None  # Survives elections, for the failover time
+        self._last_contact = None  # Last message from a leader
+        self._deadline = 0
+        self._next = {}  # peer -> next index to send (leader)
+        self._match = {}  # peer -> highest replicated index (leader)
+        self._durable = 0  # Highest own entry on disk, the leader's vote for commits
+        self._leader_entry = None  # Index of the entry opening this node's leadership
+        self._waiting = set()  # Indexes proposed on this node
+        self._results = {}  # index -> apply() result for proposals
+        self._triggers = {peer: threading.Event() for peer in self.peers}
+        self._stop = threading.Event()
+        self._threads = []
+        self.stats = {"elections": 0, "leader_changes": 0, "last_failover": None, "applied": 0}
+
+    @property
+    def is_leader(self):
+        return self.role == LEADER
+
+    def status(self):
+        with self._cond:
+            return {"node": self.node, "role": self.role, "term": self.term, "leader": self.leader,
+                    "log": self._last_index(), "snapshot": self.base, "commit_index": self.commit_index,
+                    "last_applied": self.last_applied, **self.stats}
+
+    ## Persistence ##
+
+    def recover(self):
+        # Loads term, vote, snapshot and log from the journal, returns the last index
+        if self.journal is None:
+            return 0
+        snapshot, records = self.journal.replay()
+        with self._apply_lock, self._cond:
+            if snapshot is not None:
+                self.term, self.voted_for = snapshot["term"], snapshot["vote"]
+                self.base = snapshot.get("index", 0)  # Snapshots without a state hold the whole log
+                self.log = [(snapshot.get("index_term", 0), None)] + [tuple(entry) for entry in snapshot["log"]]
+                if "state" in snapshot:
+                    self._restore(self.base, self.log[0][0], snapshot["state"])
+            for op, *values in records:
+                if op == "term":
+                    self.term, self.voted_for = values
+                elif op == "entry":
+                    index, term, command = values
+                    del self.log[index - self.base:]  # A rewritten index drops the entries after it
+                    self.log.append((term, command))
+                elif op == "snapshot":
+                    self._restore(*values)
+            self._durable = self._last_index()
+        self.journal.start(self._capture)
+        return self._last_index()
+
+    def _capture(self):
+        # The applied state and the entries after it, the log up to it is dropped
+        with self._apply_lock:
+            state = self.save()
+            with self._cond:
+                index = self.last_applied
+                self.log = self.log[index - self.base:]
+                self.base, self._state = index, state
+                snapshot = {"term": self.term, "vote": self.voted_for, "index": index, "index_term": self.log[0][0],
+                            "state": state, "log": self.log[1:]}
+                return snapshot, self.journal.appended
+
+    def _restore(self, index, term, state):
+        # Locks held: state at index from a snapshot, keeps the entries after it if the log goes on from there
+        if self.base <= index <= self._last_index() and self._term_at(index) == term:
+            self.log = self.log[index - self.base:]
+        else:
+            self.log = [(term, None)]
+        self.base, self._state = index, state
+        self.restore(state)
+        self.last_applied = index
+        self.commit_index = max(self.commit_index, index)
+
+    def _persist(self, *record):
+        # Lock held: queues the record, the caller waits for it after releasing the lock
+        return self.journal.append(record) if self.journal is not None else None
+
+    def _sync(self, seq):
+        if seq is not None:
+            self.journal.wait(seq)
+
+    ## Log ##
+
+    def _last_index(self):
+        return self.base + len(self.log) - 1
+
+    def _term_at(self, index):
+        return self.log[index - self.base][0]
+
+    ## Threads ##
+
+    def start(self):
+        with self._cond:
+            self._reset_deadline()
+        targets = [self._tick, self._apply_committed] + [lambda peer=peer: self._replicate(peer) for peer in self.peers]
+        self._threads = [threading.Thread(target=target, daemon=True) for target in targets]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for trigger in self._triggers.values():
+            trigger.set()
+        for thread in self._threads:
+            thread.join()
+
+    def _tick(self):
+        while not self._stop.wait(self.heartbeat_interval / 5):
+            with self._cond:
+                campaign = self.role != LEADER and time.monotonic() >= self._deadline
+            if campaign:
+                self._campaign()
+
+    def _apply_committed(self):
+        while True:
+            with self._cond:
+                while self.last_applied >= self.commit_index and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                first = self.last_applied + 1
+                entries = self.log[first - self.base:self.commit_index + 1 - self.base]  # Committed entries never change
+            with self._apply_lock:
+                if self.last_applied != first - 1:
+                    continue  # A snapshot was restored meanwhile
+                results = [self.apply(command) if command is not None else None for _, command in entries]
+                with self._cond:
+                    for index, (term, _), result in zip(range(first, first + len(entries)), entries, results):
+                        if index in self._waiting:
+                            self._results[index] = (term, result)
+                    self.last_applied = first + len(entries) - 1
+                    self.stats["applied"] += len(entries)
+                    self._cond.notify_all()
+                    leading = self.role == LEADER and first <= (self._leader_entry or 0) <= self.last_applied
+            if leading and self.on_leader is not None:
+                self.on_leader()
+
+    ## Elections ##
+
+    def _reset_deadline(self):
+        self._deadline = time.monotonic() + random.uniform(*self.election_timeout)
+
+    def _become_follower(self, term):
+        # Lock held: returns the seq of the new term record, if any
+        seq = None
+        if term > self.term:
+            self.term, self.voted_for = term, None
+            seq = self._persist("term", term, None)
+        if self.role == LEADER:
+            self.leader = None
+            self._last_contact = time.monotonic()  # Deposed, counts as the last leader contact
+        self.role = FOLLOWER
+        return seq
+
+    def _heard_from(self, leader):
+        now = time.monotonic()
+        self._new_leader(leader, now)
+        self.leader = leader
+        self._last_contact = now
+        self._reset_deadline()
+
+    def _new_leader(self, leader, now):
+        # Failover time: last contact with the old leader until the new one is known
+        if leader == self._last_leader:
+            return
+        self._cond.notify_all()  # Wakes writes waiting in wait_leader()
+        if self._last_leader is not None and self._last_contact is not None:
+            self.stats["last_failover"] = now - self._last_contact
+        self._last_leader = leader
+        self.stats["leader_changes"] += 1
+
+    def _campaign(self):
+        with self._cond:
+            self.role = CANDIDATE
+            self.leader = None
+            self.term += 1
+            self.voted_for = self.node
+            self._reset_deadline()
+            self.stats["elections"] += 1
+            seq = self._persist("term", self.term, self.node)
+            request = {"term": self.term, "candidate": self.node,
+                       "last_log_index": self._last_index(), "last_log_term": self.log[-1][0]}
+        self._sync(seq)
+        votes = [1]
+        if not self.peers:
+            self._count_vote(request, votes, granted=False)
+        for peer in self.peers:
+            threading.Thread(target=self._request_vote, args=(peer, request, votes), daemon=True).start()
+
+    def _request_vote(self, peer, request, votes):
+        reply = self.vote(peer, request)
+        if reply is None:
+            return
+        seq = None
+        with self._cond:
+            if reply["term"] > self.term:
+                seq = self._become_follower(reply["term"])
+        if seq is not None:
+            return self._sync(seq)
+        self._count_vote(request, votes, reply["granted"])
+
+    def _count_vote(self, request, votes, granted):
+        with self._cond:
+            if self.role != CANDIDATE or self.term != request["term"]:
+                return
+            votes[0] += granted
+            if votes[0] * 2 <= len(self.peers) + 1:
+                return
+            self.role = LEADER
+            self.leader = self.node
+            self._new_leader(self.node, time.monotonic())
+            self._next = {peer: self._last_index() + 1 for peer in self.peers}
+            self._match = {peer: 0 for peer in self.peers}
+            # An entry of the new term commits everything before it
+            self.log.append((self.term, None))
+            index, term = self._last_index(), self.term
+            self._leader_entry = index
+            seq = self._persist("entry", index, term, None)
+        self._wake_replicators()
+        self._sync(seq)
+        self._mark_durable(index, term)
+
+    def handle_vote(self, request):
+        with self._cond:
+            seq = None
+            if request["term"] > self.term:
+                seq = self._become_follower(request["term"])
+            up_to_date = (request["last_log_term"], request["last_log_index"]) >= (self.log[-1][0], self._last_index())
+            granted = (request["term"] == self.term and up_to_date
+                       and self.voted_for in (None, request["candidate"]))
+            if granted:
+                self.voted_for = request["candidate"]
+                seq = self._persist("term", self.term, self.voted_for)
+                self._reset_deadline()
+            reply = {"term": self.term, "granted": granted}
+        self._sync(seq)
+        return reply
+
+    ## Replication ##
+
+    def _wake_replicators(self):
+        for trigger in self._triggers.values():
+            trigger.set()
+
+    def _replicate(self, peer):
+        # One request in flight per peer; entries proposed meanwhile go out in the next batch
+        trigger = self._triggers[peer]
+        while not self._stop.is_set():
+            trigger.wait(self.heartbeat_interval)
+            trigger.clear()
+            with self._cond:
+                if self.role != LEADER:
+                    continue
+                prev = self._next[peer] - 1
+                if prev < self.base:  # Compacted away: the peer gets the snapshot instead
+                    request = {"term": self.term, "leader": self.node, "prev_log_index": self.base,
+                               "prev_log_term": self.log[0][0], "entries": [], "leader_commit": self.commit_index,
+                               "snapshot": self._state}
+                else:
+                    start = prev + 1 - self.base
+                    request = {"term": self.term, "leader": self.node, "prev_log_index": prev,
+                               "prev_log_term": self._term_at(prev), "entries": self.log[start:start + MAX_ENTRIES],
+                               "leader_commit": self.commit_index, "snapshot": None}
+            reply = self.append(peer, request)
+            if reply is None:
+                continue
+            seq = None
+            with self._cond:
+                if reply["term"] > self.term:
+                    seq = self._become_follower(reply["term"])
+                elif self.role == LEADER and self.term == request["term"]:
+                    if reply["success"]:
+                        self._match[peer] = max(self._match[peer], reply["match_index"])
+                        self._next[peer] = self._match[peer] + 1
+                        self._advance_commit()
+                    else:
+                        self._next[peer] = max(1, min(self._next[peer] - 1, reply["match_index"] + 1))
+                    if self._next[peer] <= self._last_index():
+                        trigger.set()
+            self._sync(seq)
+
+    def _advance_commit(self):
+        # Lock held: the highest index stored on a majority, if it is from this term
+        matches = sorted([self._durable, *self._match.values()], reverse=True)
+        index = matches[len(matches) // 2]
+        if index > self.commit_index and self._term_at(index) == self.term:
+            self.commit_index = index
+            self._cond.notify_all()
+            self._wake_replicators()  # Followers learn the commit without waiting for a heartbeat
+
+    def _mark_durable(self, index, term):
+        with self._cond:
+            if self.role == LEADER and self.term == term:
+                self._durable = max(self._durable, index)
+                self._advance_commit()
+
+    def handle_append(self, request):
+        if request.get("snapshot") is not None:
+            return self._install(request)
+        with self._cond:
+            if request["term"] < self.term:
+                return {"term": self.term, "success": False, "match_index": 0}
+            seq = self._become_follower(request["term"])
+            self._heard_from(request["leader"])
+
+            prev, prev_term, entries = request["prev_log_index"], request["prev_log_term"], request["entries"]
+            if prev < self.base:  # Entries up to the snapshot are committed and match
+                prev, prev_term, entries = self.base, self.log[0][0], entries[self.base - prev:]
+            if prev > self._last_index() or self._term_at(prev) != prev_term:
+                reply = {"term": self.term, "success": False, "match_index": self._conflict(prev)}
+            else:
+                index = prev
+                for term, command in entries:
+                    index += 1
+                    if index <= self._last_index():
+                        if self._term_at(index) == term:
+                            continue
+                        del self.log[index - self.base:]
+                    self.log.append((term, command))
+                    seq = self._persist("entry", index, term, command)
+                commit = min(request["leader_commit"], index)
+                if commit > self.commit_index:
+                    self.commit_index = commit
+                    self._cond.notify_all()
+                reply = {"term": self.term, "success": True, "match_index": index}
+        self._sync(seq)
+        return reply
+
+    def _conflict(self, prev):
+        # Last index the leader may assume matches: skips the whole conflicting term
+        if prev > self._last_index():
+            return self._last_index()
+        term = self._term_at(prev)
+        while prev > self.base + 1 and self._term_at(prev - 1) == term:
+            prev -= 1
+        return prev - 1
+
+    def _install(self, request):
+        # Follower behind the leader's snapshot: takes its state instead of the entries
+        with self._apply_lock, self._cond:
+            if request["term"] < self.term:
+                return {"term": self.term, "success": False, "match_index": 0}
+            seq = self._become_follower(request["term"])
+            self._heard_from(request["leader"])
+            index, term = request["prev_log_index"], request["prev_log_term"]
+            if index > self.last_applied:  # Else everything in it is applied already
+                self._restore(index, term, request["snapshot"])
+                seq = self._persist("snapshot", index, term, request["snapshot"])
+                self._cond.notify_all()
+            reply = {"term": self.term, "success": True, "match_index": index}
+        self._sync(seq)
+        return reply
+
+    ## Writes ##
+
+    def propose(self, command, timeout=COMMIT_TIMEOUT):
+        # Appends a command on the leader and returns (apply() result, index) once applied
+        with self._cond:
+            if self.role != LEADER:
+                raise NotLeader(self.leader)
+            self.log.append((self.term, command))
+            index, term = self._last_index(), self.term
+            self._waiting.add(index)
+            seq = self._persist("entry", index, term, command)
+        self._wake_replicators()
+        self._sync(seq)
+        self._mark_durable(index, term)
+
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            try:
+                while self.last_applied < index:
+                    if index > self._last_index() or self._term_at(index) != term:
+                        raise NotLeader(self.leader)  # Overwritten by a newer leader
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Raft commit timed out")
+                    self._cond.wait(remaining)
+                applied = self._results.pop(index, None)  # (term, result), none if a snapshot covered it
+                if applied is None or applied[0] != term:
+                    raise NotLeader(self.leader)
+                return applied[1], index
+            finally:
+                self._waiting.discard(index)
+                self._results.pop(index, None)
+
+    def wait_leader(self, previous, timeout):
+        # Leader other than previous (the one that just failed), None on timeout
+        with self._cond:
+            self._cond.wait_for(lambda: self.leader not in (None, previous), timeout)
+            return self.leader
+
+    def wait_applied(self, index, timeout=COMMIT_TIMEOUT):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.last_applied >= index, timeout)
+
+
+def apply_command(registry, command):
+    # The replicated state machine: registry writes in log order
+    op, *args = command
+    if op == "register":
+        return registry.register(*args)
+    if op == "register_many":
+        return registry.register_many(*args)
+    if op == "unregister":
+        return registry.unregister(*args)
+    if op == "captain":
+        return registry.set_captain(*args)
+    if op == "elect_captain":
+        return registry.elect_captain(*args)
+    raise ValueError(f"Unknown command {op}")
+
+
+class ReplicatedRegistry:
+    # RobotRegistry front for Raft mode. Reads come from the local replica,
+    # writes are committed through the log, forwarded to the leader when this
+    # node follows. forward(leader, command) returns (result, index) and
+    # raises NotLeader when the call reached no leader
+
+    def __init__(self, registry, raft, forward, observe=None):
+        self.registry = registry
+        self.raft = raft
+        self.forward = forward
+        self.observe = observe  # observe(seconds) per committed write
+
+    def __len__(self):
+        return len(self.registry)
+
+    def __contains__(self, robot_id):
+        return robot_id in self.registry
+
+    def __getattr__(self, name):
+        return getattr(self.registry, name)
+
+    def register(self, name):
+        return self._write("register", name)
+
+    def register_many(self, names):
+        return self._write("register_many", list(names))
+
+    def unregister(self, robot_id):
+        robot, captain_removed = self._write("unregister", robot_id)
+        return robot, captain_removed
+
+    def set_captain(self, robot_id, name, epoch=None):
+        self._write("captain", robot_id, name, epoch)
+
+    def elect_captain(self, robot_id, name, epoch):
+        return self._write("elect_captain", robot_id, name, epoch)
+
+    def _write(self, *command):
+        start = time.perf_counter()
+        for _ in range(WRITE_ATTEMPTS):
+            leader = self.raft.leader
+            try:
+                if leader is None:
+                    raise NotLeader(None)
+                if leader == self.raft.node:
+                    result, index = self.raft.propose(list(command))
+                else:
+                    result, index = self.forward(leader, list(command))
+                    self.raft.wait_applied(index)  # Read-your-writes on this replica
+            except NotLeader:
+                self.raft.wait_leader(leader, 2 * self.raft.election_timeout[1])
+                continue
+            if self.observe is not None:
+                self.observe(time.perf_counter() - start)
+            return result
+        raise NotLeader(self.raft.leader)
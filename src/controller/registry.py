@@ -0,0 +1,266 @@
+import bisect
+import threading
+
+PAGE_SCAN = 10000  # IDs one page() call checks at most, matching the prefix or not
+
+
+class RobotRegistry:
+    # Robots indexed by ID (and optionally by name), guarded by one lock so the
+    # gRPC worker threads and the HTTP server can share it safely
+
+    def __init__(self, index_names=True):
+        self._lock = threading.Lock()
+        self._robots = {}  # id -> {"id", "name"}
+        self._order = []  # ascending ids for paging, may hold removed ids
+        self._names = {} if index_names else None  # name -> {ids}
+        self._next_id = 0
+        self._id_offset, self._id_step = 0, 1
+        self._captain = None
+        self.epoch = 0  # Election epoch of the newest captain, kept when it is removed
+        self.version = 0  # Bumped on every change, lets readers cache renderings
+        self.journal = None  # WriteAheadLog once recover() ran
+
+    def __len__(self):
+        return len(self._robots)
+
+    def __contains__(self, robot_id):
+        return robot_id in self._robots
+
+    ## Robots ##
+
+    def register(self, name):
+        with self._lock:
+            robot = self._add(self._allocate(), name)
+            seq = self._log("register", robot["id"], name)
+            self.version += 1
+        self._commit(seq)
+        return dict(robot)
+
+    def register_many(self, names):
+        # One lock hold and one group commit for a whole batch, robots in input order
+        with self._lock:
+            robots = [self._add(self._allocate(), name) for name in names]
+            seq = None
+            for robot in robots:
+                seq = self._log("register", robot["id"], robot["name"])
+            self.version += 1
+        self._commit(seq)
+        return [dict(robot) for robot in robots]
+
+    def claim(self, robot_id, name):
+        # Registers a robot under an ID another shard allocated, None if taken
+        with self._lock:
+            if robot_id in self._robots:
+                return None
+            robot = self._add(robot_id, name)
+            seq = self._log("register", robot_id, name)
+            self.version += 1
+        self._commit(seq)
+        return dict(robot)
+
+    def reserve_id(self):
+        # Allocates an ID for a robot that another shard will hold
+        with self._lock:
+            robot_id = self._allocate()
+            seq = self._log("reserve", robot_id)
+        self._commit(seq)
+        return robot_id
+
+    def stripe_ids(self, offset, step):
+        # Hands out only IDs equal to offset modulo step, so the shards of a
+        # cluster never allocate the same ID
+        with self._lock:
+            self._id_offset, self._id_step = offset, step
+
+    def unregister(self, robot_id):
+        # Returns the removed robot (or None) and whether it was the captain
+        with self._lock:
+            robot, captain_removed = self._remove(robot_id)
+            if robot is None:
+                return None, False
+            seq = self._log("unregister", robot_id)
+            self.version += 1
+        self._commit(seq)
+        return dict(robot), captain_removed
+
+    def _allocate(self):
+        robot_id = self._next_id + (self._id_offset - self._next_id) % self._id_step
+        self._next_id = robot_id + 1
+        return robot_id
+
+    def _add(self, robot_id, name):
+        robot = {"id": robot_id, "name": name}
+        self._next_id = max(self._next_id, robot_id + 1)
+        self._robots[robot_id] = robot
+        if self._order and robot_id <= self._order[-1]:
+            i = bisect.bisect_left(self._order, robot_id)  # Claimed ID below the newest one
+            if self._order[i] != robot_id:  # Not a removed ID still listed
+                self._order.insert(i, robot_id)
+        else:
+            self._order.append(robot_id)
+        if self._names is not None:
+            self._names.setdefault(name, set()).add(robot_id)
+        return robot
+
+    def _remove(self, robot_id):
+        robot = self._robots.pop(robot_id, None)
+        if robot is None:
+            return None, False
+        if self._names is not None:
+            ids = self._names.get(robot["name"])
+            if ids is not None:
+                ids.discard(robot_id)
+                if not ids:
+                    del self._names[robot["name"]]
+        if len(self._order) > 2 * len(self._robots) + 64:
+            self._order = [i for i in self._order if i in self._robots]
+        captain_removed = self._captain is not None and self._captain["id"] == robot_id
+        if captain_removed:
+            self._captain = None
+        return robot, captain_removed
+
+    def get(self, robot_id):
+        robot = self._robots.get(robot_id)
+        return dict(robot) if robot is not None else None
+
+    def find_by_name(self, name):
+        if self._names is None:
+            with self._lock:
+                return [dict(robot) for robot in self._robots.values() if robot["name"] == name]
+        with self._lock:
+            return [dict(self._robots[robot_id]) for robot_id in sorted(self._names.get(name, ()))]
+
+    def snapshot(self):
+        # Consistent copy ordered by ID, safe to iterate while others write
+        with self._lock:
+            return [dict(self._robots[robot_id]) for robot_id in self._order if robot_id in self._robots]
+
+    def page(self, after_id=-1, limit=100, name_prefix="", scan=PAGE_SCAN):
+        # Up to limit robots with an ID above after_id, plus the ID to resume
+        # after (None once the fleet is exhausted). At most scan IDs are
+        # checked, so a prefix matching nothing does not hold the lock for the
+        # whole fleet: the page may then be empty with an ID to resume after
+        with self._lock:
+            order = self._order
+            i = bisect.bisect_right(order, after_id)
+            end = min(len(order), i + scan)
+            robots = []
+            last_id = after_id
+            while i < end and len(robots) < limit:
+                last_id = order[i]
+                robot = self._robots.get(last_id)
+                if robot is not None and robot["name"].startswith(name_prefix):
+                    robots.append(dict(robot))
+                i += 1
+            next_id = last_id if i < len(order) else None
+        return robots, next_id
+
+    def batches(self, after_id=-1, page_size=100, name_prefix="", batch_size=100):
+        # Splits one page into batches of (robots, next_id), each read under a
+        # short lock hold so writers are not blocked for the whole page
+        sent = 0
+        while True:
+            robots, next_id = self.page(after_id, min(batch_size, page_size - sent), name_prefix)
+            sent += len(robots)
+            if robots or next_id is None:
+                yield robots, next_id
+            if next_id is None or sent >= page_size:
+                return
+            after_id = next_id
+
+    ## Captain ##
+
+    @property
+    def captain(self):
+        captain = self._captain
+        return dict(captain) if captain is not None else None
+
+    def set_captain(self, robot_id, name, epoch=None):
+        # A robot_id of None clears the captain
+        with self._lock:
+            seq = self._set_captain(robot_id, name, epoch)
+        self._commit(seq)
+
+    def elect_captain(self, robot_id, name, epoch):
+        # Sets the captain unless it was elected in an older epoch (or is a
+        # lower robot of the same one), False if rejected
+        with self._lock:
+            current = self._captain
+            if epoch < self.epoch or (epoch == self.epoch and current is not None and robot_id < current["id"]):
+                return False
+            seq = self._set_captain(robot_id, name, epoch)
+        self._commit(seq)
+        return True
+
+    def _set_captain(self, robot_id, name, epoch):
+        self._captain = None if robot_id is None else {"id": robot_id, "name": name}
+        if epoch is not None:
+            self.epoch = max(self.epoch, epoch)
+        self.version += 1
+        return self._log("captain", robot_id, name, epoch)
+
+    ## Persistence ##
+
+    def recover(self, journal):
+        # Rebuilds the registry from the last snapshot and the records logged
+        # after it, then journals every change. IDs continue after the highest
+        # one ever handed out, so restarted controllers never reuse them
+        snapshot, records = journal.replay()
+        with self._lock:
+            if snapshot is not None:
+                self._load(snapshot)
+            for op, robot_id, *name in records:
+                if op == "register":
+                    self._add(robot_id, name[0])
+                elif op == "unregister":
+                    self._remove(robot_id)
+                elif op == "reserve":
+                    self._next_id = max(self._next_id, robot_id + 1)
+                elif op == "captain":
+                    self._captain = None if robot_id is None else {"id": robot_id, "name": name[0]}
+                    if len(name) > 1 and name[1] is not None:
+                        self.epoch = max(self.epoch, name[1])
+            self.version += 1
+            self.journal = journal
+        journal.start(self._capture)
+        return len(records)
+
+    def _capture(self):
+        # State and the seq of the last record it includes, for WAL snapshots
+        with self._lock:
+            return self._state(), self.journal.appended
+
+    def save(self):
+        # Robots, captain and ID counter as plain data, for Raft snapshots
+        with self._lock:
+            return self._state()
+
+    def restore(self, state):
+        # Replaces everything with a save()d state
+        with self._lock:
+            self._robots, self._order = {}, []
+            if self._names is not None:
+                self._names = {}
+            self._next_id, self._captain = 0, None
+            self._load(state)
+            self.version += 1
+
+    def _state(self):
+        return {"next_id": self._next_id, "captain": self._captain, "epoch": self.epoch,
+                "robots": [[robot["id"], robot["name"]] for robot in self._robots.values()]}
+
+    def _load(self, state):
+        for robot_id, name in state["robots"]:
+            self._add(robot_id, name)
+        self._next_id = max(self._next_id, state["next_id"])
+        self._captain = state["captain"]
+        self.epoch = state.get("epoch", 0)
+
+    def _log(self, *record):
+        # Appended under the lock so the log order is the order of the changes
+        return self.journal.append(record) if self.journal is not None else None
+
+    def _commit(self, seq):
+        # Waits for the group commit outside the lock, other writers keep going
+        if seq is not None:
+            self.journal.wait(seq)
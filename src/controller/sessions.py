@@ -0,0 +1,40 @@
+import threading
+
+
+class SessionHub:
+    # Open Session streams by robot ID. Each session registers a send callable
+    # that is safe to call from any thread (queue put or loop.call_soon_threadsafe)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}  # id -> send(command)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, robot_id):
+        return robot_id in self._sessions
+
+    def open(self, robot_id, send):
+        with self._lock:
+            self._sessions[robot_id] = send
+
+    def close(self, robot_id, send):
+        # Only removes the session if it was not replaced by a newer stream
+        with self._lock:
+            if self._sessions.get(robot_id) is send:
+                del self._sessions[robot_id]
+
+    def send(self, robot_id, command):
+        send = self._sessions.get(robot_id)
+        if send is None:
+            return False
+        send(command)
+        return True
+
+    def broadcast(self, command):
+        with self._lock:
+            sends = list(self._sessions.values())
+        for send in sends:
+            send(command)
+        return len(sends)
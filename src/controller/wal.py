@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+
+SNAPSHOT_EVERY = 10000  # Logged records between two compacted snapshots
+SNAPSHOT_FILE = "snapshot.json"
+SEGMENT_PREFIX = "wal-"
+SEGMENT_SUFFIX = ".log"
+
+
+class WriteAheadLog:
+    # Append-only log of registry changes as JSON lines [seq, op, ...] in
+    # segment files named after their first seq, plus one compacted snapshot.
+    # Callers append under the registry lock and then wait for the writer
+    # thread, which writes and fsyncs everything queued meanwhile at once
+    # (group commit), so concurrent writers share one fsync
+
+    def __init__(self, directory, snapshot_every=SNAPSHOT_EVERY, sync=True):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.sync = sync
+        self._cond = threading.Condition()
+        self._pending = []  # encoded records not written yet
+        self._appended = 0  # seq of the last appended record
+        self._durable = 0  # seq of the last record on disk
+        self._snapshot_seq = 0  # seq covered by the snapshot file
+        self._segment = None  # (first seq, open file)
+        self._capture = None
+        self._error = None
+        self._closed = False
+        self._thread = None
+        self.stats = {"records": 0, "commits": 0, "snapshots": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def appended(self):
+        return self._appended
+
+    ## Recovery ##
+
+    def replay(self):
+        # Last snapshot (or None) and the [op, ...] records logged after it
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        snapshot = None
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                snapshot = json.load(f)
+            self._snapshot_seq = snapshot["seq"]
+
+        seq = self._snapshot_seq
+        records = []
+        for _, name in self._segments():
+            with open(os.path.join(self.directory, name), "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Torn write of a crashed commit, never acknowledged
+                    record = json.loads(line)
+                    if record[0] > seq:
+                        seq = record[0]
+                        records.append(record[1:])
+        self._appended = self._durable = seq
+        return snapshot, records
+
+    ## Writing ##
+
+    def start(self, capture):
+        # capture() returns a consistent (state, seq) pair for snapshots
+        self._capture = capture
+        self._open_segment()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def append(self, record):
+        # Queues one record and returns its seq for wait()
+        with self._cond:
+            self._appended += 1
+            self._pending.append(json.dumps([self._appended, *record], separators=(",", ":")) + "\n")
+            self._cond.notify()
+            return self._appended
+
+    def wait(self, seq):
+        # Blocks until the record is on disk
+        with self._cond:
+            while self._durable < seq:
+                if self._error is not None:
+                    raise self._error
+                self._cond.wait()
+
+    def close(self):
+        # Drains the queue and leaves a fresh snapshot so the next start replays nothing
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            if self._error is None and self._durable > self._snapshot_seq:
+                self._snapshot()
+            self._segment[1].close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                last = self._appended
+            try:
+                file = self._segment[1]
+                file.write("".join(batch).encode())
+                file.flush()
+                if self.sync:
+                    os.fsync(file.fileno())
+            except OSError as e:
+                return self._fail(e)
+            with self._cond:
+                self._durable = last
+                self._cond.notify_all()
+            self.stats["records"] += len(batch)
+            self.stats["commits"] += 1
+            if last - self._snapshot_seq >= self.snapshot_every:
+                try:
+                    self._snapshot()
+                except OSError as e:
+                    return self._fail(e)
+
+    def _fail(self, error):
+        # Waiting and later writers get the error instead of hanging
+        with self._cond:
+            self._error = error
+            self._cond.notify_all()
+
+    ## Snapshots ##
+
+    def _snapshot(self):
+        # Writes the captured state atomically, then continues in a new segment
+        # and removes the segments the snapshot fully covers
+        state, seq = self._capture()
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(dict(state, seq=seq), f, separators=(",", ":"))
+            f.flush()
+            if self.sync:
+                os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self._snapshot_seq = seq
+        self._open_segment()
+
+        segments = self._segments()
+        for (_, name), (following, _) in zip(segments, segments[1:]):
+            if following <= seq + 1:
+                os.remove(os.path.join(self.directory, name))
+        self._sync_directory()
+        self.stats["snapshots"] += 1
+
+    def _open_segment(self):
+        first = self._durable + 1
+        if self._segment is not None:
+            if self._segment[0] == first:
+                return
+            self._segment[1].close()
+        name = f"{SEGMENT_PREFIX}{first:012d}{SEGMENT_SUFFIX}"
+        self._segment = (first, open(os.path.join(self.directory, name), "ab"))
+        self._sync_directory()
+
+    def _segments(self):
+        # (first seq, file name) of every segment, oldest first
+        return sorted((int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]), name)
+                      for name in os.listdir(self.directory)
+                      if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+
+    def _sync_directory(self):
+        # Makes created, renamed and removed files survive a crash
+        if not self.sync:
+            return
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
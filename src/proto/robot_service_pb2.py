@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13robot_service.proto\"\x19\n\tRobotInfo\x12\x0c\n\x04name\x18\x01 \x01(\t\"%\n\tRobotData\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\"\x19\n\x06Status\x12\x0f\n\x07success\x18\x01 \x01(\x08\"\x07\n\x05\x45mpty\",\n\x08\x43ommands\x12\x11\n\tconnected\x18\x01 \x01(\x08\x12\r\n\x05\x65lect\x18\x02 \x01(\x08\x32\x95\x02\n\x0cRobotService\x12!\n\tGetRobots\x12\x06.Empty\x1a\n.RobotData0\x01\x12\'\n\rRegisterRobot\x12\n.RobotInfo\x1a\n.RobotData\x12&\n\x0fUnregisterRobot\x12\n.RobotData\x1a\x07.Status\x12!\n\nCheckRobot\x12\n.RobotData\x1a\x07.Status\x12 \n\nGetCaptain\x12\x06.Empty\x1a\n.RobotData\x12$\n\x0bHealthCheck\x12\n.RobotData\x1a\t.Commands\x12&\n\x0fRegisterCaptain\x12\n.RobotData\x1a\x07.Statusb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13robot_service.proto\"\x19\n\tRobotInfo\x12\x0c\n\x04name\x18\x01 \x01(\t\"4\n\tRobotData\x12\n\n\x02id\x18\x01 \x01(\x05\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\r\n\x05\x65poch\x18\x03 \x01(\x03\"G\n\tRobotPage\x12\x12\n\npage_token\x18\x01 \x01(\t\x12\x11\n\tpage_size\x18\x02 \x01(\x05\x12\x13\n\x0bname_prefix\x18\x03 \x01(\t\"A\n\nRobotBatch\x12\x1a\n\x06robots\x18\x01 \x03(\x0b\x32\n.RobotData\x12\x17\n\x0fnext_page_token\x18\x02 \x01(\t\"\x19\n\x06Status\x12\x0f\n\x07success\x18\x01 \x01(\x08\"\x07\n\x05\x45mpty\"Z\n\x08\x43ommands\x12\x11\n\tconnected\x18\x01 \x01(\x08\x12\r\n\x05\x65lect\x18\x02 \x01(\x08\x12\x10\n\x08shutdown\x18\x03 \x01(\x08\x12\x1a\n\x12heartbeat_interval\x18\x04 \x01(\x05\",\n\x0eRobotInfoBatch\x12\x1a\n\x06robots\x18\x01 \x03(\x0b\x32\n.RobotInfo\"<\n\x0eRegisterResult\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x19\n\x05robot\x18\x02 \x01(\x0b\x32\n.RobotData\"3\n\x0fRegisterResults\x12 \n\x07results\x18\x01 \x03(\x0b\x32\x0f.RegisterResult\",\n\rCommandsBatch\x12\x1b\n\x08\x63ommands\x18\x01 \x03(\x0b\x32\t.Commands\"&\n\x05Shard\x12\x0c\n\x04node\x18\x01 \x01(\t\x12\x0f\n\x07\x61\x64\x64ress\x18\x02 \x01(\t\"6\n\nClusterMap\x12\x16\n\x06shards\x18\x01 \x03(\x0b\x32\x06.Shard\x12\x10\n\x08replicas\x18\x02 \x01(\x05\"\xa2\x01\n\nShardState\x12\x0c\n\x04node\x18\x01 \x01(\t\x12\x0e\n\x06robots\x18\x02 \x01(\x05\x12\x13\n\x0bhas_captain\x18\x03 \x01(\x08\x12\x1b\n\x07\x63\x61ptain\x18\x04 \x01(\x0b\x32\n.RobotData\x12\x17\n\x0f\x63\x61ptain_version\x18\x05 \x01(\x03\x12\x14\n\x0c\x63\x61ptain_node\x18\x06 \x01(\t\x12\x15\n\rcaptain_epoch\x18\x07 \x01(\x03\"]\n\x0bVoteRequest\x12\x0c\n\x04term\x18\x01 \x01(\x03\x12\x11\n\tcandidate\x18\x02 \x01(\t\x12\x16\n\x0elast_log_index\x18\x03 \x01(\x03\x12\x15\n\rlast_log_term\x18\x04 \x01(\x03\"*\n\tVoteReply\x12\x0c\n\x04term\x18\x01 \x01(\x03\x12\x0f\n\x07granted\x18\x02 \x01(\x08\")\n\x08LogEntry\x12\x0c\n\x04term\x18\x01 \x01(\x03\x12\x0f\n\x07\x63ommand\x18\x02 \x01(\t\"\xa1\x01\n\rAppendRequest\x12\x0c\n\x04term\x18\x01 \x01(\x03\x12\x0e\n\x06leader\x18\x02 \x01(\t\x12\x16\n\x0eprev_log_index\x18\x03 \x01(\x03\x12\x15\n\rprev_log_term\x18\x04 \x01(\x03\x12\x1a\n\x07\x65ntries\x18\x05 \x03(\x0b\x32\t.LogEntry\x12\x15\n\rleader_commit\x18\x06 \x01(\x03\x12\x10\n\x08snapshot\x18\x07 \x01(\t\"O\n\x0b\x41ppendReply\x12\x0c\n\x04term\x18\x01 \x01(\x03\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12\x13\n\x0bmatch_index\x18\x03 \x01(\x03\x12\x0c\n\x04seen\x18\x04 \x03(\x05\"\x1b\n\x08Proposal\x12\x0f\n\x07\x63ommand\x18\x01 \x01(\t\"/\n\x0eProposalResult\x12\r\n\x05index\x18\x01 \x01(\x03\x12\x0e\n\x06result\x18\x02 \x01(\t2\xed\x03\n\x0cRobotService\x12!\n\tGetRobots\x12\x06.Empty\x1a\n.RobotData0\x01\x12\'\n\nListRobots\x12\n.RobotPage\x1a\x0b.RobotBatch0\x01\x12\'\n\rRegisterRobot\x12\n.RobotInfo\x1a\n.RobotData\x12&\n\x0fUnregisterRobot\x12\n.RobotData\x1a\x07.Status\x12!\n\nCheckRobot\x12\n.RobotData\x1a\x07.Status\x12 \n\nGetCaptain\x12\x06.Empty\x1a\n.RobotData\x12$\n\x0bHealthCheck\x12\n.RobotData\x1a\t.Commands\x12&\n\x0fRegisterCaptain\x12\n.RobotData\x1a\x07.Status\x12$\n\x07Session\x12\n.RobotData\x1a\t.Commands(\x01\x30\x01\x12!\n\nGetCluster\x12\x06.Empty\x1a\x0b.ClusterMap\x12\x33\n\x0eRegisterRobots\x12\x0f.RobotInfoBatch\x1a\x10.RegisterResults\x12/\n\x10HealthCheckBatch\x12\x0b.RobotBatch\x1a\x0e.CommandsBatch2U\n\x0e\x43lusterService\x12 \n\x04Sync\x12\x0b.ShardState\x1a\x0b.ShardState\x12!\n\nClaimRobot\x12\n.RobotData\x1a\x07.Status2\x8c\x01\n\x0bRaftService\x12\'\n\x0bRequestVote\x12\x0c.VoteRequest\x1a\n.VoteReply\x12-\n\rAppendEntries\x12\x0e.AppendRequest\x1a\x0c.AppendReply\x12%\n\x07Propose\x12\t.Proposal\x1a\x0f.ProposalResultb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -34,13 +34,49 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_ROBOTINFO']._serialized_start=23
   _globals['_ROBOTINFO']._serialized_end=48
   _globals['_ROBOTDATA']._serialized_start=50
-  _globals['_ROBOTDATA']._serialized_end=87
-  _globals['_STATUS']._serialized_start=89
-  _globals['_STATUS']._serialized_end=114
-  _globals['_EMPTY']._serialized_start=116
-  _globals['_EMPTY']._serialized_end=123
-  _globals['_COMMANDS']._serialized_start=125
-  _globals['_COMMANDS']._serialized_end=169
-  _globals['_ROBOTSERVICE']._serialized_start=172
-  _globals['_ROBOTSERVICE']._serialized_end=449
+  _globals['_ROBOTDATA']._serialized_end=102
+  _globals['_ROBOTPAGE']._serialized_start=104
+  _globals['_ROBOTPAGE']._serialized_end=175
+  _globals['_ROBOTBATCH']._serialized_start=177
+  _globals['_ROBOTBATCH']._serialized_end=242
+  _globals['_STATUS']._serialized_start=244
+  _globals['_STATUS']._serialized_end=269
+  _globals['_EMPTY']._serialized_start=271
+  _globals['_EMPTY']._serialized_end=278
+  _globals['_COMMANDS']._serialized_start=280
+  _globals['_COMMANDS']._serialized_end=370
+  _globals['_ROBOTINFOBATCH']._serialized_start=372
+  _globals['_ROBOTINFOBATCH']._serialized_end=416
+  _globals['_REGISTERRESULT']._serialized_start=418
+  _globals['_REGISTERRESULT']._serialized_end=478
+  _globals['_REGISTERRESULTS']._serialized_start=480
+  _globals['_REGISTERRESULTS']._serialized_end=531
+  _globals['_COMMANDSBATCH']._serialized_start=533
+  _globals['_COMMANDSBATCH']._serialized_end=577
+  _globals['_SHARD']._serialized_start=579
+  _globals['_SHARD']._serialized_end=617
+  _globals['_CLUSTERMAP']._serialized_start=619
+  _globals['_CLUSTERMAP']._serialized_end=673
+  _globals['_SHARDSTATE']._serialized_start=676
+  _globals['_SHARDSTATE']._serialized_end=838
+  _globals['_VOTEREQUEST']._serialized_start=840
+  _globals['_VOTEREQUEST']._serialized_end=933
+  _globals['_VOTEREPLY']._serialized_start=935
+  _globals['_VOTEREPLY']._serialized_end=977
+  _globals['_LOGENTRY']._serialized_start=979
+  _globals['_LOGENTRY']._serialized_end=1020
+  _globals['_APPENDREQUEST']._serialized_start=1023
+  _globals['_APPENDREQUEST']._serialized_end=1184
+  _globals['_APPENDREPLY']._serialized_start=1186
+  _globals['_APPENDREPLY']._serialized_end=1265
+  _globals['_PROPOSAL']._serialized_start=1267
+  _globals['_PROPOSAL']._serialized_end=1294
+  _globals['_PROPOSALRESULT']._serialized_start=1296
+  _globals['_PROPOSALRESULT']._serialized_end=1343
+  _globals['_ROBOTSERVICE']._serialized_start=1346
+  _globals['_ROBOTSERVICE']._serialized_end=1839
+  _globals['_CLUSTERSERVICE']._serialized_start=1841
+  _globals['_CLUSTERSERVICE']._serialized_end=1926
+  _globals['_RAFTSERVICE']._serialized_start=1929
+  _globals['_RAFTSERVICE']._serialized_end=2069
 # @@protoc_insertion_point(module_scope)
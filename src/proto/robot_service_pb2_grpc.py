@@ -39,6 +39,11 @@ class RobotServiceStub(object):
                 request_serializer=robot__service__pb2.Empty.SerializeToString,
                 response_deserializer=robot__service__pb2.RobotData.FromString,
                 _registered_method=True)
+        self.ListRobots = channel.unary_stream(
+                '/RobotService/ListRobots',
+                request_serializer=robot__service__pb2.RobotPage.SerializeToString,
+                response_deserializer=robot__service__pb2.RobotBatch.FromString,
+                _registered_method=True)
         self.RegisterRobot = channel.unary_unary(
                 '/RobotService/RegisterRobot',
                 request_serializer=robot__service__pb2.RobotInfo.SerializeToString,
@@ -69,6 +74,26 @@ class RobotServiceStub(object):
                 request_serializer=robot__service__pb2.RobotData.SerializeToString,
                 response_deserializer=robot__service__pb2.Status.FromString,
                 _registered_method=True)
+        self.Session = channel.stream_stream(
+                '/RobotService/Session',
+                request_serializer=robot__service__pb2.RobotData.SerializeToString,
+                response_deserializer=robot__service__pb2.Commands.FromString,
+                _registered_method=True)
+        self.GetCluster = channel.unary_unary(
+                '/RobotService/GetCluster',
+                request_serializer=robot__service__pb2.Empty.SerializeToString,
+                response_deserializer=robot__service__pb2.ClusterMap.FromString,
+                _registered_method=True)
+        self.RegisterRobots = channel.unary_unary(
+                '/RobotService/RegisterRobots',
+                request_serializer=robot__service__pb2.RobotInfoBatch.SerializeToString,
+                response_deserializer=robot__service__pb2.RegisterResults.FromString,
+                _registered_method=True)
+        self.HealthCheckBatch = channel.unary_unary(
+                '/RobotService/HealthCheckBatch',
+                request_serializer=robot__service__pb2.RobotBatch.SerializeToString,
+                response_deserializer=robot__service__pb2.CommandsBatch.FromString,
+                _registered_method=True)
 
 
 class RobotServiceServicer(object):
@@ -80,6 +105,12 @@ class RobotServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ListRobots(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def RegisterRobot(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -116,6 +147,30 @@ class RobotServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def Session(self, request_iterator, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetCluster(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def RegisterRobots(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def HealthCheckBatch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_RobotServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -124,6 +179,11 @@ def add_RobotServiceServicer_to_server(servicer, server):
                     request_deserializer=robot__service__pb2.Empty.FromString,
                     response_serializer=robot__service__pb2.RobotData.SerializeToString,
             ),
+            'ListRobots': grpc.unary_stream_rpc_method_handler(
+                    servicer.ListRobots,
+                    request_deserializer=robot__service__pb2.RobotPage.FromString,
+                    response_serializer=robot__service__pb2.RobotBatch.SerializeToString,
+            ),
             'RegisterRobot': grpc.unary_unary_rpc_method_handler(
                     servicer.RegisterRobot,
                     request_deserializer=robot__service__pb2.RobotInfo.FromString,
@@ -154,6 +214,26 @@ def add_RobotServiceServicer_to_server(servicer, server):
                     request_deserializer=robot__service__pb2.RobotData.FromString,
                     response_serializer=robot__service__pb2.Status.SerializeToString,
             ),
+            'Session': grpc.stream_stream_rpc_method_handler(
+                    servicer.Session,
+                    request_deserializer=robot__service__pb2.RobotData.FromString,
+                    response_serializer=robot__service__pb2.Commands.SerializeToString,
+            ),
+            'GetCluster': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetCluster,
+                    request_deserializer=robot__service__pb2.Empty.FromString,
+                    response_serializer=robot__service__pb2.ClusterMap.SerializeToString,
+            ),
+            'RegisterRobots': grpc.unary_unary_rpc_method_handler(
+                    servicer.RegisterRobots,
+                    request_deserializer=robot__service__pb2.RobotInfoBatch.FromString,
+                    response_serializer=robot__service__pb2.RegisterResults.SerializeToString,
+            ),
+            'HealthCheckBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.HealthCheckBatch,
+                    request_deserializer=robot__service__pb2.RobotBatch.FromString,
+                    response_serializer=robot__service__pb2.CommandsBatch.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'RobotService', rpc_method_handlers)
@@ -192,6 +272,33 @@ class RobotService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def ListRobots(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/RobotService/ListRobots',
+            robot__service__pb2.RobotPage.SerializeToString,
+            robot__service__pb2.RobotBatch.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def RegisterRobot(request,
             target,
@@ -353,3 +460,390 @@ class RobotService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def Session(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/RobotService/Session',
+            robot__service__pb2.RobotData.SerializeToString,
+            robot__service__pb2.Commands.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetCluster(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/RobotService/GetCluster',
+            robot__service__pb2.Empty.SerializeToString,
+            robot__service__pb2.ClusterMap.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def RegisterRobots(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/RobotService/RegisterRobots',
+            robot__service__pb2.RobotInfoBatch.SerializeToString,
+            robot__service__pb2.RegisterResults.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def HealthCheckBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/RobotService/HealthCheckBatch',
+            robot__service__pb2.RobotBatch.SerializeToString,
+            robot__service__pb2.CommandsBatch.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+
+class ClusterServiceStub(object):
+    """Between the controller shards of a cluster
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Sync = channel.unary_unary(
+                '/ClusterService/Sync',
+                request_serializer=robot__service__pb2.ShardState.SerializeToString,
+                response_deserializer=robot__service__pb2.ShardState.FromString,
+                _registered_method=True)
+        self.ClaimRobot = channel.unary_unary(
+                '/ClusterService/ClaimRobot',
+                request_serializer=robot__service__pb2.RobotData.SerializeToString,
+                response_deserializer=robot__service__pb2.Status.FromString,
+                _registered_method=True)
+
+
+class ClusterServiceServicer(object):
+    """Between the controller shards of a cluster
+    """
+
+    def Sync(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ClaimRobot(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_ClusterServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'Sync': grpc.unary_unary_rpc_method_handler(
+                    servicer.Sync,
+                    request_deserializer=robot__service__pb2.ShardState.FromString,
+                    response_serializer=robot__service__pb2.ShardState.SerializeToString,
+            ),
+            'ClaimRobot': grpc.unary_unary_rpc_method_handler(
+                    servicer.ClaimRobot,
+                    request_deserializer=robot__service__pb2.RobotData.FromString,
+                    response_serializer=robot__service__pb2.Status.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'ClusterService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('ClusterService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class ClusterService(object):
+    """Between the controller shards of a cluster
+    """
+
+    @staticmethod
+    def Sync(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ClusterService/Sync',
+            robot__service__pb2.ShardState.SerializeToString,
+            robot__service__pb2.ShardState.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ClaimRobot(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ClusterService/ClaimRobot',
+            robot__service__pb2.RobotData.SerializeToString,
+            robot__service__pb2.Status.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+
+class RaftServiceStub(object):
+    """Between the controllers of a Raft group
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.RequestVote = channel.unary_unary(
+                '/RaftService/RequestVote',
+                request_serializer=robot__service__pb2.VoteRequest.SerializeToString,
+                response_deserializer=robot__service__pb2.VoteReply.FromString,
+                _registered_method=True)
+        self.AppendEntries = channel.unary_unary(
+                '/RaftService/AppendEntries',
+                request_serializer=robot__service__pb2.AppendRequest.SerializeToString,
+                response_deserializer=robot__service__pb2.AppendReply.FromString,
+                _registered_method=True)
+        self.Propose = channel.unary_unary(
+                '/RaftService/Propose',
+                request_serializer=robot__service__pb2.Proposal.SerializeToString,
+                response_deserializer=robot__service__pb2.ProposalResult.FromString,
+                _registered_method=True)
+
+
+class RaftServiceServicer(object):
+    """Between the controllers of a Raft group
+    """
+
+    def RequestVote(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def AppendEntries(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Propose(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_RaftServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'RequestVote': grpc.unary_unary_rpc_method_handler(
+                    servicer.RequestVote,
+                    request_deserializer=robot__service__pb2.VoteRequest.FromString,
+                    response_serializer=robot__service__pb2.VoteReply.SerializeToString,
+            ),
+            'AppendEntries': grpc.unary_unary_rpc_method_handler(
+                    servicer.AppendEntries,
+                    request_deserializer=robot__service__pb2.AppendRequest.FromString,
+                    response_serializer=robot__service__pb2.AppendReply.SerializeToString,
+            ),
+            'Propose': grpc.unary_unary_rpc_method_handler(
+                    servicer.Propose,
+                    request_deserializer=robot__service__pb2.Proposal.FromString,
+                    response_serializer=robot__service__pb2.ProposalResult.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'RaftService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('RaftService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class RaftService(object):
+    """Between the controllers of a Raft group
+    """
+
+    @staticmethod
+    def RequestVote(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/RaftService/RequestVote',
+            robot__service__pb2.VoteRequest.SerializeToString,
+            robot__service__pb2.VoteReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def AppendEntries(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/RaftService/AppendEntries',
+            robot__service__pb2.AppendRequest.SerializeToString,
+            robot__service__pb2.AppendReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Propose(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/RaftService/Propose',
+            robot__service__pb2.Proposal.SerializeToString,
+            robot__service__pb2.ProposalResult.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import signal
+import time
+
+import grpc
+from common import logger
+from proto import robot_service_pb2
+from robots.mqtt_client import MQTTClient
+from robots.robot import HEALTH_INTERVAL, ChannelPool, Robot, add_arguments, backoff, shard_address, wait_event
+
+ROBOTS = 100  # Robots per host by default
+NAME_PREFIX = "Robot"
+BATCH_SIZE = 1000  # Robots per RegisterRobots/HealthCheckBatch call
+UNREGISTER_CONCURRENCY = 500  # Unary UnregisterRobot calls in flight on shutdown
+
+host_log = logger.get_logger("Host")
+
+
+class RobotHost:
+    # Many robots on one asyncio loop, sharing the gRPC channels and one MQTT
+    # connection. Registration and liveness go through the batch RPCs: one
+    # RegisterRobots per BATCH_SIZE robots, then one HealthCheckBatch per
+    # shard and interval instead of a Session stream per robot
+
+    def __init__(self, names, channels, client, batch_size=BATCH_SIZE, health_interval=HEALTH_INTERVAL, **options):
+        self.channels = channels
+        self.client = client
+        self.batch_size = batch_size
+        self.health_interval = health_interval
+        self.robots = [Robot(name, client, health_interval=health_interval, **options) for name in names]
+        self.shards = {}  # controller address -> robots kept alive there
+        self.shutdown_event = asyncio.Event()
+
+    async def register(self, robots):
+        # Registers in batches at a seed and assigns each robot to the shard owning its ID
+        for members in self.shards.values():
+            members[:] = [robot for robot in members if robot.registered.is_set()]
+        address = await self.channels.seed(self.shutdown_event)
+        stub = self.channels.stub(address)
+        registered = []
+        for i in range(0, len(robots), self.batch_size):
+            batch = robots[i:i + self.batch_size]
+            request = robot_service_pb2.RobotInfoBatch(robots=[robot_service_pb2.RobotInfo(name=robot.name)
+                                                               for robot in batch])
+            response = await stub.RegisterRobots(request)
+            for robot, result in zip(batch, response.results):
+                if result.success:
+                    robot.setRegistered(result.robot.id, result.robot.epoch)
+                    registered.append(robot)
+                else:
+                    host_log.warning("{} could not be registered", robot.name)
+
+        cluster = await self.channels.cluster(address)
+        for robot in registered:
+            shard = shard_address(cluster, robot.id, address)
+            robot.stub = self.channels.stub(shard)
+            self.shards.setdefault(shard, []).append(robot)
+        host_log.info("{} robots registered on {} controller(s)", len(registered), len(self.shards))
+
+    async def health_checks(self):
+        # Robots the controller forgot (e.g. after a restart) register again
+        delays = backoff()
+        while True:
+            try:
+                for address, robots in self.shards.items():
+                    await self.check_shard(address, robots)
+                lost = [robot for robot in self.robots if not robot.registered.is_set()]
+                if lost:
+                    await self.register(lost)
+                delays = backoff()
+                interval = self.health_interval
+            except ConnectionError:
+                return
+            except grpc.RpcError as e:
+                host_log.warning("Controller lost ({}), reconnecting...", e.code().name)
+                interval = next(delays)
+            if await wait_event(self.shutdown_event, interval):
+                return
+
+    async def check_shard(self, address, robots):
+        # Robots stopped by a shutdown command are unregistered and dropped
+        stopped = [robot for robot in robots if robot.shutdown_event.is_set()]
+        if stopped:
+            self.robots = [robot for robot in self.robots if not robot.shutdown_event.is_set()]
+            robots[:] = [robot for robot in robots if not robot.shutdown_event.is_set()]
+            await self.unregister(stopped)
+        stub = self.channels.stub(address)
+        for i in range(0, len(robots), self.batch_size):
+            batch = robots[i:i + self.batch_size]
+            response = await stub.HealthCheckBatch(robot_service_pb2.RobotBatch(robots=[robot.data() for robot in batch]))
+            for robot, command in zip(batch, response.commands):
+                robot.handleCommands(command)
+
+    async def unregister(self, robots):
+        limit = asyncio.Semaphore(UNREGISTER_CONCURRENCY)
+
+        async def unregister(robot):
+            async with limit:
+                try:
+                    await robot.unregister()
+                except grpc.RpcError:
+                    pass  # Expires on the controller
+
+        await asyncio.gather(*(unregister(robot) for robot in robots))
+
+    async def run(self):
+        start_time = time.perf_counter()
+        for delay in backoff():
+            try:
+                await self.register([robot for robot in self.robots if not robot.registered.is_set()])
+                break
+            except ConnectionError:
+                return
+            except grpc.RpcError as e:
+                host_log.warning("Registration failed ({}), retrying...", e.code().name)
+                if await wait_event(self.shutdown_event, delay):
+                    return
+        host_log.info("Host ready after {:.3f}s", time.perf_counter() - start_time)
+        robots = asyncio.gather(*(robot.run_mqtt() for robot in self.robots))
+        await self.health_checks()
+        for robot in self.robots:
+            robot.shutdown_event.set()
+        await robots
+        await self.unregister([robot for robots in self.shards.values() for robot in robots])
+        host_log.info("All robots stopped")
+
+
+async def main(args):
+    channels = ChannelPool(args.seeds.split(","))
+    client = MQTTClient(args.mqtt_host, args.mqtt_port)
+    host = RobotHost([f"{args.name_prefix}{i}" for i in range(args.robots)], channels, client, args.batch_size,
+                     args.health_interval, heartbeat_interval=args.heartbeat_interval,
+                     heartbeat_timeout=args.heartbeat_timeout)
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, host.shutdown_event.set)
+
+    client.start()  # Connects while the robots register
+    await host.run()
+    await client.disconnect()
+    await channels.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs many robots in one process")
+    parser.add_argument("--robots", type=int, default=ROBOTS, help="Number of robots")
+    parser.add_argument("--name-prefix", default=NAME_PREFIX, help="Robot names are the prefix and a number")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Robots per batch call")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    host_log.info("Starting {} robots", args.robots)
+    asyncio.run(main(args))
+    logger.flush()
@@ -0,0 +1,175 @@
+import asyncio
+import time
+from collections import namedtuple
+
+import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+from paho.mqtt.reasoncodes import ReasonCode
+from robots.mqtt_client import MQTTClient
+
+ALIAS_MAXIMUM = 10  # Topic aliases granted per connection, as by Mosquitto
+
+LocalMessage = namedtuple("LocalMessage", ["topic", "payload", "retain"])
+PublishInfo = namedtuple("PublishInfo", ["rc"])
+
+
+class LocalBroker:
+    # MQTT broker inside the robots' process, for tests and benchmarks
+    # without a network: topic filters with + and #, retained messages with
+    # expiry, topic aliases and last wills. A message goes straight to the
+    # queues of the subscribed clients, in subscription order, so a fleet
+    # on one asyncio loop elects the same way on every run
+
+    def __init__(self):
+        self._subscriptions = ({}, {})  # Tree of topic levels: (children, sessions)
+        self._retained = {}  # topic -> (payload, expiry time or None)
+        self.stats = {"published": 0, "delivered": 0}
+
+    def subscribe(self, session, topic_filter):
+        node = self._subscriptions
+        for level in topic_filter.split("/"):
+            node = node[0].setdefault(level, ({}, {}))
+        node[1][session] = None
+        now = time.monotonic()
+        for topic, (payload, expires) in list(self._retained.items()):
+            if expires is not None and expires <= now:
+                del self._retained[topic]
+            elif mqtt.topic_matches_sub(topic_filter, topic):
+                session.deliver(topic, payload, True)
+
+    def unsubscribe(self, session, topic_filter):
+        node = self._subscriptions
+        for level in topic_filter.split("/"):
+            node = node[0].get(level)
+            if node is None:
+                return
+        node[1].pop(session, None)
+
+    def publish(self, topic, payload, retain=False, expiry=None):
+        self.stats["published"] += 1
+        if retain and payload:
+            self._retained[topic] = (payload, None if expiry is None else time.monotonic() + expiry)
+        elif retain:
+            self._retained.pop(topic, None)  # An empty retained message clears the topic
+        sessions = {}  # Each subscribed session once, whatever filters match
+        self._match(self._subscriptions, topic.split("/"), 0, sessions)
+        for session in sessions:
+            session.deliver(topic, payload, False)
+        self.stats["delivered"] += len(sessions)
+
+    def _match(self, node, levels, depth, sessions):
+        children = node[0]
+        if "#" in children:
+            sessions.update(children["#"][1])  # Also the parent level itself
+        if depth == len(levels):
+            sessions.update(node[1])
+            return
+        for level in (levels[depth], "+"):
+            child = children.get(level)
+            if child is not None:
+                self._match(child, levels, depth + 1, sessions)
+
+
+class LocalSession:
+    # One connection to a LocalBroker. Stands in for the paho client of an
+    # MQTTClient with the calls and callbacks it uses, so the client's own
+    # queueing, decoding and aliasing run unchanged
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.on_connect = self.on_disconnect = self.on_message = None
+        self._filters = set()
+        self._aliases = {}  # alias -> topic of this connection's publishes
+        self._will = None  # (topic, payload, retain)
+        self._connected = False
+
+    def reconnect_delay_set(self, min_delay, max_delay):
+        pass
+
+    def will_set(self, topic, payload=None, qos=0, retain=False, properties=None):
+        self._will = (topic, payload or b"", retain)
+
+    def connect_async(self, host, port, keepalive):
+        pass
+
+    def loop_start(self):
+        # Connected on the next loop iteration, as after a round trip
+        asyncio.get_running_loop().call_soon(self._connect)
+
+    def loop_stop(self):
+        pass
+
+    def is_connected(self):
+        return self._connected
+
+    def _connect(self):
+        self._connected = True
+        self._aliases = {}
+        properties = Properties(PacketTypes.CONNACK)
+        properties.TopicAliasMaximum = ALIAS_MAXIMUM
+        self.on_connect(self, None, None, ReasonCode(PacketTypes.CONNACK), properties)
+
+    def disconnect(self):
+        # Clean disconnect, the broker discards the will
+        self._close()
+
+    def lose(self):
+        # Connection lost without a disconnect, the broker publishes the will
+        if self._close() and self._will is not None:
+            topic, payload, retain = self._will
+            self.broker.publish(topic, payload, retain)
+
+    def _close(self):
+        if not self._connected:
+            return False
+        self._connected = False
+        for topic_filter in self._filters:
+            self.broker.unsubscribe(self, topic_filter)
+        self._filters.clear()
+        self.on_disconnect(self, None, None, ReasonCode(PacketTypes.DISCONNECT), None)
+        return True
+
+    def subscribe(self, topic, qos=0):
+        for topic_filter, _ in topic if isinstance(topic, list) else [(topic, qos)]:
+            if topic_filter not in self._filters:
+                self._filters.add(topic_filter)
+                self.broker.subscribe(self, topic_filter)
+
+    def unsubscribe(self, topic):
+        if topic in self._filters:
+            self._filters.discard(topic)
+            self.broker.unsubscribe(self, topic)
+
+    def publish(self, topic, payload=None, qos=0, retain=False, properties=None):
+        if not self._connected:
+            return PublishInfo(mqtt.MQTT_ERR_NO_CONN)
+        alias = getattr(properties, "TopicAlias", None)
+        if alias is not None and alias > ALIAS_MAXIMUM:
+            raise ValueError(f"Topic alias {alias} above the maximum of {ALIAS_MAXIMUM}")
+        if alias is not None and topic:
+            self._aliases[alias] = topic
+        elif alias is not None:
+            topic = self._aliases[alias]
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self.broker.publish(topic, payload or b"", retain, getattr(properties, "MessageExpiryInterval", None))
+        return PublishInfo(mqtt.MQTT_ERR_SUCCESS)
+
+    def deliver(self, topic, payload, retain):
+        self.on_message(self, None, LocalMessage(topic, payload, retain))
+
+
+class LocalClient(MQTTClient):
+    # MQTTClient on a LocalBroker instead of a network connection
+
+    def __init__(self, broker, **options):
+        self.broker = broker
+        super().__init__("local", 0, **options)
+
+    def _transport(self):
+        return LocalSession(self.broker)
+
+    def cut(self):
+        # Loses the connection like a crashed process, without a reconnect
+        self._client.lose()
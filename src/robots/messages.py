@@ -0,0 +1,19 @@
+import struct
+from collections import namedtuple
+
+VERSION = 2  # Raised when the layout changes, older robots drop the messages
+MESSAGE = struct.Struct("!BIiI")  # Version, epoch, robot ID, connection: 13 bytes in network byte order
+
+Message = namedtuple("Message", ["epoch", "robot_id", "connection"])
+
+
+def encode(epoch, robot_id, connection=0, version=VERSION):
+    # connection: ID of the sender's MQTT connection, named again in its last will
+    return MESSAGE.pack(version, epoch, robot_id, connection)
+
+
+def decode(payload):
+    # Message of another robot, None if malformed or of another version
+    if len(payload) != MESSAGE.size or payload[0] != VERSION:
+        return None
+    return Message._make(MESSAGE.unpack(payload)[1:])
@@ -0,0 +1,185 @@
+import asyncio
+import collections
+import secrets
+import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+KEEPALIVE = 60  # Seconds between MQTT pings
+RECONNECT_DELAY = (0.05, 2)  # First and longest wait between connection attempts in seconds
+MESSAGE_QUEUE = 10000  # Received messages waiting for the asyncio loop, the oldest are dropped beyond
+UNSUPPORTED_PROTOCOL = 132  # CONNACK reason code of brokers without MQTT v5
+
+
+class MQTTClient:
+    # One paho connection shared by all robots of a process. Each topic is
+    # subscribed once at the broker however many robots listen to it, and a
+    # received message is handed to every handler on the asyncio loop, so
+    # the robots never run on paho's network thread. Messages wait in one
+    # bounded queue, drained by a single loop callback per burst; a payload
+    # is decoded there once for all handlers of the same decoder.
+    # Speaks MQTT v5 and falls back to 3.1.1 for brokers without it. With
+    # v5, topics published with alias=True are sent as a number after the
+    # first publish, up to the aliases the broker grants.
+    # The broker publishes the last will when the connection is lost without
+    # a disconnect; connection is a random ID for its robots to name in it
+
+    def __init__(self, host, port, keepalive=KEEPALIVE, client_id="", reconnect_delay=RECONNECT_DELAY,
+                 queue_size=MESSAGE_QUEUE, protocol=mqtt.MQTTv5):
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.client_id = client_id
+        self.reconnect_delay = reconnect_delay
+        self.protocol = protocol
+        self.connection = secrets.randbits(32)
+        self._will = None  # (topic, payload) published by the broker if the connection is lost
+        self._client = self._create_client()
+        self._handlers = {}  # topic filter -> [(handler(topic, message), decode(payload) or None)]
+        self._wildcards = {}  # handlers of the filters with + or #
+        self._aliases = {}  # topic -> alias for publishing on this connection
+        self._alias_maximum = 0  # Aliases granted by the broker
+        self._loop = None
+        self._queue = collections.deque(maxlen=queue_size)  # (topic, payload) from the network thread
+        self._drain_scheduled = False
+        self.connected = None  # asyncio.Event, set while connected
+        self.stats = {"received": 0, "dispatched": 0, "published": 0, "dropped": 0}
+
+    def _transport(self):
+        # The paho client, a subclass may hand in a stand-in with the same calls
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, self.client_id, protocol=self.protocol)
+
+    def _create_client(self):
+        client = self._transport()
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = self._on_message
+        client.reconnect_delay_set(*self.reconnect_delay)  # paho retries, also the first connect
+        if self._will:
+            client.will_set(*self._will)
+        return client
+
+    def start(self):
+        # Connects in the background, robots may subscribe before it is done
+        self._loop = asyncio.get_running_loop()
+        self.connected = asyncio.Event()
+        self._connect()
+
+    def _connect(self):
+        self._client.connect_async(self.host, self.port, self.keepalive)
+        self._client.loop_start()
+
+    async def connect(self):
+        self.start()
+        await self.connected.wait()
+
+    async def disconnect(self):
+        self._client.disconnect()
+        await asyncio.to_thread(self._client.loop_stop)
+
+    def set_will(self, topic, payload):
+        # Sent to the broker with the next connect, so set it before start()
+        self._will = (topic, payload)
+        self._client.will_set(topic, payload)
+
+    def subscribe(self, topic, handler, qos=0, decode=None):
+        # handler(topic, payload), or handler(topic, decode(payload)) with a decoder
+        handlers = self._handlers.setdefault(topic, [])
+        if "+" in topic or "#" in topic:
+            self._wildcards[topic] = handlers
+        handlers.append((handler, decode))
+        if len(handlers) == 1 and self._client.is_connected():
+            self._client.subscribe(topic, qos)
+
+    def unsubscribe(self, topic, handler):
+        handlers = self._handlers.get(topic)
+        entry = next((entry for entry in handlers or () if entry[0] == handler), None)
+        if entry is None:
+            return
+        handlers.remove(entry)
+        if not handlers:
+            del self._handlers[topic]
+            self._wildcards.pop(topic, None)
+            if self._client.is_connected():
+                self._client.unsubscribe(topic)
+
+    def publish(self, topic, payload, qos=0, retain=False, alias=False, expiry=None):
+        # alias: the topic is published often, so it is worth one of the broker's aliases.
+        # expiry: seconds until the broker discards the message, a retained one too (MQTT v5)
+        self.stats["published"] += 1
+        properties = None
+        if expiry is not None and self.protocol == mqtt.MQTTv5:
+            properties = Properties(PacketTypes.PUBLISH)
+            properties.MessageExpiryInterval = expiry
+        aliases = self._aliases  # Replaced on every connect
+        if not alias or (topic not in aliases and len(aliases) >= self._alias_maximum):
+            return self._client.publish(topic, payload, qos, retain, properties)
+        properties = properties or Properties(PacketTypes.PUBLISH)
+        if topic in aliases:
+            properties.TopicAlias = aliases[topic]
+            return self._client.publish("", payload, qos, retain, properties)
+        properties.TopicAlias = len(aliases) + 1
+        info = self._client.publish(topic, payload, qos, retain, properties)
+        if info.rc == mqtt.MQTT_ERR_SUCCESS:
+            aliases[topic] = properties.TopicAlias  # The broker knows it from now on
+        return info
+
+    def _fall_back(self, client):
+        # The broker rejected MQTT v5, the next attempt uses 3.1.1
+        if client is not self._client:
+            return  # Already replaced after an earlier attempt
+        client.disconnect()
+        self._loop.run_in_executor(None, client.loop_stop)
+        self.protocol = mqtt.MQTTv311
+        self._client = self._create_client()
+        self._connect()
+
+    ## paho network thread ##
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code == UNSUPPORTED_PROTOCOL and self.protocol == mqtt.MQTTv5:
+            self._loop.call_soon_threadsafe(self._fall_back, client)
+            return
+        if reason_code.is_failure:
+            return  # paho tries again
+        self._aliases = {}
+        self._alias_maximum = getattr(properties, "TopicAliasMaximum", 0) if properties else 0
+        # Also after a reconnect, the broker forgot the subscriptions
+        if self._handlers:
+            client.subscribe([(topic, 0) for topic in list(self._handlers)])
+        self._loop.call_soon_threadsafe(self.connected.set)
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties):
+        self._loop.call_soon_threadsafe(self.connected.clear)
+
+    def _on_message(self, client, userdata, msg):
+        # Appended before the flag is checked, the drain clears it before reading
+        if len(self._queue) == self._queue.maxlen:
+            self.stats["dropped"] += 1
+        self._queue.append((msg.topic, msg.payload))
+        if not self._drain_scheduled:
+            self._drain_scheduled = True
+            self._loop.call_soon_threadsafe(self._drain)
+
+    ## asyncio loop ##
+
+    def _drain(self):
+        self._drain_scheduled = False
+        for _ in range(len(self._queue)):  # Later arrivals scheduled another drain
+            self._dispatch(*self._queue.popleft())
+
+    def _dispatch(self, topic, payload):
+        self.stats["received"] += 1
+        handlers = list(self._handlers.get(topic, ()))
+        for topic_filter, matching in self._wildcards.items():
+            if topic_filter != topic and mqtt.topic_matches_sub(topic_filter, topic):
+                handlers += matching
+        decoded = {}  # decoder -> message, each decoder runs once
+        for handler, decode in handlers:
+            if decode is None:
+                handler(topic, payload)
+                continue
+            if decode not in decoded:
+                decoded[decode] = decode(payload)
+            handler(topic, decoded[decode])
+        self.stats["dispatched"] += len(handlers)
@@ -1,205 +1,680 @@
+import argparse
+import asyncio
+import collections
+import math
+import os
+import random
+import secrets
 import signal
 import time
-import threading
-import paho.mqtt.client as mqtt
 
 import grpc
+from common import logger
+from common.hashring import HashRing
 from proto import robot_service_pb2
 from proto import robot_service_pb2_grpc
+from robots.messages import decode, encode
+from robots.mqtt_client import MQTTClient
+from robots.scheduler import Scheduler
 
-# Configuration
+# Configuration (environment variables, overridden by the command line flags)
 GRPC_HOST = "controller"  # local = localhost || docker = controller
 GRPC_PORT = 50051
-MQTT_HOST = "broker"  # local = localhost || docker = broker
-MQTT_PORT = 1883
+GRPC_SEEDS = os.environ.get("GRPC_SEEDS", f"{GRPC_HOST}:{GRPC_PORT}").split(",")  # Controllers asked for the cluster
+SEED_TIMEOUT = 2  # Seconds to wait for a seed controller
+MQTT_HOST = os.environ.get("MQTT_HOST", "broker")  # local = localhost || docker = broker
+MQTT_PORT = int(os.environ.get("MQTT_PORT", 1883))
+ROBOT_NAME = os.environ.get("ROBOT_NAME")  # Generated if not set
+RETRY_BACKOFF = (0.05, 2)  # First and longest wait between connection attempts in seconds
+CHANNEL_OPTIONS = [("grpc.initial_reconnect_backoff_ms", 50), ("grpc.max_reconnect_backoff_ms", 2000)]
 
 # MQTT topics
-TOPIC_ELECTION_START = "robots/election/start"
-TOPIC_ELECTION_CANDIDATE = "robots/election/candidate"
+TOPIC_ANNOUNCE = "robots/announce"  # Sent once registered, so the others learn the ID
 TOPIC_ELECTION_RESULT = "robots/election/result"
-TOPIC_STATUS = "robots/status"
-
-# Robot data
-id = -1
-name = "default"
-captain = False
-stub = None  # gRPC
-client = None  # MQTT
+TOPIC_STATUS = "robots/status"  # Retained captain heartbeat, only the captain publishes
+TOPIC_OFFLINE = "robots/offline"  # Last will of a robot connection, or the captain stopping
+TOPICS = [TOPIC_ANNOUNCE, TOPIC_ELECTION_RESULT, TOPIC_STATUS, TOPIC_OFFLINE]
+TOPIC_ROBOT = "robots/{}/{}"  # Namespace of one robot (ID, message kind), only it subscribes
+ELECTION_START = "start"  # Sent by a lower robot to each higher one
+ELECTION_ALIVE = "alive"  # Answer of a higher robot to the initiator
+ELECTION_GRANT = "grant"  # The initiator hands the election to the highest robot that answered
+ELECTION_KINDS = [ELECTION_START, ELECTION_ALIVE, ELECTION_GRANT]  # Subscribed as exact topics, no wildcard
+
+# gRPC session
+HEALTH_INTERVAL = float(os.environ.get("HEALTH_INTERVAL", 10))  # Until the controller pushes its own interval
 
 # MQTT clients
-HEARTBEAT_INTERVAL = 2
-HEARTBEAT_TIMEOUT = 10
-election_candidates = []
-recent_heartbeat = None  # time.time() if election at start
-
-
-## gRPC methods ##
-
-def register():
-    global id, name, captain, stub
-    response = stub.RegisterRobot(robot_service_pb2.RobotInfo(name=name))
-    id = response.id
-    captain = False
-    print(f"[gRPC] {name} with ID={id} and Captain={captain} connected")
-
-
-def unregister():
-    global id, name, stub
-    response = stub.UnregisterRobot(robot_service_pb2.RobotData(id=id, name=name))
-    if (response.success == True):
-        print("[gRPC] Robot disconnected")
-    else:
-        print("[gRPC] Robot could not disconnect")
-
-
-def checkHealth():
-    global id, name, stub
-    response = stub.HealthCheck(robot_service_pb2.RobotData(id=id, name=name))
-    if response.connected:
-        print("[gRPC] Robot is connected")
-        if response.elect:
-            startElection()
-    else:
-        print("[gRPC] Robot is disconnected")
-
-
-def registerCaptain():
-    global id, name, stub
-    response = stub.RegisterCaptain(robot_service_pb2.RobotData(id=id, name=name))
-    if response.success:
-        print("[gRPC] Robot registered as captain")
-    else:
-        print("[gRPC] Captain registration failed")
-
-
-## MQTT methods ##
-
-def on_connect(client, userdata, flags, reason_code, properties):
-    print(f"[MQTT] Robot connected: {reason_code}")
-    client.subscribe([(TOPIC_ELECTION_START, 0), (TOPIC_ELECTION_CANDIDATE, 0),
-                      (TOPIC_ELECTION_RESULT, 0), (TOPIC_STATUS, 0)])
-
-
-def on_message(client, userdata, msg):
-    global id, captain, election_candidates
-    topic = msg.topic
-    payload = msg.payload.decode()
-
-    print(f"[MQTT] Message received for {topic}: {payload}")
-
-    if topic == TOPIC_STATUS:
-        global recent_heartbeat
-        recent_heartbeat = time.time()
-    elif topic == TOPIC_ELECTION_START:
-        threading.Thread(target=electCaptain, daemon=True).start()
-    elif topic == TOPIC_ELECTION_CANDIDATE:
-        if not id == int(payload):
-            print(f"[MQTT] Robot ({payload}) candidates as captain")
-        election_candidates.append(int(payload))
-    elif topic == TOPIC_ELECTION_RESULT:
-        if int(payload) == id:
-            captain = True
-            print("[MQTT] Robot elected as captain")
-            registerCaptain()
+HEARTBEAT_INTERVAL = float(os.environ.get("HEARTBEAT_INTERVAL", 3))  # Once the fleet is stable
+HEARTBEAT_TIMEOUT = float(os.environ.get("HEARTBEAT_TIMEOUT", 10))
+HEARTBEAT_SPEEDUP = 8  # The first heartbeats after an election come this much faster
+ELECTION_ANSWER_TIMEOUT = 0.5  # Seconds for a higher robot to answer before it counts as gone
+ELECTION_RESULT_TIMEOUT = 3  # Seconds for the captain announcement once a higher robot answered
+STANDBY_RANKS = 8  # Higher robots a robot missing the captain waits for, one answer timeout each
+STANDBY_STAGGER = 0.01  # Seconds between the starts of robots past STANDBY_RANKS, the lowest first
+ELECTION_QUEUE = 1000  # Pending election events per robot, further distinct ones are dropped
+
+# Logging
+MESSAGE_LOG_SAMPLE = 50  # Log every Nth received MQTT message at debug level
+grpc_log = logger.get_logger("gRPC")
+mqtt_log = logger.get_logger("MQTT")
+robot_log = logger.get_logger("Robot")
+
+
+def generate_name():
+    return f"Robot-{secrets.token_hex(3)}"
+
+
+def backoff(first=RETRY_BACKOFF[0], longest=RETRY_BACKOFF[1]):
+    # Exponentially growing waits with full jitter, so restarted fleets spread out
+    delay = first
+    while True:
+        yield random.uniform(0, delay)
+        delay = min(2 * delay, longest)
+
+
+async def wait_event(event, seconds):
+    # Sleeps up to seconds, True if the event was set
+    try:
+        await asyncio.wait_for(event.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
+    return event.is_set()
+
+
+class ChannelPool:
+    # One grpc.aio channel per controller address, shared by all robots of a process
+
+    def __init__(self, seeds=GRPC_SEEDS):
+        self.seeds = seeds
+        self._channels = {}
+
+    def stub(self, address):
+        channel = self._channels.get(address)
+        if channel is None:
+            channel = self._channels[address] = grpc.aio.insecure_channel(address, CHANNEL_OPTIONS)
+        return robot_service_pb2_grpc.RobotServiceStub(channel)
+
+    async def seed(self, stop):
+        # Address of the first reachable controller of the seed list, retried
+        # with backoff until one answers. ConnectionError once stop is set
+        for delay in backoff():
+            for address in self.seeds:
+                self.stub(address)
+                ready = asyncio.ensure_future(self._channels[address].channel_ready())
+                stopped = asyncio.ensure_future(stop.wait())
+                await asyncio.wait((ready, stopped), timeout=SEED_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+                stopped.cancel()
+                if ready.done():
+                    return address
+                ready.cancel()
+                if stop.is_set():
+                    break
+                grpc_log.warning("Controller {} not reachable", address)
+            if await wait_event(stop, delay):
+                raise ConnectionError("No controller reachable")
+
+    async def cluster(self, address):
+        # Shard map of the controller, None without a cluster
+        try:
+            cluster = await self.stub(address).GetCluster(robot_service_pb2.Empty(), timeout=SEED_TIMEOUT)
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                raise
+            return None
+        return cluster if cluster.shards else None
+
+    async def close(self):
+        for channel in self._channels.values():
+            await channel.close()
+        self._channels.clear()
+
+
+def shard_address(cluster, robot_id, default):
+    # Address of the controller shard owning the robot's ID (default without a cluster)
+    if cluster is None:
+        return default
+    owner = HashRing([shard.node for shard in cluster.shards], cluster.replicas).owner(robot_id)
+    return next(shard.address for shard in cluster.shards if shard.node == owner)
+
+
+class Robot:
+    # One simulated robot. Every method runs on the asyncio loop of its host;
+    # the gRPC channels and the MQTT connection may be shared with other robots.
+    # Heartbeats and the captain timeout are deadlines of the robot's
+    # scheduler, so an idle robot never wakes up and a shutdown ends it at once.
+    # The connection's last will names it in robots/offline: when the broker
+    # loses the captain's connection the election starts at once, the
+    # heartbeat timeout remains for partitions the broker does not notice
+
+    def __init__(self, name, mqtt_client, stub=None, heartbeat_interval=HEARTBEAT_INTERVAL,
+                 heartbeat_timeout=HEARTBEAT_TIMEOUT, health_interval=HEALTH_INTERVAL):
+        self.id = -1
+        self.name = name
+        self.captain = False
+        self.stub = stub  # gRPC, set when registering through a ChannelPool
+        self.client = mqtt_client  # MQTT
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.heartbeat_delay = heartbeat_interval  # Until the next own heartbeat as captain
+        self.health_interval = health_interval
+        self.captain_id = -1  # Last captain heard of
+        self.captain_epoch = -1  # Epoch it was elected in
+        self.epoch = 0  # Newest election epoch heard of
+        self.answered = -1  # Epoch of the election starts answered in answered_to
+        self.answered_to = set()  # Lower robots answered in that epoch
+        self.announced = -1  # Epoch this robot last announced itself in
+        self.answers = set()  # Higher robots that answered the own election
+        self.peers = set()  # IDs of the robots heard of, for the bully election
+        self.connections = {}  # Robot ID -> ID of the MQTT connection it sends on
+        self.election = None  # "answer", "result" or "standby" while waiting in an election
+        self.events = collections.OrderedDict()  # (event, epoch, sender, connection) -> None, in arrival order
+        self.events_ready = asyncio.Event()
+        self.event_stats = {"handled": 0, "merged": 0, "dropped": 0}
+        self.scheduler = Scheduler()  # "heartbeat" while captain, "captain_timeout" otherwise, "election"
+        self.registered = asyncio.Event()  # Cleared when the controller no longer knows the robot
+        self.shutdown_event = asyncio.Event()
+        self._tasks = set()  # Election worker, announcements and captain registrations
+        mqtt_client.set_will(TOPIC_OFFLINE, encode(0, -1, mqtt_client.connection))  # Same for all its robots
+
+    def data(self):
+        return robot_service_pb2.RobotData(id=self.id, name=self.name)
+
+    async def wait(self, seconds):
+        # Sleeps up to seconds, True once the robot is shutting down
+        return await wait_event(self.shutdown_event, seconds)
+
+    def spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    ## gRPC methods ##
+
+    def setRegistered(self, robot_id, epoch=0):
+        # The other robots learn the new ID, higher ones are asked in elections.
+        # Elections start after the controller's epoch
+        if robot_id != self.id:
+            for kind in ELECTION_KINDS:
+                if self.id >= 0:
+                    self.client.unsubscribe(TOPIC_ROBOT.format(self.id, kind), self.on_message)
+                self.client.subscribe(TOPIC_ROBOT.format(robot_id, kind), self.on_message, decode=decode)
+        self.id = robot_id
+        self.epoch = max(self.epoch, epoch)
+        self.registered.set()
+        self.spawn(self.announce())
+
+    async def register(self):
+        response = await self.stub.RegisterRobot(robot_service_pb2.RobotInfo(name=self.name))
+        self.captain = False
+        self.setRegistered(response.id, response.epoch)
+        grpc_log.info("{} with ID={} and Captain={} connected", self.name, self.id, self.captain)
+
+    async def unregister(self):
+        response = await self.stub.UnregisterRobot(self.data())
+        if response.success:
+            grpc_log.info("Robot ({}) disconnected", self.id)
         else:
-            captain = False
-            print(f"[MQTT] New captain is ({payload})")
-
-
-def electCaptain():
-    global client, id, election_candidates, recent_heartbeat
-    print("[MQTT] New captain election started")
-    recent_heartbeat = time.time()
-    election_candidates = []
-    print(f"[MQTT] Candidating for captain election ({id})")
-    client.publish(TOPIC_ELECTION_CANDIDATE, id)
-
-    time.sleep(3)  # Waiting for other candidates
-
-    if id == max(election_candidates):
-        print(f"[MQTT] Publishing myself as captain ({id})")
-        client.publish(TOPIC_ELECTION_RESULT, id)
-    else:
-        print("[MQTT] Rejecting candidation...")
-
-
-def startElection():
-    global client, id, recent_heartbeat
-    print("[MQTT] Starting new captain election...")
-    recent_heartbeat = time.time()
-    client.publish(TOPIC_ELECTION_START, id)
-
-
-def heartbeat():
-    global client, id
-    client.publish(TOPIC_STATUS, id)
-
-
-def checkHeartbeat():
-    global recent_heartbeat
-    if recent_heartbeat is not None and time.time() - recent_heartbeat > HEARTBEAT_TIMEOUT:
-        print("[MQTT] Missing heartbeat from captain")
-        startElection()
-
-
-## Thread methods ##
-
-def run_grpc():
-    global stub
-    with grpc.insecure_channel(f"{GRPC_HOST}:{GRPC_PORT}") as channel:
-        stub = robot_service_pb2_grpc.RobotServiceStub(channel)
-        print("[Robot] Started gRPC client")
-        register()
-
-        while not shutdown_event.is_set():
-            checkHealth()
-            time.sleep(10)
-        print("[Robot] gRPC client stopping...")
-        unregister()
-        channel.close()
-
-
-def run_mqtt():
-    global id, client, captain
-    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-    client.on_connect = on_connect
-    client.on_message = on_message
-    client.connect(MQTT_HOST, MQTT_PORT, 60)
-
-    client.loop_start()
-    while not shutdown_event.is_set():
+            grpc_log.warning("Robot ({}) could not disconnect", self.id)
+
+    async def checkHealth(self):
+        self.handleCommands(await self.stub.HealthCheck(self.data()))
+
+    async def heartbeats(self):
+        while not self.shutdown_event.is_set():
+            yield self.data()
+            await self.wait(self.health_interval)
+
+    async def runSession(self):
+        # Long-lived stream: liveness goes up, commands come down as soon as sent.
+        # Ends when the controller forgot the robot, so it registers again
+        async for command in self.stub.Session(self.heartbeats()):
+            self.handleCommands(command)
+            if not self.registered.is_set():
+                return
+
+    def handleCommands(self, command):
+        if not command.connected:
+            grpc_log.warning("Robot ({}) is disconnected", self.id)
+            self.registered.clear()
+            return
+        if command.heartbeat_interval > 0 and command.heartbeat_interval != self.health_interval:
+            self.health_interval = command.heartbeat_interval
+            grpc_log.info("Heartbeat interval set to {}s", self.health_interval)
+        if command.elect:
+            self.startElection()
+        if command.shutdown:
+            grpc_log.info("Shutdown requested by controller")
+            self.shutdown_event.set()
+
+    async def registerCaptain(self):
+        if self.stub is None:
+            return  # Robots elect without a controller too
+        epoch = self.captain_epoch
+        try:
+            response = await self.stub.RegisterCaptain(robot_service_pb2.RobotData(id=self.id, name=self.name,
+                                                                                   epoch=epoch))
+            if response.success:
+                grpc_log.info("Robot ({}) registered as captain", self.id)
+                return
+            current = await self.stub.GetCaptain(robot_service_pb2.Empty())
+        except grpc.RpcError as e:
+            grpc_log.warning("Captain registration failed ({})", e.code().name)
+            return
+        # A newer election ended without this robot hearing it: elect again after it
+        grpc_log.warning("Captain registration of epoch {} rejected, controller is at epoch {}", epoch, current.epoch)
+        self.post("captain_rejected", current.epoch)
+
+    ## MQTT methods ##
+
+    def on_message(self, topic, message):
+        # Decoded once per received message by the MQTT client, for all robots
+        mqtt_log.debug("Message received for {}: {}", topic, message, sample=MESSAGE_LOG_SAMPLE)
+        if message is None:
+            mqtt_log.debug("Invalid message for {}", topic)
+            return
+        event = topic if topic in TOPICS else topic.rpartition("/")[2]  # Kind of a message to this robot
+        if message.epoch < self.epoch and event in (ELECTION_START, TOPIC_ELECTION_RESULT):
+            return  # Election already replaced by a newer one
+        self.post(event, message.epoch, message.robot_id, message.connection)
+
+    def post(self, event, epoch=-1, sender=-1, connection=None):
+        # Queues an event for the election worker. A repeat of a queued event
+        # is merged into it, so a flood of election starts costs one entry
+        key = (event, epoch, sender, connection)
+        if key in self.events:
+            self.event_stats["merged"] += 1
+            return
+        if len(self.events) >= ELECTION_QUEUE:
+            self.event_stats["dropped"] += 1  # The election timeouts recover
+            return
+        self.events[key] = None
+        self.events_ready.set()
+
+    async def runElections(self):
+        # The one worker of the election state machine: messages, timeouts and
+        # starts change the state only here, one event after the other
+        while True:
+            await self.events_ready.wait()
+            self.events_ready.clear()
+            while self.events:
+                event, epoch, sender, connection = self.events.popitem(last=False)[0]
+                self.event_stats["handled"] += 1
+                self.handle(event, epoch, sender, connection)
+
+    def handle(self, event, epoch, sender, connection=None):
+        if event == "elect":
+            self.beginElection()
+        elif event == "captain_timeout":
+            mqtt_log.warning("Missing heartbeat from captain")
+            self.peers.discard(self.captain_id)
+            self.standBy()
+        elif event == "captain_rejected":
+            self.epoch = max(self.epoch, epoch)  # The controller's
+            if self.captain and self.captain_epoch <= epoch:
+                self.setCaptain(False)
+                self.beginElection()
+        elif event == "answer_timeout":
+            self.noAnswer()
+        elif event == "result_timeout":
+            self.noResult()
+        elif event == TOPIC_OFFLINE:
+            self.connectionLost(connection, sender)
+        elif event == TOPIC_STATUS:
+            self.heardFrom(sender, connection)
+            self.captainAlive(epoch, sender)
+        else:
+            self.heardFrom(sender, connection)  # Also from announcements of an older epoch
+            if epoch < self.epoch:
+                return
+            self.epoch = epoch
+            if event == ELECTION_START:
+                self.electCaptain(sender)
+            elif event == ELECTION_ALIVE:
+                self.answerReceived(sender)
+            elif event == ELECTION_GRANT:
+                self.takeOver(sender)
+            elif event == TOPIC_ELECTION_RESULT:
+                self.captainElected(epoch, sender)
+
+    def heardFrom(self, robot_id, connection):
+        self.peers.add(robot_id)
+        self.connections[robot_id] = connection
+
+    def connectionLost(self, connection, robot_id):
+        # Last will of a connection (robot_id -1): all its robots are gone. The
+        # captain stopping names only itself. An election starts without
+        # waiting for the heartbeat timeout if the captain was among them
+        lost = {peer for peer, known in self.connections.items() if known == connection and robot_id in (-1, peer)}
+        for peer in lost:
+            del self.connections[peer]
+        self.peers.difference_update(lost)
+        if self.captain_id in lost and not self.captain:
+            mqtt_log.warning("Captain ({}) went offline", self.captain_id)
+            self.standBy()
+
+    def publish(self, topic, epoch=None, **options):
+        # To all robots, the topic is sent as an alias after the first time
+        message = encode(self.epoch if epoch is None else epoch, self.id, self.client.connection)
+        self.client.publish(topic, message, alias=True, **options)
+
+    def send(self, robot_id, kind):
+        # To one robot, through its own namespace
+        self.client.publish(TOPIC_ROBOT.format(robot_id, kind), encode(self.epoch, self.id, self.client.connection))
+
+    async def announce(self):
+        await self.client.connected.wait()
+        self.publish(TOPIC_ANNOUNCE)
+
+    def higherPeers(self):
+        return [peer for peer in self.peers if peer > self.id]
+
+    def startElection(self):
+        self.post("elect")
+
+    def beginElection(self):
+        # Bully election: the start goes to each higher robot's namespace, only
+        # they answer, and the highest one alive announces itself without
+        # waiting for anyone. Every election gets the next epoch
+        if self.election is not None or not self.registered.is_set():
+            return
+        self.epoch += 1
+        mqtt_log.info("Starting new captain election ({})...", self.epoch)
+        self.watchCaptain()
+        higher = self.higherPeers()
+        if not higher:
+            self.announceCaptain()
+            return
+        self.answers = set()
+        for peer in higher:
+            self.send(peer, ELECTION_START)
+        self.awaitAnswer()
+
+    def standBy(self):
+        # The captain is missed by all robots at once, so not all of them
+        # start: each waits one answer timeout per higher robot it knows.
+        # The highest one alive starts at once, its result ends the others'.
+        # Higher robots gone without a will (a whole host cut off) must not
+        # delay the failover by minutes: past STANDBY_RANKS the lowest robot
+        # starts first, and the higher ones answering it wait for its result
+        if self.election is not None or not self.registered.is_set():
+            return
+        rank = len(self.higherPeers())
+        if rank == 0:
+            self.beginElection()
+            return
+        self.election = "standby"
+        if rank <= STANDBY_RANKS:
+            delay = rank * ELECTION_ANSWER_TIMEOUT
+        else:
+            lower = sum(peer < self.id for peer in self.peers)
+            delay = (STANDBY_RANKS + 1) * ELECTION_ANSWER_TIMEOUT + lower * STANDBY_STAGGER
+        self.scheduler.after("election", delay, lambda: self.post("result_timeout"))
+
+    def electCaptain(self, initiator):
+        # Election start of a lower robot, answered once per initiator and epoch
+        if initiator >= self.id or not self.registered.is_set():
+            return
+        if self.captain_epoch == self.epoch and not self.captain:
+            return  # Already decided
+        if self.answered != self.epoch:
+            self.answered, self.answered_to = self.epoch, set()
+        if initiator in self.answered_to:
+            return
+        self.answered_to.add(initiator)
+        if self.captain or not self.higherPeers():
+            self.announceCaptain()  # Highest alive
+            return
+        mqtt_log.debug("Answering election of robot ({})", initiator)
+        self.send(initiator, ELECTION_ALIVE)
+        self.watchCaptain()
+        if self.election in (None, "standby"):
+            self.awaitResult()  # The initiator asked the higher robots too
+
+    def awaitAnswer(self):
+        self.election = "answer"
+        self.scheduler.after("election", ELECTION_ANSWER_TIMEOUT, lambda: self.post("answer_timeout"))
+
+    def answerReceived(self, robot_id):
+        # Once every higher robot answered, none of them announced itself:
+        # one knows of robots this one does not
+        if self.election != "answer" or robot_id < self.id:
+            return
+        self.answers.add(robot_id)
+        if self.answers.issuperset(self.higherPeers()):
+            self.handOver()
+
+    def noAnswer(self):
+        # The higher robots that did not answer are gone
+        if self.election != "answer":
+            return
+        self.peers.difference_update(set(self.higherPeers()) - self.answers)
+        self.handOver()
+
+    def handOver(self):
+        # The highest robot that answered announces itself, this one if none did.
+        # Robots above it that this one does not know take over from its result
+        if not self.answers:
+            self.announceCaptain()
+            return
+        self.send(max(self.answers), ELECTION_GRANT)
+        self.awaitResult()
+
+    def takeOver(self, initiator):
+        if initiator >= self.id or not self.registered.is_set():
+            return
+        if self.captain_epoch == self.epoch and not self.captain:
+            return  # Already decided
+        self.announceCaptain()
+
+    def awaitResult(self):
+        if self.election != "result":
+            self.election = "result"
+            self.scheduler.after("election", ELECTION_RESULT_TIMEOUT, lambda: self.post("result_timeout"))
+
+    def noResult(self):
+        if self.election == "standby":
+            self.election = None
+            self.beginElection()  # No higher robot started
+        elif self.election == "result":
+            mqtt_log.warning("No captain announced, restarting election")
+            self.election = None
+            self.standBy()
+
+    def announceCaptain(self):
+        if self.announced != self.epoch:
+            self.announced = self.epoch
+            mqtt_log.info("Publishing myself as captain ({})", self.id)
+            self.publish(TOPIC_ELECTION_RESULT)
+        self.awaitResult()  # Until the own announcement arrives
+
+    def captainElected(self, epoch, captain_id):
+        if (epoch, captain_id) < (self.captain_epoch, self.captain_id):
+            return  # Lower robot of the same epoch
+        if captain_id < self.id and self.registered.is_set():
+            # A lower robot announced itself: the highest one alive takes over
+            if self.captain:
+                self.publish(TOPIC_ELECTION_RESULT)
+            elif self.higherPeers():
+                self.awaitResult()
+            else:
+                self.beginElection()
+            return
+        self.scheduler.cancel("election")
+        self.election = None
+        self.captain_id, self.captain_epoch = captain_id, epoch
+        if captain_id == self.id:
+            mqtt_log.info("Robot ({}) elected as captain in epoch {}", self.id, epoch)
+            self.spawn(self.registerCaptain())
+            self.setCaptain(True)
+        else:
+            mqtt_log.debug("New captain is ({})", captain_id)
+            self.setCaptain(False)
+
+    def captainAlive(self, epoch, captain_id):
+        if (epoch, captain_id) < (self.captain_epoch, self.captain_id):
+            return  # Heartbeat of a replaced captain
+        if self.captain and captain_id != self.id:
+            self.setCaptain(False)  # Replaced by a newer captain
+        self.epoch = max(self.epoch, epoch)
+        self.captain_id, self.captain_epoch = captain_id, epoch
+        self.watchCaptain()
+
+    def setCaptain(self, captain):
+        self.captain = captain
         if captain:
-            heartbeat()
+            self.scheduler.cancel("captain_timeout")
+            self.heartbeat_delay = self.heartbeat_interval / HEARTBEAT_SPEEDUP
+            self.heartbeat()
         else:
-            checkHeartbeat()
-        time.sleep(HEARTBEAT_INTERVAL)
-    print("[Robot] MQTT client stopping...")
-    client.loop_stop()
-    client.disconnect()
+            self.scheduler.cancel("heartbeat")
+            self.watchCaptain()
+
+    def heartbeat(self):
+        # Retained, so a robot that subscribes later learns the captain at once,
+        # until the broker expires it when the captain would have timed out.
+        # Fast right after an election, then twice as slow each time up to
+        # heartbeat_interval while the fleet stays stable
+        if self.captain:
+            self.publish(TOPIC_STATUS, self.captain_epoch, retain=True, expiry=math.ceil(self.heartbeat_timeout))
+            self.scheduler.after("heartbeat", self.heartbeat_delay, self.heartbeat)
+            self.heartbeat_delay = min(2 * self.heartbeat_delay, self.heartbeat_interval)
+
+    def watchCaptain(self):
+        # Captain heard from (or election started): the timeout restarts
+        if not self.captain:
+            self.scheduler.after("captain_timeout", self.heartbeat_timeout, self.checkHeartbeat)
+
+    def checkHeartbeat(self):
+        # Fires exactly heartbeat_timeout after the captain was last heard
+        self.post("captain_timeout")
+
+    ## Robot tasks ##
+
+    async def connect(self, channels):
+        # Registers at a seed controller and switches to the shard owning the ID
+        address = await channels.seed(self.shutdown_event)
+        self.stub = channels.stub(address)
+        await self.register()
+        await self.useShard(channels, address)
+
+    async def reseed(self, channels):
+        # Controller unreachable while registered: continues at another seed,
+        # which knows the robot in a Raft group, or registers it again
+        address = await channels.seed(self.shutdown_event)
+        grpc_log.info("Using controller {}", address)
+        self.stub = channels.stub(address)
+        await self.useShard(channels, address)
+
+    async def useShard(self, channels, address):
+        shard = shard_address(await channels.cluster(address), self.id, address)
+        if shard != address:
+            grpc_log.info("Using controller shard {}", shard)
+            self.stub = channels.stub(shard)
+
+    async def keepAlive(self):
+        try:
+            await self.runSession()
+        except grpc.RpcError as e:
+            if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                raise
+            grpc_log.info("Controller without sessions, polling health")
+            while self.registered.is_set() and not await self.wait(self.health_interval):
+                await self.checkHealth()
+
+    async def run_grpc(self, channels):
+        # Reconnects with backoff when the controller is lost and registers
+        # again when it forgot the robot
+        delays = backoff()
+        reseed = False  # Last controller unreachable
+        while not self.shutdown_event.is_set():
+            try:
+                if not self.registered.is_set():
+                    await self.connect(channels)
+                elif reseed:
+                    await self.reseed(channels)
+                reseed = False
+                await self.keepAlive()
+                if self.registered.is_set():
+                    await self.wait(next(delays))  # Stream closed by the controller
+                else:
+                    delays = backoff()
+            except ConnectionError:
+                break
+            except grpc.RpcError as e:
+                if self.shutdown_event.is_set():
+                    break
+                grpc_log.warning("Controller lost ({}), reconnecting...", e.code().name)
+                reseed = e.code() == grpc.StatusCode.UNAVAILABLE
+                await self.wait(next(delays))
+        robot_log.info("gRPC client stopping...")
+        if self.registered.is_set():
+            try:
+                await self.unregister()
+            except grpc.RpcError:
+                grpc_log.warning("Robot ({}) could not disconnect", self.id)
+
+    async def run_mqtt(self):
+        self.spawn(self.runElections())
+        for topic in TOPICS:
+            self.client.subscribe(topic, self.on_message, decode=decode)
+        await self.shutdown_event.wait()
+        robot_log.info("MQTT client stopping...")
+        for topic in TOPICS + [TOPIC_ROBOT.format(self.id, kind) for kind in ELECTION_KINDS]:
+            self.client.unsubscribe(topic, self.on_message)
+        if self.captain:
+            self.publish(TOPIC_OFFLINE, self.captain_epoch)  # The others elect without waiting for the timeout
+            self.client.publish(TOPIC_STATUS, b"", retain=True)  # Clears the retained heartbeat
+        self.scheduler.cancel_all()
+        for task in list(self._tasks):
+            task.cancel()
+
+
+def add_arguments(parser):
+    # Connection flags shared by robot.py and host.py
+    parser.add_argument("--seeds", default=",".join(GRPC_SEEDS), help="Controller addresses (env GRPC_SEEDS)")
+    parser.add_argument("--mqtt-host", default=MQTT_HOST, help="MQTT broker host (env MQTT_HOST)")
+    parser.add_argument("--mqtt-port", type=int, default=MQTT_PORT, help="MQTT broker port (env MQTT_PORT)")
+    parser.add_argument("--heartbeat-interval", type=float, default=HEARTBEAT_INTERVAL,
+                        help="Seconds between captain heartbeats once stable (env HEARTBEAT_INTERVAL)")
+    parser.add_argument("--heartbeat-timeout", type=float, default=HEARTBEAT_TIMEOUT,
+                        help="Seconds without captain heartbeat before an election (env HEARTBEAT_TIMEOUT)")
+    parser.add_argument("--health-interval", type=float, default=HEALTH_INTERVAL,
+                        help="Seconds between health checks until the controller sets it (env HEALTH_INTERVAL)")
+
+
+async def main(args):
+    start_time = time.perf_counter()
+    channels = ChannelPool(args.seeds.split(","))
+    client = MQTTClient(args.mqtt_host, args.mqtt_port)
+    robot = Robot(args.name or generate_name(), client, heartbeat_interval=args.heartbeat_interval,
+                  heartbeat_timeout=args.heartbeat_timeout, health_interval=args.health_interval)
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, robot.shutdown_event.set)
+
+    async def ready():
+        # Registration and broker connection run in parallel
+        await client.connected.wait()
+        mqtt_log.info("Robot connected to broker")
+        await robot.registered.wait()
+        robot_log.info("Robot ready after {:.3f}s", time.perf_counter() - start_time)
+
+    client.start()
+    announce = asyncio.create_task(ready())
+    await asyncio.gather(robot.run_grpc(channels), robot.run_mqtt())
+    announce.cancel()
+    await client.disconnect()
+    await channels.close()
 
 
-shutdown_event = threading.Event()
-
 if __name__ == "__main__":
-    def handle_termination(signum, frame):
-        print("[Robot] All processes stopping...")
-        shutdown_event.set()
-
-
-    signal.signal(signal.SIGINT, handle_termination)
-    signal.signal(signal.SIGTERM, handle_termination)
-
-    print("[Robot] New client launched")
-    name = input("[Robot] Enter a name... ")
-
-    grpc_thread = threading.Thread(target=run_grpc, daemon=True)
-    mqtt_thread = threading.Thread(target=run_mqtt, daemon=True)
-
-    grpc_thread.start()
-    mqtt_thread.start()
-
-    while not shutdown_event.is_set():
-        time.sleep(0.5)
-    grpc_thread.join()
-    mqtt_thread.join()
-    print("[Robot] All processes stopped")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Runs one robot")
+    parser.add_argument("--name", default=ROBOT_NAME, help="Robot name (env ROBOT_NAME, generated if not set)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    robot_log.info("New client launched")
+    asyncio.run(main(args))
+    robot_log.info("All processes stopped")
+    logger.flush()
@@ -0,0 +1,53 @@
+import asyncio
+
+
+class Scheduler:
+    # Named one-shot timers of one robot on the asyncio loop. Moving a
+    # deadline later only updates it; the armed loop timer re-arms itself
+    # when it fires early. So a timeout that is extended on every message
+    # costs no timer operations and wakes the loop once per timeout period,
+    # while a deadline that passes fires at that exact moment
+
+    def __init__(self, loop=None):
+        self.loop = loop or asyncio.get_running_loop()
+        self._timers = {}  # name -> [deadline, handle, callback]
+        self.wakeups = 0  # Loop timers that fired, early ones included
+
+    def __contains__(self, name):
+        return name in self._timers
+
+    def after(self, name, delay, callback):
+        self.at(name, self.loop.time() + delay, callback)
+
+    def at(self, name, deadline, callback):
+        # (Re)arms the timer, replacing an earlier deadline and callback
+        timer = self._timers.get(name)
+        if timer is not None and timer[1].when() <= deadline:
+            timer[0], timer[2] = deadline, callback
+            return
+        if timer is not None:
+            timer[1].cancel()
+        self._timers[name] = [deadline, self.loop.call_at(deadline, self._fire, name), callback]
+
+    def deadline(self, name):
+        timer = self._timers.get(name)
+        return timer[0] if timer is not None else None
+
+    def cancel(self, name):
+        timer = self._timers.pop(name, None)
+        if timer is not None:
+            timer[1].cancel()
+
+    def cancel_all(self):
+        for timer in self._timers.values():
+            timer[1].cancel()
+        self._timers.clear()
+
+    def _fire(self, name):
+        self.wakeups += 1
+        timer = self._timers[name]
+        if timer[1].when() < timer[0]:
+            timer[1] = self.loop.call_at(timer[0], self._fire, name)  # Deadline moved later
+            return
+        del self._timers[name]
+        timer[2]()
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+from robots.robot import TOPIC_STATUS, Robot
+
+AGREE_TIMEOUT = 10  # seconds for all robots to agree on a captain
+
+# Election fleets of tests_mqtt.py and tests_local_broker.py
+
+async def start_fleet(size, new_client, shared=True, settle=0, **options):
+    # Robots with the IDs 0..size-1, each knowing the higher ones, on one
+    # connection from new_client() or on one each like robot.py. settle is the
+    # time a broker over the network needs to apply a publish or subscription
+    client = new_client() if shared else None
+    robots = [Robot(f"FleetRobot{i}", client if shared else new_client(), **options)
+              for i in range(size)]  # Last will set before connecting
+    for connection in [client] if shared else [robot.client for robot in robots]:
+        await connection.connect()
+    robots[0].client.publish(TOPIC_STATUS, b"", retain=True)  # Heartbeat retained by a crashed run
+    await asyncio.sleep(settle)  # Cleared before the robots subscribe
+    tasks = [asyncio.create_task(robot.run_mqtt()) for robot in robots]
+    await asyncio.sleep(settle)  # Subscribed
+    for i, robot in enumerate(robots):
+        robot.setRegistered(i)
+    await asyncio.sleep(settle)  # Namespaces of the registered robots subscribed
+    while any(len(robot.higherPeers()) < size - 1 - robot.id for robot in robots):
+        await asyncio.sleep(0.001)
+    return client, robots, tasks
+
+async def stop_fleet(client, robots, tasks):
+    for robot in robots:
+        robot.shutdown_event.set()
+    await asyncio.gather(*tasks)
+    for connection in [client] if client is not None else [robot.client for robot in robots]:
+        await connection.disconnect()
+
+async def agree(robots, captain_id, timeout = AGREE_TIMEOUT):
+    # Seconds until every robot follows captain_id, None on timeout
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < timeout:
+        if all(robot.captain_id == captain_id for robot in robots):
+            return time.perf_counter() - start_time
+        await asyncio.sleep(0.001)
+    return None
+
+def reset(robots):
+    for robot in robots:
+        robot.setCaptain(False)
+        robot.captain_id = robot.captain_epoch = -1
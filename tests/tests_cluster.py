@@ -0,0 +1,141 @@
+from src.common.hashring import HashRing
+from src.controller.cluster import ShardCluster
+from src.controller.registry import RobotRegistry
+import asyncio
+import grpc
+import os
+import sys
+import time
+
+SRC_DIR = next(path for path in (os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"),  # docker
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))  # local
+               if os.path.isdir(path))
+sys.path[:0] = [os.path.join(SRC_DIR, "controller"), SRC_DIR]  # controller.py before the package
+import controller
+
+NODES = ["a", "b", "c"]
+KEYS = 30000  # robot IDs per placement benchmark
+
+# Cluster of in-process shards, exchanges and claims are direct calls
+def make_cluster(nodes=NODES, down=()):
+    shards = {}
+
+    def exchange(node, state):
+        return None if node in down else shards[node].receive(state)
+
+    def claim(node, robot_id, name):
+        return node not in down and shards[node].robots.claim(robot_id, name) is not None
+
+    members = {node: f"localhost:{50051 + i}" for i, node in enumerate(nodes)}
+    for node in nodes:
+        shards[node] = ShardCluster(node, members, RobotRegistry(), HashRing(nodes), exchange, claim)
+    return shards
+
+# Functional tests
+
+def test_ring_placement():
+    ring = HashRing(NODES)
+    counts = {node: 0 for node in NODES}
+    for key in range(KEYS):
+        counts[ring.owner(key)] += 1
+    assert min(counts.values()) > KEYS / len(NODES) * 0.7, "Keys are not spread over the shards"
+
+    grown = HashRing(NODES + ["d"])
+    moved = sum(ring.owner(key) != grown.owner(key) for key in range(KEYS))
+    assert all(grown.owner(key) == "d" for key in range(KEYS) if ring.owner(key) != grown.owner(key)), "Keys moved between old shards"
+    assert moved < KEYS / 2, "Adding a shard moved too many keys"
+    print("Ring-Placement Test successful")
+
+def test_register_on_owner():
+    shards = make_cluster()
+    ids = []
+    for i in range(300):
+        robot = shards[NODES[i % len(NODES)]].register(f"Robot{i}")
+        ids.append(robot["id"])
+        owner = HashRing(NODES).owner(robot["id"])
+        assert robot["id"] in shards[owner].robots, "Robot not registered on its owning shard"
+    assert len(set(ids)) == len(ids), "Shards handed out the same ID"
+    assert sum(len(shard.robots) for shard in shards.values()) == len(ids), "Robot registered on several shards"
+    print("Register-On-Owner Test successful")
+
+def test_unreachable_owner():
+    shards = make_cluster(down = {"c"})
+    shards["a"].sync()
+    for i in range(100):
+        robot = shards["a"].register(f"Robot{i}")
+        assert robot is not None and robot["id"] not in shards["c"].robots, "Robot placed on an unreachable shard"
+    assert shards["a"].status()["shards"]["c"] is None, "Unreachable shard not reported"
+    print("Unreachable-Owner Test successful")
+
+# Cluster without a reachable shard for new robots
+class NoShard:
+    def register(self, name):
+        return None
+
+# grpc.aio context: abort() is a coroutine that ends the call
+class AioContext:
+    def __init__(self):
+        self.status = None
+
+    async def abort(self, code, details):
+        self.status = (code, details)
+        raise grpc.RpcError(details)
+
+async def register_without_shard():
+    servicer = controller.AsyncRobotServicer(controller.RobotServicer(robots=RobotRegistry(), shard_cluster=NoShard()))
+    context = AioContext()
+    try:
+        await servicer.RegisterRobot(controller.robot_service_pb2.RobotInfo(name="Robot"), context)
+    except grpc.RpcError:
+        pass
+    return context.status
+
+def test_no_shard_aio():
+    status = asyncio.run(register_without_shard())
+    assert status == (grpc.StatusCode.UNAVAILABLE, "No shard available"), "aio call did not abort with UNAVAILABLE"
+    print("No-Shard Test successful")
+
+def test_captain_replication():
+    shards = make_cluster()
+    robot = shards["b"].register("Captain")
+    owner = shards[HashRing(NODES).owner(robot["id"])]
+    owner.robots.set_captain(robot["id"], robot["name"])
+    owner.captain_changed()
+    owner.sync()
+    assert all(shard.robots.captain == robot for shard in shards.values()), "Captain not replicated"
+
+    owner.robots.unregister(robot["id"])
+    owner.captain_changed()
+    shards["a"].sync()  # Stale shards learn it from the exchange answer too
+    shards["b"].sync()
+    shards["c"].sync()
+    assert all(shard.robots.captain is None for shard in shards.values()), "Removed captain not replicated"
+
+    for shard in shards.values():
+        shard.sync()
+    status = shards["a"].status()
+    assert status["robots"] == sum(status["shards"].values()) == 0, "Aggregated status is wrong"
+    print("Captain-Replication Test successful")
+
+
+# Non-functional test
+
+def measure_placement_rate():
+    ring = HashRing(NODES)
+    start_time = time.time()
+    for key in range(KEYS):
+        ring.owner(key)
+    return KEYS / (time.time() - start_time)
+
+
+if __name__ == "__main__":
+    print("Starting non-functional test (placement lookups)...")
+    print(f"{measure_placement_rate():.0f} lookups/s")
+
+    print("Starting functional tests...")
+    test_ring_placement()
+    test_register_on_owner()
+    test_unreachable_owner()
+    test_no_shard_aio()
+    test_captain_replication()
+    print("All tests executed")
@@ -0,0 +1,127 @@
+from src.controller.elections import ElectionManager
+from src.controller.registry import RobotRegistry
+from src.controller.sessions import SessionHub
+from concurrent import futures
+import os
+import sys
+import threading
+import time
+
+import grpc
+
+SRC_DIR = next(path for path in (os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"),  # docker
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))  # local
+               if os.path.isdir(path))
+sys.path[:0] = [os.path.join(SRC_DIR, "controller"), SRC_DIR]  # controller.py before the package
+import controller
+
+ELECT = "elect"  # stands in for the Commands message
+TIMEOUT = 0.2  # seconds per attempt
+SESSION_TIMEOUT = 2  # seconds for a call to the sync server
+
+def setup(session_robots, polling_robots):
+    registry = RobotRegistry()
+    hub = SessionHub()
+    received = []
+    elections = ElectionManager(registry, hub, ELECT, poll_interval = TIMEOUT, timeout = TIMEOUT)
+    for _ in range(session_robots + polling_robots):
+        robot = registry.register("TestRobot")
+        elections.heartbeat(robot["id"])
+        if robot["id"] < session_robots:
+            hub.open(robot["id"], lambda command, robot_id = robot["id"]: received.append(robot_id))
+    return registry, elections, received
+
+# Functional tests
+
+def test_targeted_dispatch():
+    registry, elections, received = setup(2, 2)
+    election = elections.start()
+    assert election is not None and received == [election["initiator"]], "Elect command not sent to one session robot"
+    assert elections.start()["id"] == election["id"], "Concurrent start created a second election"
+
+    duration = elections.captain_registered(3)
+    assert duration is not None and elections.status()["state"] == "completed", "Election did not complete"
+    assert elections.stats["completed"] == 1, "Election duration not recorded"
+    print("Targeted-Dispatch Test successful")
+
+def test_retry_on_timeout():
+    registry, elections, received = setup(2, 0)
+    first = elections.start()["initiator"]
+    time.sleep(TIMEOUT * 1.5)
+    status = elections.status()
+    assert status["attempt"] == 2 and status["initiator"] != first, "Election not retried on another robot"
+    assert received == [first, status["initiator"]], "Retry did not dispatch the elect command"
+
+    time.sleep(TIMEOUT * 1.5)
+    assert elections.status()["state"] == "failed" and elections.stats["failed"] == 1, "Election did not give up"
+    print("Retry-On-Timeout Test successful")
+
+def test_polling_robot():
+    registry, elections, received = setup(0, 1)
+    election = elections.start()
+    assert not received and elections.take(election["initiator"]), "Polling robot did not get the command"
+    assert not elections.take(election["initiator"]), "Elect command delivered twice"
+    print("Polling-Robot Test successful")
+
+def test_no_robot():
+    registry, elections, received = setup(0, 0)
+    assert elections.start() is None, "Election started without robots"
+    print("No-Robot Test successful")
+
+def test_sync_sessions():
+    # More Session streams than the sync server has workers: unary calls still get answered
+    registry, hub = RobotRegistry(), SessionHub()
+    servicer = controller.RobotServicer(robots=registry, hub=hub,
+                                        election_manager=ElectionManager(registry, hub, ELECT, poll_interval = TIMEOUT),
+                                        liveness_tracker=controller.LivenessTracker(TIMEOUT, lambda robot_id: None))
+    robot = registry.register("SessionRobot")
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=controller.GRPC_WORKERS))
+    controller.robot_service_pb2_grpc.add_RobotServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    channel = grpc.insecure_channel(f"localhost:{port}")
+    stub = controller.robot_service_pb2_grpc.RobotServiceStub(channel)
+    closed = threading.Event()
+
+    def heartbeats():
+        yield controller.robot_service_pb2.RobotData(id=robot["id"], name=robot["name"])
+        closed.wait()  # The robot keeps its stream open
+
+    sessions = [stub.Session(heartbeats(), timeout=SESSION_TIMEOUT) for _ in range(controller.GRPC_WORKERS + 2)]
+    codes = []
+    try:
+        reply = stub.CheckRobot(controller.robot_service_pb2.RobotData(id=robot["id"], name=robot["name"]),
+                                timeout=SESSION_TIMEOUT)
+        for session in sessions:
+            try:
+                list(session)
+            except grpc.RpcError as e:
+                codes.append(e.code())
+    finally:
+        closed.set()
+        channel.close()
+        server.stop(0)
+    assert codes == [grpc.StatusCode.UNIMPLEMENTED] * (controller.GRPC_WORKERS + 2), \
+        "Sync server kept Session streams"
+    assert reply.success, "Unary call not answered next to Session streams"
+    print("Sync-Sessions Test successful")
+
+def test_shutdown_broadcast():
+    received = []
+    send = received.append
+    controller.sessions.open(0, send)
+    controller.post_shutdown(b"", {}, b"")
+    controller.sessions.close(0, send)
+    assert [command.shutdown for command in received] == [True], "Shutdown was not pushed to the session"
+    print("Shutdown-Broadcast Test successful")
+
+
+if __name__ == "__main__":
+    print("Starting functional tests...")
+    test_targeted_dispatch()
+    test_retry_on_timeout()
+    test_polling_robot()
+    test_no_robot()
+    test_sync_sessions()
+    test_shutdown_broadcast()
+    print("All tests executed")
@@ -7,6 +7,7 @@ import statistics
 GRPC_HOST = "controller" # local = localhost || docker = controller
 GRPC_PORT = 50051
 id = -1
+BATCH_ROBOTS = 1000  # robots per unary/batch comparison
 
 # Functional tests
 
@@ -33,25 +34,126 @@ def test_unregister_robot():
     assert response.success, "Robot-Unregistration did not work as expected"
     print("Robot-Unregistration Test successful")
 
+def test_list_robots():
+    channel = grpc.insecure_channel(f"{GRPC_HOST}:{GRPC_PORT}")
+    stub = robot_service_pb2_grpc.RobotServiceStub(channel)
+
+    ids = [stub.RegisterRobot(robot_service_pb2.RobotInfo(name = f"PagingRobot{i}")).id for i in range(5)]
+    listed = []
+    page_token = ""
+    pages = 0
+    while True:
+        batches = list(stub.ListRobots(robot_service_pb2.RobotPage(page_token = page_token, page_size = 2, name_prefix = "PagingRobot")))
+        listed += [robot.id for batch in batches for robot in batch.robots]
+        page_token = batches[-1].next_page_token
+        pages += 1
+        if not page_token:
+            break
+    for robot_id in ids:
+        stub.UnregisterRobot(robot_service_pb2.RobotData(id = robot_id))
+    channel.close()
+
+    assert set(ids) <= set(listed) and len(listed) == len(set(listed)), "Robot-Listing did not work as expected"
+    assert pages >= 3, "Robot-Listing ignored the page size"
+    print("Robot-Listing Test successful")
 
-# Non-functional test
+def test_session():
+    channel = grpc.insecure_channel(f"{GRPC_HOST}:{GRPC_PORT}")
+    stub = robot_service_pb2_grpc.RobotServiceStub(channel)
+
+    robot = stub.RegisterRobot(robot_service_pb2.RobotInfo(name = "SessionRobot"))
+    session = stub.Session(iter([robot_service_pb2.RobotData(id = robot.id, name = robot.name)]))
+    try:
+        commands = list(session)
+    except grpc.RpcError as e:
+        # Controller without --aio: robots poll HealthCheck instead
+        stub.UnregisterRobot(robot)
+        channel.close()
+        assert e.code() == grpc.StatusCode.UNIMPLEMENTED, "Session failed on the thread-pool server"
+        print("Session Test successful (thread pool, refused)")
+        return
+    unknown = list(stub.Session(iter([robot_service_pb2.RobotData(id = -1, name = "Unknown")])))
+    stub.UnregisterRobot(robot)
+    channel.close()
+
+    assert commands and commands[0].connected and commands[0].heartbeat_interval > 0, "Session did not work as expected"
+    assert unknown and not unknown[0].connected, "Session accepted an unknown robot"
+    print("Session Test successful")
+
+def test_register_robots():
+    channel = grpc.insecure_channel(f"{GRPC_HOST}:{GRPC_PORT}")
+    stub = robot_service_pb2_grpc.RobotServiceStub(channel)
+
+    names = [f"BatchRobot{i}" for i in range(10)]
+    response = stub.RegisterRobots(robot_service_pb2.RobotInfoBatch(robots = [robot_service_pb2.RobotInfo(name = name) for name in names]))
+    ids = [result.robot.id for result in response.results]
+    for robot_id in ids:
+        stub.UnregisterRobot(robot_service_pb2.RobotData(id = robot_id))
+    channel.close()
+
+    assert all(result.success for result in response.results), "Batch-Registration did not work as expected"
+    assert [result.robot.name for result in response.results] == names, "Batch results not in request order"
+    assert len(set(ids)) == len(ids), "Batch-Registration handed out duplicate IDs"
+    print("Batch-Registration Test successful")
+
+def test_health_check_batch():
+    channel = grpc.insecure_channel(f"{GRPC_HOST}:{GRPC_PORT}")
+    stub = robot_service_pb2_grpc.RobotServiceStub(channel)
+
+    robot = stub.RegisterRobot(robot_service_pb2.RobotInfo(name = "BatchRobot"))
+    response = stub.HealthCheckBatch(robot_service_pb2.RobotBatch(robots = [robot, robot_service_pb2.RobotData(id = -1)]))
+    stub.UnregisterRobot(robot)
+    channel.close()
+
+    assert [commands.connected for commands in response.commands] == [True, False], "Batch-Health-Check did not work as expected"
+    print("Batch-Health-Check Test successful")
+
+
+# Non-functional tests
 
 def measure_rtt():
     channel = grpc.insecure_channel(f"{GRPC_HOST}:{GRPC_PORT}")
     stub = robot_service_pb2_grpc.RobotServiceStub(channel)
     
+    robot = stub.RegisterRobot(robot_service_pb2.RobotInfo(name = "RTTRobot"))
     start_time = time.time()
-    response = stub.GetRobots(robot_service_pb2.Empty())
+    robots = stub.GetRobots(robot_service_pb2.Empty())
+    first = next(robots, None)  # Until the first robot arrives, the others follow with the simulated delay
     end_time = time.time()
     rtt = end_time - start_time
+    robots.cancel()
+    stub.UnregisterRobot(robot)
     
     channel.close()
+    assert first is not None and first.name, "GetRobots did not stream the registered robots"
     return rtt
 
+def measure_batch_speedup():
+    # Registers and health-checks BATCH_ROBOTS robots with unary calls, then with one call each
+    channel = grpc.insecure_channel(f"{GRPC_HOST}:{GRPC_PORT}")
+    stub = robot_service_pb2_grpc.RobotServiceStub(channel)
+
+    start_time = time.time()
+    robots = [stub.RegisterRobot(robot_service_pb2.RobotInfo(name = f"UnaryRobot{i}")) for i in range(BATCH_ROBOTS)]
+    for robot in robots:
+        stub.HealthCheck(robot)
+    unary = time.time() - start_time
+
+    start_time = time.time()
+    response = stub.RegisterRobots(robot_service_pb2.RobotInfoBatch(robots = [robot_service_pb2.RobotInfo(name = f"BatchRobot{i}") for i in range(BATCH_ROBOTS)]))
+    stub.HealthCheckBatch(robot_service_pb2.RobotBatch(robots = [result.robot for result in response.results]))
+    batch = time.time() - start_time
+
+    for robot in robots + [result.robot for result in response.results]:
+        stub.UnregisterRobot(robot)
+    channel.close()
+    return unary, batch
+
 
 if __name__ == "__main__":
     print("Starting non-functional test (RTT)...")
     rtts = [measure_rtt() for _ in range(100)]
+    unary, batch = measure_batch_speedup()
     
     # Calculations
     average_rtt = sum(rtts) / len(rtts)
@@ -72,10 +174,17 @@ if __name__ == "__main__":
         f.write(f"Median RTT: {median_rtt:.6f} seconds\n")
         f.write(f"Variance RTT: {variance_rtt:.6f} seconds\n")
         f.write(f"Standard deviation RTT: {std_dev_rtt:.6f} seconds\n")
+        f.write(f"\nRegister and health-check {BATCH_ROBOTS} robots:\n")
+        f.write(f"Unary calls ({2 * BATCH_ROBOTS} RPCs): {unary:.6f} seconds\n")
+        f.write(f"Batch calls (2 RPCs): {batch:.6f} seconds ({unary / batch:.1f}x faster)\n")
 
     print("Non-functional test-results saved in 'tests_grpc_rtt.txt'")
     
     print("Starting functional tests...")
     test_register_robot()
     test_unregister_robot()
+    test_list_robots()
+    test_session()
+    test_register_robots()
+    test_health_check_batch()
     print("All tests executed")
\ No newline at end of file
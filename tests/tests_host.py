@@ -0,0 +1,126 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+HTTP_HOST = 'controller' # local = localhost || docker = controller
+HTTP_PORT = 8080
+SRC_DIR = next(path for path in (os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"),  # docker
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))  # local
+               if os.path.isdir(path))
+FLEET_SIZES = [100, 1000, 5000]  # robots per host run
+ROBOT_STARTS = 10  # single robot launches
+READY_TIMEOUT = 60  # seconds for a host to register or unregister its robots
+
+def get(path):
+    with socket.create_connection((HTTP_HOST, HTTP_PORT)) as s:
+        s.sendall(f"GET {path} HTTP/1.1\r\nHost: {HTTP_HOST}\r\nConnection: close\r\n\r\n".encode())
+        response = b""
+        while chunk := s.recv(65536):
+            response += chunk
+    return json.loads(response.partition(b"\r\n\r\n")[2])
+
+def robot_count():
+    return get("/status")["robots"]
+
+def start_host(robots, name_prefix):
+    return subprocess.Popen([sys.executable, os.path.join(SRC_DIR, "robots", "host.py"),
+                             "--robots", str(robots), "--name-prefix", name_prefix],
+                            env={**os.environ, "PYTHONPATH": SRC_DIR, "LOG_LEVEL": "WARNING"})
+
+def start_robot(name, *args):
+    return subprocess.Popen([sys.executable, "-u", os.path.join(SRC_DIR, "robots", "robot.py"), *args],
+                            env={**os.environ, "PYTHONPATH": SRC_DIR, "ROBOT_NAME": name},
+                            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, text=True)
+
+def wait_count(expected, timeout = READY_TIMEOUT):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if robot_count() == expected:
+            return True
+        time.sleep(0.01)
+    return False
+
+# Functional tests
+
+def test_host_registers_fleet():
+    before = robot_count()
+    host = start_host(200, "HostRobot")
+    assert wait_count(before + 200), "Host did not register all robots"
+    names = [robot["name"] for robot in get("/robots?name_prefix=HostRobot&page_size=1000")["robots"]]
+    assert sorted(names) == sorted(f"HostRobot{i}" for i in range(200)), "Host registered wrong robots"
+
+    host.send_signal(signal.SIGINT)
+    assert host.wait(READY_TIMEOUT) == 0, "Host did not stop cleanly"
+    assert robot_count() == before, "Host did not unregister its robots"
+    print("Host-Registration Test successful")
+
+def test_robot_without_tty():
+    before = robot_count()
+    robot = start_robot("EnvRobot", "--heartbeat-interval", "1")
+    assert wait_count(before + 1), "Robot did not register without input"
+    assert [robot["name"] for robot in get("/robots?name_prefix=EnvRobot")["robots"]] == ["EnvRobot"], "ROBOT_NAME was ignored"
+
+    robot.send_signal(signal.SIGINT)
+    assert robot.wait(READY_TIMEOUT) == 0, "Robot did not stop cleanly"
+    assert robot_count() == before, "Robot did not unregister"
+    print("Robot-Without-TTY Test successful")
+
+
+# Non-functional test
+
+def measure_host(fleet_size):
+    # Launch until all robots are registered, SIGINT until the host exited
+    before = robot_count()
+    start_time = time.time()
+    host = start_host(fleet_size, "LoadRobot")
+    ready = wait_count(before + fleet_size)
+    startup = time.time() - start_time
+
+    start_time = time.time()
+    host.send_signal(signal.SIGINT)
+    host.wait(READY_TIMEOUT)
+    shutdown = time.time() - start_time
+    return startup if ready else None, shutdown
+
+def measure_robot():
+    # Time from main() until registered and connected to the broker, as logged
+    # by the robot, and from SIGINT until the process exited
+    durations, stops = [], []
+    for i in range(ROBOT_STARTS):
+        robot = start_robot(f"ReadyRobot{i}")
+        for line in robot.stdout:
+            if "ready after" in line:
+                durations.append(float(line.rsplit(" ", 1)[1].rstrip("s\n")))
+                break
+        start_time = time.time()
+        robot.send_signal(signal.SIGINT)
+        robot.wait(READY_TIMEOUT)
+        stops.append(time.time() - start_time)
+    return durations, stops
+
+
+if __name__ == "__main__":
+    print("Starting non-functional test (host startup and shutdown)...")
+    results = [(size, *measure_host(size)) for size in FLEET_SIZES]
+    ready, stops = measure_robot()
+
+    # Save results in file
+    with open("tests_host_startup.txt", "w") as f:
+        f.write("Robots on one host (one gRPC channel, one MQTT connection):\n")
+        for size, startup, shutdown in results:
+            startup = f"{startup:.3f}s" if startup is not None else "timeout"
+            f.write(f"{size} robots: ready after {startup}, stopped after {shutdown:.3f}s\n")
+        f.write(f"\nSingle robot ready (registered and MQTT connected, {len(ready)} launches):\n")
+        f.write(f"Average: {sum(ready) / len(ready):.3f}s, maximum: {max(ready):.3f}s\n")
+        f.write(f"Single robot stopped (SIGINT until exit): average {sum(stops) / len(stops):.3f}s, maximum {max(stops):.3f}s\n")
+
+    print("Non-functional test-results saved in 'tests_host_startup.txt'")
+
+    print("Starting functional tests...")
+    test_host_registers_fleet()
+    test_robot_without_tty()
+    print("All tests executed")
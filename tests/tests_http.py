@@ -1,9 +1,12 @@
+import json
 import socket
 import time
 import statistics
 
 HTTP_HOST = 'controller' # local = localhost || docker = controller
 HTTP_PORT = 8080
+PIPELINED_REQUESTS = 10000  # keep-alive throughput test
+BODY_TIMEOUT = 10  # seconds, above the server's keep-alive timeout
 
 # Functional tests
 
@@ -13,6 +16,19 @@ def send_http_request(request: str) -> str:
         s.sendall(request.encode('utf-8'))
         response = s.recv(4096)  # Puffersize for response
     return response.decode('utf-8')
+
+def read_response(f) -> tuple:
+    status = f.readline().decode().strip()
+    headers = {}
+    while (line := f.readline()) not in (b"\r\n", b""):
+        key, _, value = line.decode().partition(":")
+        headers[key.lower()] = value.strip()
+    return status, f.read(int(headers.get("content-length", 0))).decode(), headers
+
+def get(path: str, headers: str = "") -> tuple:
+    with socket.create_connection((HTTP_HOST, HTTP_PORT)) as s:
+        s.sendall(f"GET {path} HTTP/1.1\r\nHost: {HTTP_HOST}\r\n{headers}Connection: close\r\n\r\n".encode())
+        return read_response(s.makefile("rb"))
     
 def test_get_status():
     request = (
@@ -60,6 +76,87 @@ def test_post_electCaptain():
     assert "200 OK" in response or "400 Bad Request" in response, "POST /electCaptain did not work as expected"
     print("POST /electCaptain Test successful")
 
+def test_post_heartbeatInterval():
+    request = "POST /heartbeatInterval?seconds={} HTTP/1.1\r\nHost: {}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+    response = send_http_request(request.format(10, HTTP_HOST))  # The default interval
+    assert "200 OK" in response, "POST /heartbeatInterval did not work as expected"
+    response = send_http_request(request.format(0, HTTP_HOST))
+    assert "400 Bad Request" in response, "POST /heartbeatInterval accepted an invalid interval"
+    print("POST /heartbeatInterval Test successful")
+
+def test_keep_alive_pipelining():
+    with socket.create_connection((HTTP_HOST, HTTP_PORT)) as s:
+        s.sendall((
+            "GET /health HTTP/1.1\r\n\r\n"
+            "GET /status HTTP/1.1\r\n\r\n"
+            "GET /unknown HTTP/1.1\r\n\r\n"
+        ).encode())
+        f = s.makefile("rb")
+        responses = [read_response(f) for _ in range(3)]
+    assert [status for status, _, _ in responses] == ["HTTP/1.1 200 OK", "HTTP/1.1 200 OK", "HTTP/1.1 404 Not Found"], \
+        "Pipelined requests on one connection did not work as expected"
+    assert json.loads(responses[0][1]) == {"health": "OK"}, "Response body not delimited by Content-Length"
+    print("Keep-Alive/Pipelining Test successful")
+
+def test_large_request():
+    body = "x" * 8192
+    request = (
+        "POST /unknown HTTP/1.1\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "\r\n" + body +
+        "GET /health HTTP/1.1\r\n"
+        "Connection: close\r\n"
+        "\r\n"
+    )
+    with socket.create_connection((HTTP_HOST, HTTP_PORT)) as s:
+        s.sendall(request.encode())
+        f = s.makefile("rb")
+        first, second = read_response(f), read_response(f)
+    assert "404" in first[0] and "200 OK" in second[0], "Request body larger than 1 KB not read completely"
+    print("Large-Request Test successful")
+
+def test_withheld_body():
+    with socket.create_connection((HTTP_HOST, HTTP_PORT)) as s:
+        s.sendall(b"POST /electCaptain HTTP/1.1\r\nContent-Length: 10\r\n\r\nxx")
+        s.settimeout(BODY_TIMEOUT)
+        try:
+            closed = s.recv(1) == b""
+        except socket.timeout:
+            closed = False
+    assert closed, "Connection with a withheld request body was not closed"
+    print("Withheld-Body Test successful")
+
+def test_get_robots():
+    status, body, _ = get("/robots?page_size=2")
+    page = json.loads(body)
+    assert "200 OK" in status and len(page["robots"]) <= 2 and "next_page_token" in page, "GET /robots did not work as expected"
+    status, body, _ = get("/robots?page_token=abc")
+    assert "400 Bad Request" in status, "GET /robots accepted an invalid page token"
+    status, body, _ = get("/robots?page_size=0")
+    assert "200 OK" in status and json.loads(body)["next_page_token"] != "-1", "GET /robots returned a page without progress"
+    status, _, _ = get("/robots?page_size=-1")
+    assert "400 Bad Request" in status, "GET /robots accepted a negative page size"
+    print("GET /robots Test successful")
+
+def test_etag():
+    status, body, headers = get("/status")
+    assert "etag" in headers and "robots" in json.loads(body), "GET /status did not return an ETag"
+    status, body, _ = get("/status", f"If-None-Match: {headers['etag']}\r\n")
+    # 304 unless a robot (un)registered in between
+    assert "304 Not Modified" in status and body == "" or "200 OK" in status, "If-None-Match did not work as expected"
+    status, _, _ = get("/status", "If-None-Match: \"-1\"\r\n")
+    assert "200 OK" in status, "Stale ETag was answered with 304"
+    print("ETag Test successful")
+
+def test_get_metrics():
+    get("/health")
+    status, body, headers = get("/metrics")
+    assert "200 OK" in status and headers["content-type"].startswith("text/plain"), "GET /metrics did not work as expected"
+    assert 'http_request_duration_seconds_bucket{route="/health",status="200",le="+Inf"}' in body, "HTTP latency histogram missing"
+    assert "registry_robots " in body, "Registry size missing"
+    assert "grpc_executor_queue_depth " in body or "grpc_executor_in_flight " in body, "Executor gauge missing"
+    print("GET /metrics Test successful")
+
 
 # Non-functional test
 
@@ -72,8 +169,19 @@ def measure_rtt():
         response = s.recv(1024)
         end_time = time.time()
         rtt = end_time - start_time
+        assert response.startswith(b"HTTP/1.1 "), "POST /electCaptain got no HTTP response"
         return rtt
 
+def measure_keep_alive_throughput():
+    with socket.create_connection((HTTP_HOST, HTTP_PORT)) as s:
+        f = s.makefile("rb")
+        start_time = time.time()
+        s.sendall(b"GET /health HTTP/1.1\r\n\r\n" * PIPELINED_REQUESTS)
+        for _ in range(PIPELINED_REQUESTS):
+            read_response(f)
+        end_time = time.time()
+    return PIPELINED_REQUESTS / (end_time - start_time)
+
 if __name__ == "__main__":
     print("Starting non-functional test (RTT)...")
     rtts = [measure_rtt() for _ in range(100)]
@@ -85,6 +193,7 @@ if __name__ == "__main__":
     median_rtt = statistics.median(rtts)
     variance_rtt = statistics.variance(rtts) if len(rtts) > 1 else 0
     std_dev_rtt = statistics.stdev(rtts) if len(rtts) > 1 else 0
+    throughput = measure_keep_alive_throughput()
 
     # Save results in file
     with open("tests_http_rtt.txt", "w") as f:
@@ -97,6 +206,7 @@ if __name__ == "__main__":
         f.write(f"Median RTT: {median_rtt:.6f} seconds\n")
         f.write(f"Variance RTT: {variance_rtt:.6f} seconds\n")
         f.write(f"Standard deviation RTT: {std_dev_rtt:.6f} seconds\n")
+        f.write(f"Keep-alive throughput (GET /health): {throughput:.0f} requests/s\n")
 
     print("Non-functional test-results saved in 'tests_http_rtt.txt'")
     print("Starting functional tests...")
@@ -105,5 +215,12 @@ if __name__ == "__main__":
     test_get_captain()
     test_get_health()
     test_post_electCaptain()
+    test_post_heartbeatInterval()
+    test_keep_alive_pipelining()
+    test_large_request()
+    test_withheld_body()
+    test_get_robots()
+    test_etag()
+    test_get_metrics()
     
     print("All tests executed")
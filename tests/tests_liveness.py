@@ -0,0 +1,64 @@
+from src.controller.liveness import LivenessTracker
+import time
+
+TIMEOUT = 10  # seconds, driven with explicit timestamps
+FLEET_SIZES = [1000, 10000, 100000]  # robots per benchmark run
+HEARTBEAT_ROUNDS = 3
+
+# Functional tests
+
+def test_expire_stale():
+    liveness = LivenessTracker(TIMEOUT, on_expire = None)
+    liveness.heartbeat(1, now = 100)
+    liveness.heartbeat(2, now = 100)
+    liveness.heartbeat(2, now = 105)
+
+    assert liveness.expire(now = 109) == [], "Robot expired before its timeout"
+    assert liveness.expire(now = 112) == [1], "Stale robot was not expired"
+    assert liveness.expire(now = 117) == [2], "Refreshed robot expired too early or not at all"
+    assert len(liveness) == 0, "Expired robots are still tracked"
+    print("Expire-Stale Test successful")
+
+def test_remove():
+    liveness = LivenessTracker(TIMEOUT, on_expire = None)
+    liveness.heartbeat(1, now = 100)
+    liveness.remove(1)
+    assert liveness.expire(now = 200) == [], "Removed robot was expired"
+    print("Remove Test successful")
+
+def test_ticker_callback():
+    expired = []
+    liveness = LivenessTracker(0.2, expired.append, tick = 0.05)
+    liveness.start()
+    liveness.heartbeat(7)
+    time.sleep(0.5)
+    liveness.stop()
+    assert expired == [7], "Ticker did not report the expired robot"
+    print("Ticker-Callback Test successful")
+
+
+# Non-functional test
+
+def measure_heartbeat_rate(fleet_size):
+    liveness = LivenessTracker(TIMEOUT, on_expire = None)
+    now = 100.0
+    start_time = time.time()
+    for _ in range(HEARTBEAT_ROUNDS):
+        for robot_id in range(fleet_size):
+            liveness.heartbeat(robot_id, now = now)
+        now += 1.0
+        liveness.expire(now = now)
+    end_time = time.time()
+    return fleet_size * HEARTBEAT_ROUNDS / (end_time - start_time)
+
+
+if __name__ == "__main__":
+    print("Starting non-functional test (heartbeat throughput)...")
+    for size in FLEET_SIZES:
+        print(f"{size} robots: {measure_heartbeat_rate(size):.0f} heartbeats/s")
+
+    print("Starting functional tests...")
+    test_expire_stale()
+    test_remove()
+    test_ticker_callback()
+    print("All tests executed")
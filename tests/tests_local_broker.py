@@ -0,0 +1,250 @@
+import asyncio
+import os
+import sys
+import time
+
+SRC_DIR = next(path for path in (os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"),  # docker
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))  # local
+               if os.path.isdir(path))
+sys.path.insert(0, SRC_DIR)
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+from fleet import agree, reset, start_fleet as start_robots, stop_fleet
+from robots.local_broker import LocalBroker, LocalClient
+from robots.messages import decode, encode
+from robots.robot import ELECTION_ANSWER_TIMEOUT, ELECTION_START, STANDBY_RANKS, TOPIC_ROBOT, TOPIC_STATUS, Robot
+
+# MQTT clients
+NUM_ROBOTS = 500  # robots of the functional election tests
+SILENT_ROBOTS = 3 * STANDBY_RANKS  # highest robots gone without a will in the standby test
+HEARTBEAT_TIMEOUT = 10  # seconds, only a last will explains a faster failover
+FLEET_SIZES = [100, 200, 500]  # robots per election benchmark
+ELECTIONS = 5  # elections per fleet size
+HOST_ROBOTS = 10000  # robots on one connection in the dispatch benchmark, as host.py
+DISPATCHED = 1000  # messages to single robots per dispatch benchmark
+
+def start_fleet(broker, size):
+    # Robots with the IDs 0..size-1, each on its own connection like robot.py
+    return start_robots(size, lambda: LocalClient(broker), shared=False, heartbeat_timeout=HEARTBEAT_TIMEOUT)
+
+async def subscriber(broker, topic_filter):
+    # Client collecting the (topic, payload) it receives
+    received = []
+    client = LocalClient(broker)
+    await client.connect()
+    client.subscribe(topic_filter, lambda topic, payload: received.append((topic, payload)))
+    return client, received
+
+# Functional tests
+
+async def topic_filters():
+    broker = LocalBroker()
+    clients = {}
+    for topic_filter in ("robots/status", "robots/+/start", "robots/#", "other/#"):
+        clients[topic_filter] = await subscriber(broker, topic_filter)
+    publisher = LocalClient(broker)
+    await publisher.connect()
+    for topic in ("robots/status", "robots/7/start", "robots", "robots/7/alive"):
+        publisher.publish(topic, b"x")
+    await asyncio.sleep(0)
+    return {topic_filter: [topic for topic, _ in received] for topic_filter, (_, received) in clients.items()}
+
+def test_topic_filters():
+    received = asyncio.run(topic_filters())
+    assert received["robots/status"] == ["robots/status"], "Exact filter matched other topics"
+    assert received["robots/+/start"] == ["robots/7/start"], "Single-level wildcard did not match one level"
+    assert received["robots/#"] == ["robots/status", "robots/7/start", "robots", "robots/7/alive"], \
+        "Multi-level wildcard did not match all levels"
+    assert received["other/#"] == [], "Unrelated filter received messages"
+    print("Topic-Filter Test successful")
+
+async def retained_messages():
+    broker = LocalBroker()
+    publisher = LocalClient(broker)
+    await publisher.connect()
+    publisher.publish("retained/kept", b"kept", retain=True)
+    publisher.publish("retained/cleared", b"cleared", retain=True)
+    publisher.publish("retained/cleared", b"", retain=True)
+    publisher.publish("retained/expired", b"expired", retain=True, expiry=0.05)
+    await asyncio.sleep(0.1)
+    _, received = await subscriber(broker, "retained/#")
+    await asyncio.sleep(0)
+    return received
+
+def test_retained_messages():
+    assert asyncio.run(retained_messages()) == [("retained/kept", b"kept")], "Retained messages were not kept, cleared or expired"
+    print("Retained-Message Test successful")
+
+async def last_will():
+    broker = LocalBroker()
+    _, received = await subscriber(broker, "will/#")
+    clients = [LocalClient(broker) for _ in range(2)]
+    for i, client in enumerate(clients):
+        client.set_will(f"will/{i}", b"gone")
+        await client.connect()
+    await clients[0].disconnect()
+    clients[1].cut()
+    await asyncio.sleep(0)
+    return received, clients[1].connected.is_set()
+
+def test_last_will():
+    received, connected = asyncio.run(last_will())
+    assert received == [("will/1", b"gone")], "Will was not published only for the lost connection"
+    assert not connected, "Client still connected after the cut"
+    print("Last-Will Test successful")
+
+async def topic_aliases():
+    # The captain's heartbeats after the first go out as an alias
+    broker = LocalBroker()
+    client, received = await subscriber(broker, TOPIC_STATUS)
+    robot = Robot("AliasRobot", client)
+    robot.setRegistered(3, 2)
+    robot.captain, robot.captain_epoch = True, 2
+    for _ in range(3):
+        robot.heartbeat()
+    robot.scheduler.cancel_all()
+    await asyncio.sleep(0)
+    return received, client._aliases
+
+def test_topic_aliases():
+    received, aliases = asyncio.run(topic_aliases())
+    assert [(topic, decode(payload)[:2]) for topic, payload in received] == [(TOPIC_STATUS, (2, 3))] * 3, \
+        "Aliased heartbeats were not resolved to their topic"
+    assert TOPIC_STATUS in aliases, "Heartbeat topic got no alias"
+    print("Topic-Alias Test successful")
+
+async def election(size):
+    # The lowest robot starts, the highest one is elected
+    broker = LocalBroker()
+    fleet = await start_fleet(broker, size)
+    robots = fleet[1]
+    published = broker.stats["published"]
+    robots[0].startElection()
+    duration = await agree(robots, size - 1)
+    captains = [robot.id for robot in robots if robot.captain]
+    published = broker.stats["published"] - published
+    await stop_fleet(*fleet)
+    return duration, captains, published
+
+def test_deterministic_election():
+    first, second = asyncio.run(election(NUM_ROBOTS)), asyncio.run(election(NUM_ROBOTS))
+    assert first[0] is not None and first[1] == [NUM_ROBOTS - 1], "Highest robot was not elected"
+    assert first[1:] == second[1:], "Same election took different messages"
+    assert first[0] < ELECTION_ANSWER_TIMEOUT, "Election waited for a fixed window"
+    print("Deterministic-Election Test successful")
+
+async def lost_captain(size):
+    # The captain's connection is cut: its will starts the election
+    broker = LocalBroker()
+    fleet = await start_fleet(broker, size)
+    robots = fleet[1]
+    robots[0].startElection()
+    await agree(robots, size - 1)
+    published = broker.stats["published"]
+    captain = robots.pop()
+    captain.client.cut()
+    duration = await agree(robots, size - 2)
+    published = broker.stats["published"] - published
+    await stop_fleet(None, robots + [captain], fleet[2])
+    return duration, published
+
+def test_lost_captain():
+    duration, _ = asyncio.run(lost_captain(NUM_ROBOTS))
+    assert duration is not None and duration < ELECTION_ANSWER_TIMEOUT, "Election waited for the heartbeat timeout"
+    print("Lost-Captain Test successful")
+
+async def silent_captain(size, silent):
+    # The highest robots go without a will, the others miss the captain's heartbeat
+    broker = LocalBroker()
+    fleet = await start_fleet(broker, size)
+    robots = fleet[1]
+    robots[0].startElection()
+    await agree(robots, size - 1)
+    gone = robots[size - silent:]
+    for robot in gone:
+        robot.client._client._will = None
+        robot.client.cut()
+    alive = robots[:size - silent]
+    for robot in alive:
+        robot.post("captain_timeout")
+    duration = await agree(alive, size - silent - 1)
+    await stop_fleet(None, robots, fleet[2])
+    return duration
+
+def test_silent_captain():
+    duration = asyncio.run(silent_captain(NUM_ROBOTS, SILENT_ROBOTS))
+    assert duration is not None and duration < (STANDBY_RANKS + 3) * ELECTION_ANSWER_TIMEOUT, \
+        "Standby waited for every silent higher robot"
+    print("Silent-Captain Test successful")
+
+
+# Non-functional test
+
+async def measure_elections(size):
+    # Worst case: the lowest robot starts, every higher one answers
+    broker = LocalBroker()
+    fleet = await start_fleet(broker, size)
+    robots = fleet[1]
+    durations = []
+    published, delivered = broker.stats["published"], broker.stats["delivered"]
+    for _ in range(ELECTIONS):
+        reset(robots)
+        robots[0].startElection()
+        durations.append(await agree(robots, size - 1))
+        await asyncio.sleep(0.01)  # Late answers
+    published = (broker.stats["published"] - published) / ELECTIONS
+    delivered = (broker.stats["delivered"] - delivered) / ELECTIONS
+    await stop_fleet(*fleet)
+    return durations, published, delivered
+
+async def measure_dispatch():
+    # Seconds per message to one robot's namespace with HOST_ROBOTS robots on one connection
+    broker = LocalBroker()
+    client = LocalClient(broker)
+    robots = [Robot(f"HostRobot{i}", client) for i in range(HOST_ROBOTS)]
+    await client.connect()
+    for i, robot in enumerate(robots):
+        robot.setRegistered(i)
+    await asyncio.sleep(0)  # Announced
+    dispatched = client.stats["dispatched"]
+    start_time = time.perf_counter()
+    for i in range(DISPATCHED):
+        client.publish(TOPIC_ROBOT.format(i * HOST_ROBOTS // DISPATCHED, ELECTION_START), encode(1, -1))
+    while client.stats["dispatched"] - dispatched < DISPATCHED:
+        await asyncio.sleep(0)
+    duration = (time.perf_counter() - start_time) / DISPATCHED
+    await client.disconnect()
+    return duration
+
+
+if __name__ == "__main__":
+    print("Starting non-functional test (elections on the in-process broker)...")
+    results = [(size, *asyncio.run(measure_elections(size))) for size in FLEET_SIZES]
+    failovers = [(size, *asyncio.run(lost_captain(size))) for size in FLEET_SIZES]
+    dispatch = asyncio.run(measure_dispatch())
+
+    # Save results in file
+    with open("tests_local_broker_election.txt", "w") as f:
+        f.write("Bully election on the in-process broker, one connection per robot, started by the lowest robot:\n")
+        for size, durations, published, delivered in results:
+            completed = [duration for duration in durations if duration is not None]
+            average = f"{sum(completed) / len(completed) * 1000:.2f}ms" if completed else "timeout"
+            f.write(f"{size} robots: {average} until all agree ({len(completed)}/{len(durations)} elections), "
+                    f"{published:.0f} messages published, {delivered:.0f} delivered per election\n")
+        f.write("\nCaptain connection lost, election started by its last will:\n")
+        for size, duration, published in failovers:
+            duration = f"{duration * 1000:.2f}ms" if duration is not None else "timeout"
+            f.write(f"{size} robots: new captain after {duration}, {published} messages published\n")
+        f.write(f"\nMessage to one robot's namespace, {HOST_ROBOTS} robots on one connection (as host.py):\n")
+        f.write(f"{dispatch * 1e6:.1f}us per message ({DISPATCHED} messages)\n")
+
+    print("Non-functional test-results saved in 'tests_local_broker_election.txt'")
+
+    print("Starting functional tests...")
+    test_topic_filters()
+    test_retained_messages()
+    test_last_will()
+    test_topic_aliases()
+    test_deterministic_election()
+    test_lost_captain()
+    test_silent_captain()
+    print("All tests executed")
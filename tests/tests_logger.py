@@ -0,0 +1,72 @@
+from src.common import logger
+import io
+import time
+
+LOG_CALLS = 1000000  # hot-path cost test
+
+class CountingStream(io.StringIO):
+    writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+# Functional tests
+
+def test_levels():
+    stream = CountingStream()
+    writer = logger.LogWriter(stream)
+    log = logger.Logger(writer, "Test", logger.INFO)
+    log.debug("hidden {}", 1)
+    log.info("shown {}", 2)
+    log.warning("also shown")
+    writer.close()
+    assert stream.getvalue() == "[Test] shown 2\n[Test] also shown\n", "Log levels did not work as expected"
+    assert log.debug is logger._disabled, "Disabled level is not a no-op"
+    print("Levels Test successful")
+
+def test_sampling():
+    stream = CountingStream()
+    writer = logger.LogWriter(stream)
+    log = logger.Logger(writer, "Test", logger.DEBUG)
+    for i in range(100):
+        log.debug("heartbeat {}", i, sample = 10)
+    writer.close()
+    assert stream.getvalue().count("\n") == 10, "Sampling did not keep every 10th record"
+    print("Sampling Test successful")
+
+def test_batched_writes():
+    stream = CountingStream()
+    writer = logger.LogWriter(stream, flush_interval = 0.05)
+    log = logger.Logger(writer, "Test", logger.INFO)
+    for i in range(1000):
+        log.info("record {}", i)
+    time.sleep(0.2)
+    writer.close()
+    assert stream.getvalue().count("\n") == 1000 and stream.writes < 10, "Records were not written in batches"
+    print("Batched-Writes Test successful")
+
+
+# Non-functional test
+
+def measure_call_cost(level):
+    writer = logger.LogWriter(io.StringIO())
+    log = logger.Logger(writer, "Test", level)
+    start_time = time.time()
+    for i in range(LOG_CALLS):
+        log.debug("Robot {} still connected", i, sample = 100)
+    end_time = time.time()
+    writer.close()
+    return (end_time - start_time) / LOG_CALLS
+
+
+if __name__ == "__main__":
+    print("Starting non-functional test (debug call cost)...")
+    print(f"Debug disabled: {measure_call_cost(logger.INFO) * 1e9:.0f} ns/call")
+    print(f"Debug enabled, sampled 1/100: {measure_call_cost(logger.DEBUG) * 1e9:.0f} ns/call")
+
+    print("Starting functional tests...")
+    test_levels()
+    test_sampling()
+    test_batched_writes()
+    print("All tests executed")
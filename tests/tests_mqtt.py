@@ -1,112 +1,436 @@
-import time
+import asyncio
+import os
 import sys
-import threading
+import time
+import tracemalloc
+
 import paho.mqtt.client as mqtt
 
+SRC_DIR = next(path for path in (os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"),  # docker
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))  # local
+               if os.path.isdir(path))
+sys.path.insert(0, SRC_DIR)
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+from fleet import AGREE_TIMEOUT, agree, reset, start_fleet as start_robots, stop_fleet
+from robots.messages import decode, encode
+from robots.mqtt_client import MQTTClient
+from robots.robot import (ELECTION_ANSWER_TIMEOUT, ELECTION_QUEUE, ELECTION_START, HEARTBEAT_SPEEDUP,
+                          TOPIC_ELECTION_RESULT, TOPIC_OFFLINE, TOPIC_ROBOT, TOPIC_STATUS, Robot)
+
 # Configuration
 MQTT_HOST = "broker" # local = localhost || docker = broker
 MQTT_PORT = 1883
 
-# MQTT topics
-TOPIC_ELECTION_START = "robots/election/start"
-TOPIC_ELECTION_CANDIDATE = "robots/election/candidate"
-TOPIC_ELECTION_RESULT = "robots/election/result"
-TOPIC_STATUS = "robots/status"
-
 # MQTT clients
 NUM_ROBOTS = 5  # testing robot amount
-HEARTBEAT_TIMEOUT = 10
-HEARTBEAT_INTERVAL = 2
-MQTT_MESSAGE_COUNT = 20  # stresstest
-
-class Robot:
-    def __init__(self, id):
-        self.id = id
-        self.captain = False
-        self.election_candidates = []
-        self.recent_heartbeat = None
-        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-        self.client.on_message = self.on_message
-        self.client.connect(MQTT_HOST, MQTT_PORT, 60)
-        self.client.subscribe([(TOPIC_ELECTION_START, 0), (TOPIC_ELECTION_CANDIDATE, 0), (TOPIC_ELECTION_RESULT, 0), (TOPIC_STATUS, 0)])
-        self.client.loop_start()
-        
-    def run(self):
-        while True:
-            if self.captain:
-                self.heartbeat()
-            else:
-                self.checkHeartbeat()
-            time.sleep(HEARTBEAT_INTERVAL)
-
-    def startElection(self):
-        print("[MQTT] Starting new captain election...")
-        self.recent_heartbeat = time.time()
-        self.client.publish(TOPIC_ELECTION_START, self.id)
-    
-    def electCaptain(self):
-        print("[MQTT] New captain election started")
-        self.recent_heartbeat = time.time()
-        self.election_candidates = []
-        print(f"[MQTT] Candidating for captain election ({self.id})")
-        self.client.publish(TOPIC_ELECTION_CANDIDATE, self.id)
-    
-        time.sleep(3) # Waiting for other candidates
-    
-        if self.id == max(self.election_candidates):
-            print(f"[MQTT] Publishing myself as captain ({self.id})")
-            self.client.publish(TOPIC_ELECTION_RESULT, self.id)
-        else:
-            print("[MQTT] Rejecting candidation...")
-    
-    def heartbeat(self):
-        self.client.publish(TOPIC_STATUS, self.id)
-    
-    def checkHeartbeat(self):
-        if self.recent_heartbeat is not None and time.time() - self.recent_heartbeat > HEARTBEAT_TIMEOUT:
-            print("[MQTT] Missing heartbeat from captain")
-            self.startElection()
-
-    def on_message(self, client, userdata, msg):
-        topic = msg.topic
-        payload = msg.payload.decode()
-
-        print(f"[MQTT] Message received for {topic}: {payload}")
-
-        if topic == TOPIC_STATUS:
-            self.recent_heartbeat = time.time()
-        elif topic == TOPIC_ELECTION_START:
-            threading.Thread(target = self.electCaptain, daemon = True).start()
-        elif topic == TOPIC_ELECTION_CANDIDATE:
-            if not self.id == int(payload):
-                print(f"[MQTT] Robot ({payload}) candidates as captain")
-            self.election_candidates.append(int(payload))
-        elif topic == TOPIC_ELECTION_RESULT:
-            if int(payload) == self.id:
-                self.captain = True
-                print("[MQTT] Robot elected as captain")
-            else:
-                self.captain = False
-                print(f"[MQTT] New captain is ({payload})")
-
-
-def stress_test(): # High amount of messages
+HEARTBEAT_TIMEOUT = 0.5  # captain failure test
+HEARTBEAT_INTERVAL = 0.1
+MQTT_MESSAGE_COUNT = 2000  # stresstest
+FLEET_SIZES = [5, 20, 100]  # robots per election benchmark
+ELECTIONS = 5  # elections per fleet size
+FLOOD_SIZES = [1000, 10000]  # election starts per flood benchmark
+HEARTBEATS = 1000  # heartbeats per bandwidth benchmark
+ADAPTIVE_INTERVAL = 0.4  # stable heartbeat interval of the adaptive heartbeat test
+LOAD_INTERVAL = 1  # stable heartbeat interval of the broker load benchmark
+LOAD_WINDOW = 2  # seconds counted right after an election and once stable
+
+def start_fleet(size, **options):
+    # Robots with the IDs 0..size-1 on one connection to the broker
+    return start_robots(size, lambda: MQTTClient(MQTT_HOST, MQTT_PORT), settle=0.1, **options)
+
+def raw_client():
     client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
     client.connect(MQTT_HOST, MQTT_PORT, 60)
-    print(f"[Stress Test] Sending {MQTT_MESSAGE_COUNT} messages...")
-    for _ in range(MQTT_MESSAGE_COUNT):
+    client.loop_start()
+    return client
+
+async def flood(fleet, count):
+    # Election starts of the running epoch to every robot from every lower ID,
+    # plus invalid heartbeats. Returns the longest election queue of a robot meanwhile
+    client = raw_client()
+    epoch = fleet[1][0].epoch
+    starts = [(robot.id, initiator) for robot in fleet[1] for initiator in range(robot.id)]
+    for i in range(count):
+        robot_id, initiator = starts[i % len(starts)]
         client.publish(TOPIC_STATUS, "test")
+        client.publish(TOPIC_ROBOT.format(robot_id, ELECTION_START), encode(epoch, initiator))
+    client.publish(TOPIC_STATUS, "end").wait_for_publish()
+    longest = 0
+    while fleet[0].stats["received"] < 2 * count:
+        longest = max(longest, *(len(robot.events) for robot in fleet[1]))
+        await asyncio.sleep(0.001)
+    client.loop_stop()
+    client.disconnect()
+    return longest
+
+# Functional tests
+
+async def highest_becomes_captain():
+    fleet = await start_fleet(NUM_ROBOTS)
+    robots = fleet[1]
+    robots[0].startElection()
+    duration = await agree(robots, NUM_ROBOTS - 1)
+    captains = [robot.id for robot in robots if robot.captain]
+    await stop_fleet(*fleet)
+    return duration, captains
+
+def test_highest_becomes_captain():
+    duration, captains = asyncio.run(highest_becomes_captain())
+    assert duration is not None and captains == [NUM_ROBOTS - 1], "Highest robot was not elected"
+    assert duration < ELECTION_ANSWER_TIMEOUT, "Election waited for a fixed window"
+    print("Bully-Election Test successful")
+
+async def single_robot():
+    fleet = await start_fleet(1)
+    fleet[1][0].startElection()
+    duration = await agree(fleet[1], 0)
+    await stop_fleet(*fleet)
+    return duration
+
+def test_single_robot():
+    assert asyncio.run(single_robot()) is not None, "Single robot did not elect itself"
+    print("Single-Robot Test successful")
+
+async def dead_higher_robot():
+    fleet = await start_fleet(NUM_ROBOTS)
+    robots = fleet[1]
+    for robot in robots:
+        robot.peers.add(NUM_ROBOTS)  # Known, but not answering
+    robots[0].startElection()
+    duration = await agree(robots, NUM_ROBOTS - 1)
+    await stop_fleet(*fleet)
+    return duration
+
+def test_dead_higher_robot():
+    duration = asyncio.run(dead_higher_robot())
+    assert duration is not None and duration >= ELECTION_ANSWER_TIMEOUT, "Election did not skip the dead robot"
+    print("Dead-Higher-Robot Test successful")
+
+async def captain_failure():
+    fleet = await start_fleet(NUM_ROBOTS, heartbeat_interval=HEARTBEAT_INTERVAL, heartbeat_timeout=HEARTBEAT_TIMEOUT)
+    robots = fleet[1]
+    robots[0].startElection()
+    await agree(robots, NUM_ROBOTS - 1)
+    captain = robots.pop()
+    captain.shutdown_event.set()  # Stops heartbeating
+    duration = await agree(robots, NUM_ROBOTS - 2)
+    await stop_fleet(*fleet)
+    return duration
+
+def test_captain_failure():
+    duration = asyncio.run(captain_failure())
+    assert duration is not None and duration < HEARTBEAT_TIMEOUT + ELECTION_ANSWER_TIMEOUT, "No new captain after failure"
+    print("Captain-Failure Test successful")
+
+async def stale_epoch():
+    fleet = await start_fleet(NUM_ROBOTS)
+    robots = fleet[1]
+    robots[0].startElection()
+    await agree(robots, NUM_ROBOTS - 1)
+    client = raw_client()
+    client.publish(TOPIC_ELECTION_RESULT, encode(0, 0))  # Outdated captain
+    client.publish(TOPIC_STATUS, encode(0, 0)).wait_for_publish()
+    for robot in robots[1:]:
+        client.publish(TOPIC_ROBOT.format(robot.id, ELECTION_START), encode(0, 0)).wait_for_publish()
+    published = fleet[0].stats["published"]
+    await asyncio.sleep(0.2)
+    client.loop_stop()
+    client.disconnect()
+    captains = [robot.captain_id for robot in robots]
+    answers = fleet[0].stats["published"] - published
+    await stop_fleet(*fleet)
+    return captains, answers
+
+def test_stale_epoch():
+    captains, answers = asyncio.run(stale_epoch())
+    assert captains == [NUM_ROBOTS - 1] * NUM_ROBOTS and answers == 0, "Stale epoch changed the election"
+    print("Stale-Epoch Test successful")
+
+async def concurrent_starts():
+    # Every robot misses the captain at the same moment
+    fleet = await start_fleet(NUM_ROBOTS)
+    client, robots = fleet[0], fleet[1]
+    published = client.stats["published"]
+    for robot in robots:
+        robot.checkHeartbeat()
+    duration = await agree(robots, NUM_ROBOTS - 1)
+    await asyncio.sleep(0.1)  # Late answers
+    epochs = {robot.captain_epoch for robot in robots}
+    published = client.stats["published"] - published
+    await stop_fleet(*fleet)
+    return duration, epochs, published
+
+def test_concurrent_starts():
+    duration, epochs, published = asyncio.run(concurrent_starts())
+    assert duration is not None and epochs == {1}, "Concurrent elections were not merged"
+    assert published <= NUM_ROBOTS, "All robots started an election"
+    print("Concurrent-Starts Test successful")
+
+async def retained_captain():
+    # A robot on its own connection subscribes after the election, long
+    # before the captain's next heartbeat
+    fleet = await start_fleet(NUM_ROBOTS, heartbeat_interval=10)
+    fleet[1][0].startElection()
+    await agree(fleet[1], NUM_ROBOTS - 1)
+    client = MQTTClient(MQTT_HOST, MQTT_PORT)
+    await client.connect()
+    late = Robot("LateRobot", client)
+    task = asyncio.create_task(late.run_mqtt())
+    duration = await agree([late], NUM_ROBOTS - 1, timeout=1)
+    late.shutdown_event.set()
+    await task
+    await client.disconnect()
+    await stop_fleet(*fleet)
+    return duration
+
+def test_retained_captain():
+    duration = asyncio.run(retained_captain())
+    assert duration is not None and duration < 10 / HEARTBEAT_SPEEDUP, "Late robot waited for the next heartbeat"
+    print("Retained-Captain Test successful")
+
+async def adaptive_heartbeat():
+    # Heartbeats as received by the robots after an election: (time, sender)
+    fleet = await start_fleet(NUM_ROBOTS, heartbeat_interval=ADAPTIVE_INTERVAL)
+    beats = []
+    fleet[0].subscribe(TOPIC_STATUS, lambda topic, message: beats.append((time.perf_counter(), message.robot_id)),
+                       decode=decode)
+    fleet[1][0].startElection()
+    await agree(fleet[1], NUM_ROBOTS - 1)
+    await asyncio.sleep(4 * ADAPTIVE_INTERVAL)
+    await stop_fleet(*fleet)
+    gaps = [later[0] - earlier[0] for earlier, later in zip(beats, beats[1:])]
+    return gaps, {sender for _, sender in beats}
+
+def test_adaptive_heartbeat():
+    gaps, senders = asyncio.run(adaptive_heartbeat())
+    assert senders == {NUM_ROBOTS - 1}, "Robots other than the captain sent heartbeats"
+    assert gaps[0] < 2 * ADAPTIVE_INTERVAL / HEARTBEAT_SPEEDUP, "Heartbeats were not faster after the election"
+    assert abs(gaps[-1] - ADAPTIVE_INTERVAL) < 0.1, "Heartbeats did not slow down to the stable interval"
+    print("Adaptive-Heartbeat Test successful")
+
+async def lost_captain(size, liveness, heartbeat_timeout = HEARTBEAT_TIMEOUT):
+    # The captain runs on its own connection through a proxy that is then cut,
+    # like a crashed robot. Without liveness the others ignore last wills and
+    # only miss the heartbeats. Seconds until they follow a new captain
+    fleet = await start_fleet(size - 1, heartbeat_interval=HEARTBEAT_INTERVAL, heartbeat_timeout=heartbeat_timeout)
+    robots = fleet[1]
+    writers = []
+    proxy = await count_bytes({"sent": 0, "received": 0}, writers)
+    client = MQTTClient("127.0.0.1", proxy.sockets[0].getsockname()[1])
+    captain = Robot("CaptainRobot", client, heartbeat_interval=HEARTBEAT_INTERVAL, heartbeat_timeout=heartbeat_timeout)
+    await client.connect()
+    task = asyncio.create_task(captain.run_mqtt())
+    await asyncio.sleep(0.1)  # Subscribed
+    captain.setRegistered(size - 1)
+    if not liveness:
+        for robot in robots:
+            fleet[0].unsubscribe(TOPIC_OFFLINE, robot.on_message)
+    while any(size - 1 not in robot.peers for robot in robots):
+        await asyncio.sleep(0.01)
+    robots[0].startElection()
+    await agree(robots + [captain], size - 1)
+    await asyncio.sleep(0.1)
+    proxy.close()  # No reconnect
+    for writer in writers:
+        writer.transport.abort()
+    duration = await agree(robots, size - 2)
+    captain.shutdown_event.set()
+    await task
+    await client.disconnect()
+    await stop_fleet(*fleet)
+    return duration
+
+def test_captain_will():
+    duration = asyncio.run(lost_captain(NUM_ROBOTS, True, heartbeat_timeout=AGREE_TIMEOUT))
+    assert duration is not None and duration < ELECTION_ANSWER_TIMEOUT, "Election waited for the heartbeat timeout"
+    print("Captain-Will Test successful")
+
+def test_message_format():
+    assert decode(encode(7, 42, 9)) == (7, 42, 9), "Message did not survive encoding"
+    assert len(encode(2 ** 32 - 1, 2 ** 31 - 1, 2 ** 32 - 1)) == len(encode(0, 0)), "Message size depends on the values"
+    assert decode(b"1:2") is None and decode(encode(7, 42, version=0)) is None, "Foreign message was decoded"
+    print("Message-Format Test successful")
+
+async def stress_test(): # High amount of messages
+    fleet = await start_fleet(NUM_ROBOTS, heartbeat_interval=HEARTBEAT_SPEEDUP * AGREE_TIMEOUT)  # One heartbeat
+    published = fleet[0].stats["published"]
+    print(f"[Stress Test] Sending {MQTT_MESSAGE_COUNT} election starts...")
+    longest = await flood(fleet, MQTT_MESSAGE_COUNT)
     print("[Stress Test] Messages sent")
+    duration = await agree(fleet[1], NUM_ROBOTS - 1)
+    published = fleet[0].stats["published"] - published
+    await stop_fleet(*fleet)
+    return duration, published, longest
 
-if __name__ == "__main__":
-    robots = [Robot(i) for i in range(NUM_ROBOTS)]
+def test_stress():
+    duration, published, longest = asyncio.run(stress_test())
+    assert duration is not None, "Robots did not agree after a message flood"
+    assert published <= 2 * NUM_ROBOTS, "Repeated election starts were answered more than once"
+    assert longest <= NUM_ROBOTS, "Repeated election starts were queued one by one"
+    print("Stress Test successful")
+
+
+# Non-functional test
+
+async def measure_elections(size):
+    # Worst case: the lowest robot starts, every higher one answers
+    fleet = await start_fleet(size)
+    client, robots = fleet[0], fleet[1]
+    durations = []
+    published, dispatched = client.stats["published"], client.stats["dispatched"]
+    for _ in range(ELECTIONS):
+        reset(robots)
+        robots[0].startElection()
+        durations.append(await agree(robots, size - 1))
+        await asyncio.sleep(0.1)  # Late answers
+    published = (client.stats["published"] - published) / ELECTIONS
+    dispatched = (client.stats["dispatched"] - dispatched) / ELECTIONS
+    await stop_fleet(*fleet)
+    return durations, published, dispatched
+
+async def measure_failover(size):
+    # The captain stops and all other robots miss its heartbeat at once
+    fleet = await start_fleet(size)
+    client, robots = fleet[0], fleet[1]
+    robots[0].startElection()
+    await agree(robots, size - 1)
+    await asyncio.sleep(0.1)
+    robots.pop().shutdown_event.set()
+    published = client.stats["published"]
     for robot in robots:
-        threading.Thread(target=robot.run).start()
-        
-    print("\n=== Leader election test ===")
-    time.sleep(1)
-    robots[0].client.publish(TOPIC_ELECTION_START, robots[0].id)
-
-    print("\n=== High message amount test ===")
-    stress_test()
-    sys.exit()
+        robot.checkHeartbeat()
+    duration = await agree(robots, size - 2)
+    await asyncio.sleep(0.1)  # Late answers
+    published = client.stats["published"] - published
+    await stop_fleet(*fleet)
+    return duration, published
+
+async def count_bytes(counts, writers = None):
+    # TCP proxy to the broker on a free local port, adds the bytes a client
+    # sends to counts["sent"] and the bytes the broker returns to counts["received"].
+    # Both sockets of each connection go to writers, to cut it
+    async def pipe(reader, writer, direction):
+        while data := await reader.read(65536):
+            counts[direction] += len(data)
+            writer.write(data)
+        writer.close()
+
+    async def connection(reader, writer):
+        broker_reader, broker_writer = await asyncio.open_connection(MQTT_HOST, MQTT_PORT)
+        if writers is not None:
+            writers.extend((writer, broker_writer))
+        await asyncio.gather(pipe(reader, broker_writer, "sent"), pipe(broker_reader, writer, "received"))
+
+    return await asyncio.start_server(connection, "127.0.0.1", 0)
+
+async def measure_heartbeats(text):
+    # Bytes on the wire per captain heartbeat that one subscribed client
+    # publishes and gets back: the former text payload over MQTT 3.1.1 or the
+    # robot's own binary one over MQTT v5 with topic aliases where supported
+    counts = {"sent": 0, "received": 0}
+    proxy = await count_bytes(counts)
+    port = proxy.sockets[0].getsockname()[1]
+    client = MQTTClient("127.0.0.1", port, protocol=mqtt.MQTTv311 if text else mqtt.MQTTv5)
+    await client.connect()
+    robot = Robot("MQTTRobot", client)
+    robot.setRegistered(4711, 12)
+    robot.captain, robot.captain_epoch = True, 12
+    tasks = [asyncio.create_task(robot.run_mqtt())]
+    await asyncio.sleep(0.2)  # Subscribed and announced
+    sent, received = counts["sent"], counts["received"]
+    for _ in range(HEARTBEATS):
+        if text:
+            client.publish(TOPIC_STATUS, f"{robot.captain_epoch}:{robot.id}")
+        else:
+            robot.heartbeat()
+    while client.stats["received"] < HEARTBEATS + 1:
+        await asyncio.sleep(0.01)
+    sent, received = (counts["sent"] - sent) / HEARTBEATS, (counts["received"] - received) / HEARTBEATS
+    protocol = "MQTT v5" if client.protocol == mqtt.MQTTv5 else "MQTT 3.1.1"
+    await stop_fleet(client, [robot], tasks)
+    proxy.close()
+    return protocol, sent, received
+
+async def measure_load(size):
+    # Messages per second at the broker right after an election and once the
+    # heartbeats reached LOAD_INTERVAL, with the robots of one connection
+    fleet = await start_fleet(size, heartbeat_interval=LOAD_INTERVAL)
+    client, robots = fleet[0], fleet[1]
+    robots[0].startElection()
+    await agree(robots, size - 1)
+    windows = []
+    for _ in range(2):
+        published, dispatched = client.stats["published"], client.stats["dispatched"]
+        await asyncio.sleep(LOAD_WINDOW)
+        windows.append(((client.stats["published"] - published) / LOAD_WINDOW,
+                        (client.stats["dispatched"] - dispatched) / LOAD_WINDOW))
+    await stop_fleet(*fleet)
+    return windows
+
+async def measure_flood(count):
+    # Memory and time to work off a flood of election starts
+    fleet = await start_fleet(NUM_ROBOTS)
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    longest = await flood(fleet, count)
+    duration = time.perf_counter() - start_time
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    handled = sum(robot.event_stats["handled"] for robot in fleet[1])
+    await stop_fleet(*fleet)
+    return duration, peak, longest, handled
+
+
+if __name__ == "__main__":
+    print("Starting non-functional test (election duration and messages)...")
+    results = [(size, *asyncio.run(measure_elections(size))) for size in FLEET_SIZES]
+    failovers = [(size, *asyncio.run(measure_failover(size))) for size in FLEET_SIZES]
+    losses = [(size, *(asyncio.run(lost_captain(size, liveness)) for liveness in (False, True))) for size in FLEET_SIZES]
+    floods = [(count, *asyncio.run(measure_flood(count))) for count in FLOOD_SIZES]
+    loads = [(size, *asyncio.run(measure_load(size))) for size in FLEET_SIZES]
+    heartbeats = [(name, *asyncio.run(measure_heartbeats(text))) for name, text in (("Text", True), ("Binary", False))]
+
+    # Save results in file
+    with open("tests_mqtt_election.txt", "w") as f:
+        f.write("Bully election started by the lowest robot, highest robot alive:\n")
+        for size, durations, published, dispatched in results:
+            completed = [duration for duration in durations if duration is not None]
+            average = f"{sum(completed) / len(completed) * 1000:.2f}ms" if completed else "timeout"
+            f.write(f"{size} robots: {average} until all agree ({len(completed)}/{len(durations)} elections), "
+                    f"{published:.0f} messages published, {dispatched:.0f} delivered per election\n")
+        f.write("\nCaptain failure detected by all robots at once (concurrent starts merged by epoch):\n")
+        for size, duration, published in failovers:
+            duration = f"{duration * 1000:.2f}ms" if duration is not None else "timeout"
+            f.write(f"{size} robots: new captain after {duration}, {published} messages published\n")
+        f.write(f"\nCaptain connection cut without disconnect (heartbeat timeout {HEARTBEAT_TIMEOUT}s):\n")
+        for size, timeout, will in losses:
+            timeout, will = (f"{duration * 1000:.2f}ms" if duration is not None else "timeout" for duration in (timeout, will))
+            f.write(f"{size} robots: new captain after {timeout} by heartbeat timeout, {will} by last will\n")
+        f.write(f"\nFlood of election starts and invalid heartbeats ({NUM_ROBOTS} robots, queue limit {ELECTION_QUEUE}):\n")
+        for count, duration, peak, longest, handled in floods:
+            f.write(f"{count} starts: received in {duration:.3f}s, peak memory {peak / 1024:.0f}KiB, "
+                    f"longest election queue {longest}, {handled} events handled\n")
+        f.write(f"\nBroker load with retained captain heartbeats (stable interval {LOAD_INTERVAL}s, "
+                f"{HEARTBEAT_SPEEDUP}x faster after an election, {LOAD_WINDOW}s windows):\n")
+        for size, (published, dispatched), (stable_published, stable_dispatched) in loads:
+            f.write(f"{size} robots: after election {published:.1f} published/s, {dispatched:.1f} delivered/s; "
+                    f"stable {stable_published:.1f} published/s, {stable_dispatched:.1f} delivered/s\n")
+        f.write(f"\nBytes on the wire per captain heartbeat ({HEARTBEATS} heartbeats, one subscribed client):\n")
+        for name, protocol, sent, received in heartbeats:
+            f.write(f"{name} payload over {protocol}: {sent:.1f} bytes published, {received:.1f} bytes delivered\n")
+
+    print("Non-functional test-results saved in 'tests_mqtt_election.txt'")
+
+    print("Starting functional tests...")
+    test_highest_becomes_captain()
+    test_single_robot()
+    test_dead_higher_robot()
+    test_captain_failure()
+    test_stale_epoch()
+    test_concurrent_starts()
+    test_retained_captain()
+    test_captain_will()
+    test_adaptive_heartbeat()
+    test_message_format()
+    test_stress()
+    print("All tests executed")
@@ -0,0 +1,244 @@
+from src.controller.raft import RaftNode, ReplicatedRegistry, NotLeader, apply_command
+from src.controller.registry import RobotRegistry
+from src.controller.wal import SNAPSHOT_EVERY, WriteAheadLog
+import shutil
+import statistics
+import tempfile
+import time
+
+NODES = ["a", "b", "c"]
+WRITES = 500  # commits per latency run
+FAILOVERS = 5  # leader failures per failover run
+
+# Three in-process nodes, calls to or from a stopped node fail like a lost connection
+class LocalCluster:
+    def __init__(self, directory=None, snapshot_every=SNAPSHOT_EVERY):
+        self.down = set()
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.nodes = {}
+        self.registries = {}
+        self.led = {}  # node -> robot IDs registered when on_leader was last called
+        for node in NODES:
+            self.start(node)
+
+    def start(self, node):
+        registry = RobotRegistry()
+        journal = WriteAheadLog(f"{self.directory}/{node}", self.snapshot_every) if self.directory else None
+        raft = RaftNode(node, NODES,
+                        lambda peer, request, node=node: self.call(node, peer, "handle_vote", request),
+                        lambda peer, request, node=node: self.call(node, peer, "handle_append", request),
+                        lambda command, registry=registry: apply_command(registry, command), journal,
+                        on_leader=lambda node=node, registry=registry: self.lead(node, registry),
+                        save=registry.save, restore=registry.restore)
+        raft.recover()
+        self.nodes[node] = raft
+        self.registries[node] = ReplicatedRegistry(registry, raft, self.forward)
+        self.down.discard(node)  # Reachable once it replaced the stopped node
+        raft.start()
+
+    def lead(self, node, registry):
+        self.led[node] = [robot["id"] for robot in registry.snapshot()]
+
+    def stop(self, node):
+        self.down.add(node)
+        self.nodes[node].stop()
+        if self.nodes[node].journal is not None:
+            self.nodes[node].journal.close()
+
+    def call(self, sender, peer, method, request):
+        if sender in self.down or peer in self.down:
+            return None
+        return getattr(self.nodes[peer], method)(request)
+
+    def forward(self, leader, command):
+        if leader in self.down:
+            raise NotLeader(None)
+        return self.nodes[leader].propose(command)
+
+    def leader(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            leaders = [node for node, raft in self.nodes.items() if node not in self.down and raft.is_leader]
+            if len(leaders) == 1:
+                return leaders[0]
+            time.sleep(0.01)
+        raise AssertionError("No leader elected")
+
+    def shutdown(self):
+        for node in NODES:
+            if node not in self.down:
+                self.stop(node)
+
+# Functional tests
+
+def test_leader_election():
+    cluster = LocalCluster()
+    leader = cluster.leader()
+    time.sleep(0.1)  # First heartbeat reaches the followers
+    terms = {raft.term for raft in cluster.nodes.values()}
+    assert len(terms) == 1, "Nodes disagree on the term"
+    assert all(raft.leader == leader for raft in cluster.nodes.values()), "Followers do not know the leader"
+    cluster.shutdown()
+    print("Leader-Election Test successful")
+
+def test_replicated_writes():
+    cluster = LocalCluster()
+    leader = cluster.leader()
+    follower = next(node for node in NODES if node != leader)
+    first = cluster.registries[follower].register("TestRobot")  # Forwarded to the leader
+    second = cluster.registries[leader].register("TestRobot")
+    cluster.registries[follower].set_captain(second["id"], second["name"])
+    assert cluster.registries[follower].unregister(first["id"]) == (first, False), "Unregister result was not returned"
+    assert first["id"] not in cluster.registries[follower], "Follower does not read its own write"
+
+    time.sleep(0.2)
+    for registry in cluster.registries.values():
+        assert registry.snapshot() == [second] and registry.captain == second, "Replicas differ"
+    cluster.shutdown()
+    print("Replicated-Writes Test successful")
+
+def test_failover_keeps_registrations():
+    cluster = LocalCluster()
+    leader = cluster.leader()
+    robots = [cluster.registries[leader].register(f"Robot{i}") for i in range(20)]
+    cluster.stop(leader)
+
+    new_leader = cluster.leader()
+    survivor = next(node for node in NODES if node not in (leader, new_leader))
+    assert cluster.registries[survivor].snapshot() == robots, "Committed registrations were lost"
+    robot = cluster.registries[survivor].register("AfterFailover")
+    assert robot["id"] == len(robots), "IDs were reused after the failover"
+
+    cluster.start(leader)  # Rejoins empty and catches up from the new leader
+    time.sleep(0.5)
+    assert cluster.registries[leader].snapshot() == robots + [robot], "Restarted node did not catch up"
+    cluster.shutdown()
+    print("Failover Test successful")
+
+def test_leader_sees_registrations():
+    # A new leader takes over liveness for every robot registered before it led
+    cluster = LocalCluster()
+    leader = cluster.leader()
+    robots = [cluster.registries[leader].register(f"Robot{i}") for i in range(20)]
+    cluster.stop(leader)
+
+    new_leader = cluster.leader()
+    deadline = time.monotonic() + 1
+    while new_leader not in cluster.led and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cluster.led.get(new_leader) == [robot["id"] for robot in robots], "New leader missed registrations"
+    cluster.shutdown()
+    print("Leader-Liveness Test successful")
+
+def test_restart_from_journal():
+    directory = tempfile.mkdtemp()
+    cluster = LocalCluster(directory)
+    leader = cluster.leader()
+    robots = [cluster.registries[leader].register(f"Robot{i}") for i in range(10)]
+    cluster.shutdown()
+
+    cluster = LocalCluster(directory)
+    leader = cluster.leader()
+    cluster.registries[leader].register("AfterRestart")  # Commits the recovered entries too
+    time.sleep(0.2)
+    assert all(registry.snapshot()[:10] == robots for registry in cluster.registries.values()), "Log was not recovered"
+    cluster.shutdown()
+    shutil.rmtree(directory)
+    print("Restart Test successful")
+
+def test_log_compaction():
+    directory = tempfile.mkdtemp()
+    cluster = LocalCluster(directory, snapshot_every=20)
+    leader = cluster.leader()
+    follower = next(node for node in NODES if node != leader)
+    cluster.stop(follower)
+    robots = [cluster.registries[leader].register(f"Robot{i}") for i in range(100)]
+    raft = cluster.nodes[leader]
+    assert raft.base > 0 and len(raft.log) < 100, "Log was not compacted"
+
+    cluster.start(follower)  # Behind the leader's snapshot
+    time.sleep(0.5)
+    assert cluster.registries[follower].snapshot() == robots, "Follower did not catch up from the snapshot"
+    cluster.shutdown()
+
+    cluster = LocalCluster(directory, snapshot_every=20)
+    leader = cluster.leader()
+    robot = cluster.registries[leader].register("AfterRestart")
+    assert robot["id"] == len(robots), "IDs were reused after the restart"
+    time.sleep(0.2)
+    assert all(registry.snapshot()[:100] == robots for registry in cluster.registries.values()), \
+        "Snapshot was not recovered"
+    cluster.shutdown()
+    shutil.rmtree(directory)
+    print("Log-Compaction Test successful")
+
+
+# Non-functional tests
+
+def measure_commit_latency(directory=None):
+    # Sequential writes on the leader and forwarded from a follower
+    cluster = LocalCluster(directory)
+    leader = cluster.leader()
+    follower = next(node for node in NODES if node != leader)
+    latencies = {}
+    for node in (leader, follower):
+        samples = []
+        for i in range(WRITES):
+            start_time = time.perf_counter()
+            cluster.registries[node].register(f"Robot{i}")
+            samples.append(time.perf_counter() - start_time)
+        latencies["leader" if node == leader else "follower"] = samples
+    cluster.shutdown()
+    return latencies
+
+def measure_failover():
+    # Leader crash until the first write commits on the new leader
+    cluster = LocalCluster()
+    durations = []
+    for _ in range(FAILOVERS):
+        leader = cluster.leader()
+        cluster.registries[leader].register("BeforeFailover")
+        cluster.stop(leader)
+        start_time = time.perf_counter()
+        survivor = next(node for node in NODES if node not in cluster.down)
+        cluster.registries[survivor].register("AfterFailover")
+        durations.append(time.perf_counter() - start_time)
+        cluster.start(leader)
+        time.sleep(0.5)
+    cluster.shutdown()
+    return durations
+
+def summary(samples):
+    samples = sorted(samples)
+    return (f"avg {statistics.mean(samples) * 1000:.2f}ms, p50 {samples[len(samples) // 2] * 1000:.2f}ms, "
+            f"p99 {samples[int(len(samples) * 0.99) - 1] * 1000:.2f}ms, max {samples[-1] * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    print("Starting non-functional tests (commit latency, failover time)...")
+    memory = measure_commit_latency()
+    directory = tempfile.mkdtemp()
+    durable = measure_commit_latency(directory)
+    shutil.rmtree(directory)
+    failovers = measure_failover()
+
+    # Save results in file
+    with open("tests_raft_latency.txt", "w") as f:
+        f.write(f"Commit latency of {WRITES} sequential writes (3 nodes):\n")
+        for label, latencies in (("in memory", memory), ("with fsync", durable)):
+            for role, samples in latencies.items():
+                f.write(f"{role} {label}: {summary(samples)}\n")
+        f.write(f"\nFailover time (leader crash until the next write commits, {FAILOVERS} runs):\n")
+        f.write(f"{summary(failovers)}\n")
+        f.write("Election timeout: 0.3-0.6s, heartbeat interval: 0.05s\n")
+    print("Non-functional test-results saved in 'tests_raft_latency.txt'")
+
+    print("Starting functional tests...")
+    test_leader_election()
+    test_replicated_writes()
+    test_failover_keeps_registrations()
+    test_leader_sees_registrations()
+    test_restart_from_journal()
+    test_log_compaction()
+    print("All tests executed")
@@ -0,0 +1,132 @@
+from src.controller.registry import RobotRegistry
+import threading
+import time
+
+FLEET_SIZES = [10, 100, 1000, 10000, 50000]  # registered robots per run
+HEALTH_CHECKS = 100000  # lookups per fleet size
+WORKER_THREADS = 10  # matches the controller's gRPC executor
+
+# Functional tests
+
+def test_register_unique_ids():
+    registry = RobotRegistry()
+    ids = []
+
+    def register_many():
+        for _ in range(1000):
+            ids.append(registry.register("TestRobot")["id"])
+
+    threads = [threading.Thread(target=register_many) for _ in range(WORKER_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(ids)) == len(ids) == len(registry), "Concurrent registration handed out duplicate IDs"
+    print("Unique-ID Test successful")
+
+def test_register_many():
+    registry = RobotRegistry()
+    first = registry.register("TestRobot")
+    robots = registry.register_many([f"Robot{i}" for i in range(100)])
+    assert [robot["id"] for robot in robots] == list(range(1, 101)), "Batch IDs not consecutive in input order"
+    assert [robot["name"] for robot in robots] == [f"Robot{i}" for i in range(100)], "Batch names mixed up"
+    assert registry.register("TestRobot")["id"] == 101 and first["id"] == 0, "Batch disturbed later IDs"
+    assert registry.register_many([]) == [], "Empty batch did not work"
+    print("Register-Many Test successful")
+
+def test_unregister_captain():
+    registry = RobotRegistry()
+    robot = registry.register("TestRobot")
+    registry.set_captain(robot["id"], robot["name"])
+
+    removed, captain_removed = registry.unregister(robot["id"])
+    assert removed == robot and captain_removed, "Unregistering the captain did not clear it"
+    assert registry.captain is None and robot["id"] not in registry, "Robot still registered"
+    assert registry.unregister(robot["id"]) == (None, False), "Unknown robot could be unregistered"
+    print("Unregister-Captain Test successful")
+
+def test_captain_epoch():
+    registry = RobotRegistry()
+    low, high = registry.register("TestRobot"), registry.register("TestRobot")
+    assert registry.elect_captain(high["id"], high["name"], 2), "Captain of a new epoch was rejected"
+    assert not registry.elect_captain(low["id"], low["name"], 1), "Captain of an older epoch was accepted"
+    assert not registry.elect_captain(low["id"], low["name"], 2), "Lower captain of the same epoch was accepted"
+    assert registry.captain == high and registry.epoch == 2, "Rejected captain replaced the elected one"
+
+    registry.unregister(high["id"])
+    assert not registry.elect_captain(low["id"], low["name"], 1), "Epoch was forgotten with the captain"
+    assert registry.elect_captain(low["id"], low["name"], 2) and registry.captain == low, "Epoch blocked a new captain"
+    print("Captain-Epoch Test successful")
+
+def test_name_index():
+    registry = RobotRegistry()
+    first = registry.register("TestRobot")
+    second = registry.register("TestRobot")
+    registry.register("OtherRobot")
+    assert registry.find_by_name("TestRobot") == [first, second], "Name index lookup failed"
+
+    registry.unregister(first["id"])
+    assert registry.find_by_name("TestRobot") == [second], "Name index not updated on unregister"
+    print("Name-Index Test successful")
+
+def test_paging():
+    registry = RobotRegistry()
+    for i in range(10):
+        registry.register(f"Robot{i}" if i % 2 else f"Drone{i}")
+    registry.unregister(3)
+
+    robots, next_id = registry.page(limit = 2, name_prefix = "Robot")
+    assert [robot["id"] for robot in robots] == [1, 5] and next_id == 5, "First page did not work as expected"
+    robots, next_id = registry.page(next_id, limit = 10, name_prefix = "Robot")
+    assert [robot["id"] for robot in robots] == [7, 9] and next_id is None, "Last page did not work as expected"
+    robots, next_id = registry.page(limit = 10, name_prefix = "zzz", scan = 4)
+    assert robots == [] and next_id == 3, "Page without matches scanned past its limit"
+    registry.claim(3, "Claimed")
+    assert [robot["id"] for robot in registry.snapshot()] == list(range(10)), "Snapshot not ordered by ID"
+    print("Paging Test successful")
+
+
+# Non-functional test
+
+def measure_health_throughput(fleet_size):
+    registry = RobotRegistry()
+    for i in range(fleet_size):
+        registry.register(f"Robot{i}")
+    per_thread = HEALTH_CHECKS // WORKER_THREADS
+
+    def health_checks(offset):
+        for i in range(per_thread):
+            _ = (offset + i * 7919) % fleet_size in registry  # HealthCheck lookup
+
+    threads = [threading.Thread(target=health_checks, args=(t,)) for t in range(WORKER_THREADS)]
+    start_time = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    end_time = time.time()
+    return per_thread * WORKER_THREADS / (end_time - start_time)
+
+
+if __name__ == "__main__":
+    print("Starting non-functional test (health-check throughput)...")
+    results = [(size, measure_health_throughput(size)) for size in FLEET_SIZES]
+
+    # Save results in file
+    with open("tests_registry_throughput.txt", "w") as f:
+        f.write("Health-check throughput results:\n")
+        f.write("\n".join(f"{size} robots: {rate:.0f} checks/s" for size, rate in results))
+        f.write("\n\nStatistic evaluation:\n")
+        f.write(f"Slowest/fastest ratio: {min(r for _, r in results) / max(r for _, r in results):.2f}\n")
+
+    print("Non-functional test-results saved in 'tests_registry_throughput.txt'")
+
+    print("Starting functional tests...")
+    test_register_unique_ids()
+    test_register_many()
+    test_unregister_captain()
+    test_captain_epoch()
+    test_name_index()
+    test_paging()
+    print("All tests executed")
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import statistics
+import sys
+
+SRC_DIR = next(path for path in (os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"),  # docker
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))  # local
+               if os.path.isdir(path))
+sys.path.insert(0, SRC_DIR)
+from robots.scheduler import Scheduler
+
+TIMERS = 2000  # concurrent timeouts per benchmark (one per simulated robot)
+TIMEOUT = 0.2  # seconds
+HEARTBEAT_GAP = 0.02  # seconds between extensions while the captain is alive
+ALIVE = 2  # seconds of extensions before the timeouts may expire
+
+# Functional tests
+
+async def fires_at_deadline():
+    scheduler = Scheduler()
+    loop = asyncio.get_running_loop()
+    fired = asyncio.Event()
+    deadline = loop.time() + 0.05
+    scheduler.at("timeout", deadline, fired.set)
+    await fired.wait()
+    return loop.time() - deadline
+
+def test_fires_at_deadline():
+    lateness = asyncio.run(fires_at_deadline())
+    assert 0 <= lateness < 0.01, "Timer did not fire at its deadline"
+    print("Deadline Test successful")
+
+async def extend_without_wakeups():
+    scheduler = Scheduler()
+    loop = asyncio.get_running_loop()
+    fired = []
+    for _ in range(30):
+        scheduler.after("timeout", 0.1, lambda: fired.append(loop.time()))
+        last = loop.time()
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.15)
+    return fired, fired[0] - last if fired else None, scheduler.wakeups
+
+def test_extend_without_wakeups():
+    fired, delay, wakeups = asyncio.run(extend_without_wakeups())
+    assert len(fired) == 1 and 0.1 <= delay < 0.11, "Extended timeout did not fire once after the last extension"
+    assert wakeups <= 5, "Extending the timeout woke the loop on every extension"
+    print("Extend Test successful")
+
+async def earlier_and_cancel():
+    scheduler = Scheduler()
+    loop = asyncio.get_running_loop()
+    fired = []
+    start = loop.time()
+    scheduler.after("timeout", 0.2, lambda: fired.append("late"))
+    scheduler.after("timeout", 0.05, lambda: fired.append(loop.time() - start))
+    scheduler.after("heartbeat", 0.05, lambda: fired.append("cancelled"))
+    scheduler.cancel("heartbeat")
+    await asyncio.sleep(0.25)
+    return fired, "timeout" in scheduler
+
+def test_earlier_and_cancel():
+    fired, pending = asyncio.run(earlier_and_cancel())
+    assert len(fired) == 1 and 0.05 <= fired[0] < 0.06 and not pending, "Earlier deadline or cancel did not work"
+    print("Earlier-Deadline/Cancel Test successful")
+
+
+# Non-functional test
+
+async def measure_timeouts(timers):
+    # Every timer is extended each HEARTBEAT_GAP for ALIVE seconds, then left to expire
+    scheduler = Scheduler()
+    loop = asyncio.get_running_loop()
+    lateness = []
+    deadlines = {}
+
+    def expire(name):
+        lateness.append(loop.time() - deadlines[name])
+
+    end = loop.time() + ALIVE
+    while loop.time() < end:
+        for i in range(timers):
+            deadlines[i] = loop.time() + TIMEOUT
+            scheduler.at(i, deadlines[i], lambda i=i: expire(i))
+        await asyncio.sleep(HEARTBEAT_GAP)
+    await asyncio.sleep(2 * TIMEOUT)
+    return scheduler.wakeups / timers, lateness
+
+
+if __name__ == "__main__":
+    print("Starting non-functional test (timer wakeups and lateness)...")
+    wakeups, lateness = asyncio.run(measure_timeouts(TIMERS))
+
+    # Save results in file
+    with open("tests_scheduler_wakeups.txt", "w") as f:
+        f.write(f"{TIMERS} timeouts of {TIMEOUT}s, extended every {HEARTBEAT_GAP}s for {ALIVE}s:\n")
+        f.write(f"Loop wakeups per timeout: {wakeups:.1f} (one per extension: {ALIVE / HEARTBEAT_GAP:.0f})\n")
+        f.write(f"Expiry lateness: median {statistics.median(lateness) * 1000:.2f}ms, max {max(lateness) * 1000:.2f}ms\n")
+
+    print("Non-functional test-results saved in 'tests_scheduler_wakeups.txt'")
+
+    print("Starting functional tests...")
+    test_fires_at_deadline()
+    test_extend_without_wakeups()
+    test_earlier_and_cancel()
+    print("All tests executed")
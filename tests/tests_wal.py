@@ -0,0 +1,121 @@
+from src.controller.registry import RobotRegistry
+from src.controller.wal import WriteAheadLog
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+REGISTRATIONS = 20000  # per benchmark run
+WORKER_THREADS = 10  # matches the controller's gRPC executor
+
+# Functional tests
+
+def recover(directory, **kwargs):
+    registry = RobotRegistry()
+    registry.recover(WriteAheadLog(directory, **kwargs))
+    return registry
+
+def test_restart_keeps_state():
+    directory = tempfile.mkdtemp()
+    registry = recover(directory)
+    first = registry.register("TestRobot")
+    second = registry.register("TestRobot")
+    registry.register("OtherRobot")
+    registry.elect_captain(second["id"], second["name"], 3)
+    registry.unregister(first["id"])
+    registry.journal.close()
+
+    restarted = recover(directory)
+    assert restarted.snapshot() == registry.snapshot(), "Robots were not restored"
+    assert restarted.captain == second and restarted.epoch == 3, "Captain was not restored"
+    assert restarted.find_by_name("TestRobot") == [second], "Name index was not rebuilt"
+    assert restarted.register("NewRobot")["id"] == 3, "Restarted registry reused an ID"
+    restarted.journal.close()
+    shutil.rmtree(directory)
+    print("Restart Test successful")
+
+def test_crash_recovery():
+    # No close(): only the log records acknowledged so far exist, plus a torn write
+    directory = tempfile.mkdtemp()
+    registry = recover(directory)
+    for i in range(5):
+        registry.register(f"Robot{i}")
+    registry.unregister(4)
+    segment = sorted(name for name in os.listdir(directory) if name.startswith("wal-"))[-1]
+    with open(os.path.join(directory, segment), "ab") as f:
+        f.write(b'[7,"register",5,"Tor')
+
+    restarted = recover(directory)
+    assert [robot["id"] for robot in restarted.snapshot()] == [0, 1, 2, 3], "Log replay did not work as expected"
+    assert restarted.register("NewRobot")["id"] == 5, "Unregistered highest ID was reused"
+    restarted.journal.close()
+    assert recover(directory).find_by_name("NewRobot"), "Record after the torn write was lost"
+    shutil.rmtree(directory)
+    print("Crash-Recovery Test successful")
+
+def test_snapshot_compaction():
+    directory = tempfile.mkdtemp()
+    registry = recover(directory, snapshot_every = 100)
+    for i in range(1000):
+        robot = registry.register(f"Robot{i}")
+        if i % 2:
+            registry.unregister(robot["id"])
+    time.sleep(0.1)  # Last snapshot is written after the commit was acknowledged
+
+    segments = [name for name in os.listdir(directory) if name.startswith("wal-")]
+    assert registry.journal.stats["snapshots"] >= 10 and len(segments) <= 2, "Log was not compacted"
+    restarted = recover(directory)
+    assert restarted.snapshot() == registry.snapshot(), "Snapshot and log replay did not match"
+    shutil.rmtree(directory)
+    print("Snapshot-Compaction Test successful")
+
+
+# Non-functional test
+
+def measure_register_rate(directory=None):
+    registry = RobotRegistry()
+    if directory is not None:
+        registry.recover(WriteAheadLog(directory))
+    per_thread = REGISTRATIONS // WORKER_THREADS
+
+    def register_many():
+        for i in range(per_thread):
+            registry.register(f"Robot{i}")
+
+    threads = [threading.Thread(target=register_many) for _ in range(WORKER_THREADS)]
+    start_time = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    rate = REGISTRATIONS / (time.time() - start_time)
+
+    if directory is None:
+        return rate, 0
+    registry.journal.close()
+    start_time = time.time()
+    recover(directory).journal.close()
+    return rate, time.time() - start_time
+
+
+if __name__ == "__main__":
+    print("Starting non-functional test (registration throughput)...")
+    memory_rate, _ = measure_register_rate()
+    directory = tempfile.mkdtemp()
+    wal_rate, recovery_time = measure_register_rate(directory)
+    shutil.rmtree(directory)
+
+    # Save results in file
+    with open("tests_wal_throughput.txt", "w") as f:
+        f.write(f"Registration throughput with {WORKER_THREADS} threads:\n")
+        f.write(f"In memory: {memory_rate:.0f} registrations/s\n")
+        f.write(f"Write-ahead log (fsync, group commit): {wal_rate:.0f} registrations/s\n")
+        f.write(f"Recovery of {REGISTRATIONS} robots: {recovery_time * 1000:.1f}ms\n")
+    print("Non-functional test-results saved in 'tests_wal_throughput.txt'")
+
+    print("Starting functional tests...")
+    test_restart_keeps_state()
+    test_crash_recovery()
+    test_snapshot_compaction()
+    print("All tests executed")